@@ -1,13 +1,17 @@
 from django.contrib import auth, messages
 from django.contrib.auth.decorators import login_required
+from django.db.models import Count, Q
 from django.shortcuts import redirect, render
 from django.views.decorators.http import require_POST
 
 from apps.blog.models import Article
+from apps.blog.pagination import CursorPaginator
 from apps.core.models import UserProfile
 
 from .forms import LoginForm, ProfileForm, SignupForm
 
+PROFILE_ARTICLES_PER_PAGE = 20
+
 
 def login_view(request):
     """Вход в аккаунт."""
@@ -93,20 +97,30 @@ def profile_view(request):
             'website': profile.website,
         })
 
-    published_articles = Article.objects.filter(
-        author=user, status=Article.Status.PUBLISHED
-    ).order_by('-created_at')
-
-    draft_articles = Article.objects.filter(
-        author=user, status=Article.Status.DRAFT
-    ).order_by('-updated_at')
+    # Оба счётчика одним запросом по индексу (author, status, ...)
+    counts = Article.objects.filter(author=user).aggregate(
+        published=Count('pk', filter=Q(status=Article.Status.PUBLISHED)),
+        drafts=Count('pk', filter=Q(status=Article.Status.DRAFT)),
+    )
+
+    # Спискам нужны только заголовок, адрес и дата; у черновиков ещё короткий excerpt вместо текста
+    published_articles = CursorPaginator(
+        Article.objects.filter(author=user, status=Article.Status.PUBLISHED).only('slug', 'title', 'created_at'),
+        PROFILE_ARTICLES_PER_PAGE,
+    ).page(request.GET.get('cursor'))
+    draft_articles = CursorPaginator(
+        Article.objects.filter(author=user, status=Article.Status.DRAFT).only('slug', 'title', 'excerpt', 'updated_at'),
+        PROFILE_ARTICLES_PER_PAGE,
+        ordering=('-updated_at', '-pk'),
+    ).page(request.GET.get('drafts_cursor'))
 
     return render(request, 'accounts/profile.html', {
         'form': form,
         'profile': profile,
         'published_articles': published_articles,
         'draft_articles': draft_articles,
-        'published_count': published_articles.count(),
+        'published_count': counts['published'],
+        'draft_count': counts['drafts'],
     })
 
 
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Article, Category
+from .models import Article, ArticleCounters, ArticleStats, Category
 
 
 @admin.register(Article)
@@ -11,4 +11,20 @@ class ArticleAdmin(admin.ModelAdmin):
 @admin.register(Category)
 class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'slug']
-    prepopulated_fields = {'slug': ['name']}
\ No newline at end of file
+    prepopulated_fields = {'slug': ['name']}
+
+
+@admin.register(ArticleStats)
+class ArticleStatsAdmin(admin.ModelAdmin):
+    list_display = ['scope', 'object_id', 'articles', 'authors', 'categories', 'updated_at']
+    list_filter = ['scope']
+    readonly_fields = ['scope', 'object_id', 'articles', 'authors', 'categories', 'updated_at']
+
+
+@admin.register(ArticleCounters)
+class ArticleCountersAdmin(admin.ModelAdmin):
+    list_display = ['article', 'views', 'reactions']
+    list_select_related = ['article']
+    ordering = ['-views']
+    # Правки вручную затёрли бы приращения из буферов процессов
+    readonly_fields = ['article', 'views', 'reactions']
@@ -0,0 +1,96 @@
+"""Автосохранение черновиков правками относительно известной ревизии.
+
+Редактор присылает не всю форму, а ревизию, от которой он считал правку,
+изменённые заголовок и описание и замену одного участка текста
+``[start, end, text]``: клиент находит общие начало и конец старого и нового
+текста, поэтому правка — это только набранный с прошлого сохранения фрагмент.
+Смещения считаются в символах (code points) текста с переводами строк ``\\n`` —
+так его видит ``<textarea>``.
+
+Запись — условный ``UPDATE ... WHERE revision = <base>``: если текст успели
+сохранить из другой вкладки или полной формой, ни одна строка не обновится,
+и клиент получит конфликт, а не затрёт чужую правку.
+
+Вместе с текстом в том же ``UPDATE`` пишутся число слов, время чтения и
+отрывок — отрывок виден в списке черновиков. Его HTML берётся из предпросмотра
+редактора: блоки текста уже отрендерены и лежат в кэше. HTML, оглавление и
+``content_hash`` пересчитываются при сохранении формы (или командой
+``refresh_articles``); до тех пор устаревший HTML узнаётся по ``content_hash``.
+"""
+from django.db.models import F
+from django.utils import timezone
+
+from . import rendering
+from .models import Article
+
+EDITABLE_FIELDS = ('title', 'description')
+
+
+class RevisionConflict(Exception):
+    """Черновик изменился после ревизии, от которой считалась правка."""
+
+    def __init__(self, revision):
+        super().__init__(revision)
+        self.revision = revision
+
+
+def normalize_newlines(text):
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+
+def apply_patch(text, patch):
+    """Заменяет участок ``[start, end)`` текста на ``insert``; проверяет границы."""
+    try:
+        start, end, insert = patch
+        in_bounds = 0 <= start <= end <= len(text)
+        # Срез с нецелыми границами и склейка с не-строкой дают TypeError
+        patched = text[:start] + insert + text[end:]
+    except (TypeError, ValueError):
+        raise ValueError('Правка должна быть списком [start, end, text].') from None
+    if not in_bounds:
+        raise ValueError('Правка выходит за границы текста.')
+    return patched
+
+
+def save_draft(article, revision, changes):
+    """Применяет изменения к черновику, сохранённому в ревизии ``revision``.
+
+    ``article`` — черновик с загруженными ``content`` и ``revision``.
+    ``changes`` — словарь с необязательными ``title``, ``description``,
+    ``patch`` и ``length`` (длина текста после правки, для проверки).
+    Возвращает новую ревизию; при устаревшей ревизии — ``RevisionConflict``.
+    """
+    if revision != article.revision:
+        raise RevisionConflict(article.revision)
+
+    fields = {}
+    for name in EDITABLE_FIELDS:
+        if name in changes:
+            value = changes[name]
+            field = Article._meta.get_field(name)
+            if not isinstance(value, str) or len(value) > (field.max_length or len(value)):
+                raise ValueError(f'Некорректное поле {name}.')
+            if not value.strip() and not field.blank:
+                raise ValueError(f'Поле {name} не может быть пустым.')
+            fields[name] = value
+    if 'patch' in changes:
+        content = apply_patch(normalize_newlines(article.content), changes['patch'])
+        if 'length' in changes and changes['length'] != len(content):
+            # Клиент считал правку не от того текста — безопаснее не сохранять
+            raise RevisionConflict(article.revision)
+        fields['content'] = article.content = content
+        article.content_html = rendering.render_preview(content).html
+        article.refresh_text_stats()
+        fields.update(word_count=article.word_count, reading_time=article.reading_time, excerpt=article.excerpt)
+    if not fields:
+        return article.revision
+
+    updated = Article.objects.filter(pk=article.pk, revision=revision).update(
+        **fields,
+        revision=F('revision') + 1,
+        updated_at=timezone.now(),
+    )
+    if not updated:
+        current = Article.objects.filter(pk=article.pk).values_list('revision', flat=True).first()
+        raise RevisionConflict(current)
+    return revision + 1
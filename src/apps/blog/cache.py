@@ -0,0 +1,233 @@
+"""Кэш целых страниц блога для анонимных читателей.
+
+Запись кэша привязана к пути с query string и хранит версии «групп»,
+от которых страница зависит: ``home``, ``list``, ``article:<slug>``,
+``category:<id>``. Сохранение или удаление статьи либо категории меняет
+версии затронутых групп (``invalidate``), и устаревшие записи перестают
+совпадать — остальные страницы остаются в кэше.
+
+Авторизованные пользователи кэш не используют и видят страницы, в том числе
+свои черновики, без задержки.
+
+Промах кэша рендерится с основной базы, даже если запрос читает с реплики:
+``invalidate`` меняет версии сразу после коммита, и страница, собранная с
+отставшей реплики, осталась бы в кэше под новыми версиями до таймаута.
+
+Декоратор работает и с async-view: кэш тогда читается через ``aget``/``aset``.
+
+``cache_document`` — тот же механизм версий для лент и sitemap: документы
+не зависят от посетителя, кэшируются для всех и отвечают 304 на условный GET.
+"""
+import hashlib
+import re
+import uuid
+from contextlib import nullcontext
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+from apps.core import routers
+
+PAGE_KEY_PREFIX = 'blog:page'
+DOCUMENT_KEY_PREFIX = 'blog:document'
+GROUP_KEY_PREFIX = 'blog:page-group'
+
+# CSRF-токен в формах страницы: в кэше вместо него заглушка, при выдаче — токен посетителя
+CSRF_TOKEN_RE = re.compile(rb'(name="csrfmiddlewaretoken" value=")[^"]*(")')
+CSRF_PLACEHOLDER = b'__blog_csrf_token__'
+
+
+def _group_key(group):
+    return f'{GROUP_KEY_PREFIX}:{group}'
+
+
+def _page_key(request, prefix=PAGE_KEY_PREFIX):
+    path = request.get_full_path()
+    return f'{prefix}:{hashlib.sha1(path.encode()).hexdigest()}'
+
+
+def group_versions(groups):
+    """Текущие версии групп; отсутствующей группе назначается новая версия."""
+    keys = {_group_key(group): group for group in groups}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        # Версия могла быть вытеснена из кэша — новая версия не совпадёт ни с одной записью
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        found[key] = cache.get(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+async def agroup_versions(groups):
+    keys = {_group_key(group): group for group in groups}
+    found = await cache.aget_many(keys)
+    for key in keys.keys() - found.keys():
+        await cache.aadd(key, uuid.uuid4().hex, timeout=None)
+        found[key] = await cache.aget(key)
+    return {keys[key]: version for key, version in found.items()}
+
+
+def invalidate(*groups):
+    """Инвалидирует страницы групп после коммита текущей транзакции."""
+    groups = {group for group in groups if group}
+    if groups:
+        transaction.on_commit(lambda: cache.set_many(
+            {_group_key(group): uuid.uuid4().hex for group in groups}, timeout=None
+        ))
+
+
+def add_page_dependencies(request, *groups):
+    """Добавляет зависимости, известные только внутри view (например, категория статьи)."""
+    if hasattr(request, 'page_cache_versions'):
+        request.page_cache_versions.update(group_versions(groups))
+
+
+async def aadd_page_dependencies(request, *groups):
+    if hasattr(request, 'page_cache_versions'):
+        request.page_cache_versions.update(await agroup_versions(groups))
+
+
+def _is_cacheable_request(request, user):
+    return (
+        settings.BLOG_PAGE_CACHE
+        and request.method in ('GET', 'HEAD')
+        and CookieStorage.cookie_name not in request.COOKIES
+        and not user.is_authenticated
+    )
+
+
+def _is_cacheable_response(response):
+    return (
+        response.status_code == 200
+        and not response.streaming
+        and not response.cookies
+    )
+
+
+def _restore(request, entry):
+    content = entry['content']
+    if entry['csrf']:
+        # Страница содержит форму: новый посетитель должен получить свою CSRF-cookie и свой токен
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    response = HttpResponse(content)
+    for header, value in entry['headers'].items():
+        response[header] = value
+    return response
+
+
+def _entry(request, response):
+    # Токен первого посетителя раскрыл бы его CSRF-секрет следующим — не кэшируем его
+    content = CSRF_TOKEN_RE.sub(rb'\g<1>' + CSRF_PLACEHOLDER + rb'\g<2>', response.content)
+    return {
+        'versions': request.page_cache_versions,
+        'content': content,
+        'headers': dict(response.headers),
+        'csrf': bool(request.META.get('CSRF_COOKIE_NEEDS_UPDATE')),
+    }
+
+
+def cache_page_for_anonymous(*groups):
+    """Кэширует ответ view для анонимных GET-запросов.
+
+    ``groups`` — имена групп или функции ``(request, **kwargs) -> имя группы``.
+    """
+    def group_names(request, kwargs):
+        return [group(request, **kwargs) if callable(group) else group for group in groups]
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            @wraps(view)
+            async def async_wrapper(request, *args, **kwargs):
+                if not _is_cacheable_request(request, await request.auser()):
+                    return await view(request, *args, **kwargs)
+
+                key = _page_key(request)
+                entry = await cache.aget(key)
+                if entry and entry['versions'] == await agroup_versions(entry['versions']):
+                    return _restore(request, entry)
+
+                request.page_cache_versions = await agroup_versions(group_names(request, kwargs))
+                with routers.read_from(None):
+                    response = await view(request, *args, **kwargs)
+                if _is_cacheable_response(response):
+                    await cache.aset(key, _entry(request, response), settings.BLOG_PAGE_CACHE_TIMEOUT)
+                return response
+            return async_wrapper
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not _is_cacheable_request(request, request.user):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request)
+            entry = cache.get(key)
+            if entry and entry['versions'] == group_versions(entry['versions']):
+                return _restore(request, entry)
+
+            request.page_cache_versions = group_versions(group_names(request, kwargs))
+            with routers.read_from(None):
+                response = view(request, *args, **kwargs)
+            if _is_cacheable_response(response):
+                cache.set(key, _entry(request, response), settings.BLOG_PAGE_CACHE_TIMEOUT)
+            return response
+        return wrapper
+    return decorator
+
+
+def _conditional_document(request, document):
+    response = get_conditional_response(
+        request,
+        etag=document['etag'],
+        last_modified=document['last_modified'],
+    )
+    if response is None:
+        response = HttpResponse(document['content'], content_type=document['content_type'])
+    response['ETag'] = document['etag']
+    if document['last_modified']:
+        response['Last-Modified'] = http_date(document['last_modified'])
+    return response
+
+
+def cache_document(*groups):
+    """Кэширует XML-документ (ленту, sitemap) до изменения групп и отвечает на условный GET.
+
+    Документ собирается view один раз на версию групп; ETag — хеш содержимого,
+    Last-Modified берётся из ответа view. Повторные запросы, в том числе 304,
+    обходятся без SQL. Без ``BLOG_PAGE_CACHE`` документ собирается на каждый
+    запрос, но 304 по-прежнему экономит трафик.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+
+            key = _page_key(request, DOCUMENT_KEY_PREFIX)
+            names = [group(request, **kwargs) if callable(group) else group for group in groups]
+            versions = group_versions(names) if settings.BLOG_PAGE_CACHE else None
+            document = cache.get(key) if versions else None
+            if document is None or document['versions'] != versions:
+                # Документ, который попадёт в кэш, собирается с основной базы, как и страницы
+                with routers.read_from(None) if versions else nullcontext():
+                    response = view(request, *args, **kwargs)
+                if not _is_cacheable_response(response):
+                    return response
+                document = {
+                    'versions': versions,
+                    'content': response.content,
+                    'content_type': response['Content-Type'],
+                    'etag': quote_etag(hashlib.sha1(response.content).hexdigest()),
+                    'last_modified': parse_http_date_safe(response.get('Last-Modified', '')),
+                }
+                if versions:
+                    cache.set(key, document, settings.BLOG_PAGE_CACHE_TIMEOUT)
+            return _conditional_document(request, document)
+        return wrapper
+    return decorator
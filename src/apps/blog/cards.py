@@ -0,0 +1,81 @@
+"""Кэш отрендеренных карточек статей (``includes/article_card.html``).
+
+Карточка зависит от полей статьи, её счётчиков, категории и самого шаблона,
+поэтому ключ строится из ``pk``, ``updated_at``, ``content_hash`` (меняется
+вместе с отрывком и временем чтения, в том числе при ``refresh_articles``),
+``image_variants``, числа просмотров, версии группы ``category:<id>`` из кэша
+страниц и хеша исходника шаблонов.
+Отдельная инвалидация не нужна: изменение любого из них даёт новый ключ, а
+старые записи вытесняются по таймауту.
+
+Все карточки списка читаются одним ``get_many``, рендерятся только промахи и
+записываются одним ``set_many``. Карточки результатов поиска (с подсвеченным
+фрагментом) зависят от запроса и не кэшируются.
+"""
+import hashlib
+import json
+from functools import cache as memoize
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template, render_to_string
+from django.utils.safestring import mark_safe
+
+from .cache import group_versions
+
+CARD_KEY_PREFIX = 'blog:card'
+CARD_TEMPLATE = 'includes/article_card.html'
+# Шаблоны, из которых состоит карточка: их правка меняет все ключи
+CARD_TEMPLATES = (CARD_TEMPLATE, 'includes/responsive_image.html')
+
+
+@memoize
+def template_version():
+    sources = ''.join(get_template(name).template.source for name in CARD_TEMPLATES)
+    return hashlib.sha1(sources.encode()).hexdigest()[:12]
+
+
+def card_key(article, category_version, animation_class=''):
+    parts = [
+        template_version(),
+        article.pk,
+        article.updated_at.isoformat(),
+        article.content_hash,
+        json.dumps(article.image_variants, sort_keys=True),
+        article.engagement.views,
+        category_version or '',
+        animation_class,
+    ]
+    return f'{CARD_KEY_PREFIX}:{hashlib.sha1(json.dumps(parts).encode()).hexdigest()}'
+
+
+def _render(article, animation_class):
+    return render_to_string(CARD_TEMPLATE, {'article': article, 'animation_class': animation_class})
+
+
+def render_cards(articles, animation_class=''):
+    """HTML карточек статей подряд; из кэша берутся все, что в нём есть."""
+    articles = list(articles)
+    if not settings.BLOG_CARD_CACHE:
+        return mark_safe('\n'.join(_render(article, animation_class) for article in articles))
+
+    cacheable = [article for article in articles if not getattr(article, 'search_snippet', None)]
+    versions = group_versions({f'category:{article.category_id}' for article in cacheable if article.category_id})
+    keys = {
+        article.pk: card_key(article, versions.get(f'category:{article.category_id}'), animation_class)
+        for article in cacheable
+    }
+    cached = cache.get_many(keys.values())
+    missing = {}
+    html = []
+    for article in articles:
+        key = keys.get(article.pk)
+        card = cached.get(key) if key else None
+        if card is None:
+            card = _render(article, animation_class)
+            if key:
+                missing[key] = card
+        html.append(card)
+    if missing:
+        cache.set_many(missing, timeout=settings.BLOG_CARD_CACHE_TIMEOUT)
+    return mark_safe('\n'.join(html))
@@ -0,0 +1,166 @@
+"""Просмотры и реакции статей с отложенной записью.
+
+Запрос не пишет в базу: приращения копятся в буфере процесса (как подписки в
+``apps.core.subscriptions``) и раз в ``BLOG_COUNTERS_FLUSH_INTERVAL`` секунд
+записываются одним ``UPDATE ... SET views = views + CASE article_id WHEN ...``.
+Прибавление, а не присваивание, делает запись независимой от других воркеров:
+каждый записывает только свои приращения, и ни одно не теряется. Если запись
+не удалась (например, «database is locked»), приращения возвращаются в буфер.
+
+После записи новые значения кладутся в кэш (``asnapshot``) — из него отвечает
+счётчик на странице статьи, не обращаясь к базе. Страницы и карточки берут
+счётчики из строки ``ArticleCounters`` вместе со статьёй и кэшируются как
+обычно, поэтому показывают значения на момент рендера.
+
+Запросы к несуществующим и неопубликованным статьям отклоняются до буфера
+(``asnapshot`` возвращает ``None``), поэтому в нём не больше записей, чем
+опубликованных статей. Когда статья снимается с публикации или удаляется,
+её снимок убирается из кэша (``forget``), а уже накопленные приращения
+отбрасываются при записи. При аварийной остановке процесса теряются приращения за последний
+интервал; при штатной буфер записывается через ``atexit``.
+"""
+import atexit
+import logging
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Case, F, Value, When
+
+from .models import Article, ArticleCounters
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('views', 'reactions')
+SNAPSHOT_KEY_PREFIX = 'blog:counters'
+
+
+def _snapshot_key(article_id):
+    return f'{SNAPSHOT_KEY_PREFIX}:{article_id}'
+
+
+class CounterBuffer:
+    """Приращения счётчиков процесса, записываемые в базу пачками."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._deltas = {field: Counter() for field in FIELDS}
+        self._timer = None
+        # Статьи, для которых строка счётчиков уже точно есть
+        self._known = set()
+
+    def __len__(self):
+        return len(set().union(*self._deltas.values()))
+
+    def add(self, article_id, field, count=1):
+        with self._lock:
+            self._deltas[field][article_id] += count
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(settings.BLOG_COUNTERS_FLUSH_INTERVAL, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Записывает накопленные приращения. Возвращает число обновлённых статей."""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {field: Counter() for field in FIELDS}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        ids = set().union(*deltas.values())
+        if not ids:
+            return 0
+        try:
+            with transaction.atomic():
+                created = self._create_rows(ids - self._known)
+                ids &= self._known | created
+                if ids:
+                    # Строка счётчиков остаётся и у статьи, снятой с публикации: её приращения отбрасываются
+                    published = ArticleCounters.objects.filter(pk__in=ids, article__status=Article.Status.PUBLISHED)
+                    published.update(**{
+                        field: F(field) + Case(
+                            *(When(pk=pk, then=Value(deltas[field][pk])) for pk in ids if deltas[field][pk]),
+                            default=Value(0),
+                        )
+                        for field in FIELDS if any(deltas[field][pk] for pk in ids)
+                    })
+        except DatabaseError:
+            # Например, «database is locked» в SQLite: приращения вернутся в буфер до следующей записи
+            logger.exception('Не удалось записать счётчики %d статей', len(ids))
+            with self._lock:
+                for field in FIELDS:
+                    self._deltas[field].update(deltas[field])
+                self._schedule()
+            raise
+        # Только после коммита: при откате строки могли не создаться
+        self._known |= created
+        if not ids:
+            return 0
+        rows = list(published.values_list('pk', *FIELDS))
+        cache.set_many(
+            {_snapshot_key(pk): dict(zip(FIELDS, values)) for pk, *values in rows},
+            timeout=settings.BLOG_COUNTERS_SNAPSHOT_TIMEOUT,
+        )
+        return len(rows)
+
+    def _create_rows(self, ids):
+        """Создаёт недостающие строки счётчиков опубликованных статей из ``ids``; возвращает их id."""
+        if not ids:
+            return set()
+        published = set(Article.objects.filter(
+            pk__in=ids, status=Article.Status.PUBLISHED,
+        ).values_list('pk', flat=True))
+        ArticleCounters.objects.bulk_create(
+            [ArticleCounters(article_id=pk) for pk in published],
+            ignore_conflicts=True,
+        )
+        return published
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+        finally:
+            # У потока таймера своё соединение с базой
+            connection.close()
+
+
+BUFFER = CounterBuffer()
+
+
+async def asnapshot(article_id):
+    """Значения счётчиков после последней записи: из кэша, при промахе — из базы.
+
+    Для несуществующей или неопубликованной статьи возвращает ``None``.
+    """
+    values = await cache.aget(_snapshot_key(article_id))
+    if values is None:
+        row = await Article.objects.filter(
+            pk=article_id, status=Article.Status.PUBLISHED,
+        ).values_list(*(f'counters__{field}' for field in FIELDS)).afirst()
+        if row is None:
+            return None
+        # Строки счётчиков ещё нет — статью пока никто не смотрел
+        values = {field: value or 0 for field, value in zip(FIELDS, row)}
+        await cache.aset(_snapshot_key(article_id), values, timeout=settings.BLOG_COUNTERS_SNAPSHOT_TIMEOUT)
+    return values
+
+
+def forget(article_id):
+    """Убирает снимок счётчиков после коммита: статья снята с публикации или удалена.
+
+    Без снимка ``asnapshot`` идёт в базу и перестаёт принимать запросы к статье.
+    """
+    transaction.on_commit(lambda: cache.delete(_snapshot_key(article_id)))
+
+
+@atexit.register
+def _flush_on_exit():
+    if len(BUFFER):
+        BUFFER.flush()
@@ -0,0 +1,262 @@
+"""Экспорт публичных страниц блога в статические файлы.
+
+Страницы рендерятся тем же кодом, что и для анонимного читателя (тестовым
+клиентом Django, без кэша страниц), и пишутся в каталог вида::
+
+    index.html                               /
+    articles/index.html                      /articles/
+    articles/page/2/index.html               /articles/?page=2
+    articles/category/<slug>/index.html      /articles/?category=<slug>
+    articles/category/<slug>/page/2/...      /articles/?category=<slug>&page=2
+    article/<slug>/index.html                /article/<slug>/
+
+Рядом с каждым файлом лежат ``.gz`` и, если установлен ``brotli``, ``.br``.
+Категория и номер страницы передаются в query string, поэтому списку нужно
+правило, например для nginx::
+
+    location = /articles/ {
+        set $list /articles;
+        if ($arg_category) { set $list $list/category/$arg_category; }
+        if ($arg_page) { set $list $list/page/$arg_page; }
+        try_files $list/index.html @django;
+    }
+
+Статика (CSS, JS) в экспорт не входит — она отдаётся из ``collectstatic``.
+
+``manifest.json`` хранит время запуска, хеши и размеры записанных файлов,
+даты изменения и категории статей и показанные на их страницах похожие
+статьи — по ним инкрементальный запуск находит страницы, которые нужно
+пересобрать. Правки самих категорий, шаблонов и стилей инкрементальный режим
+не видит — после них нужен полный экспорт.
+
+На страницах с формами (подписка) CSRF-токен вшит при рендере и для
+посетителя не действителен: форма берёт токен из cookie ``csrftoken``,
+поэтому она работает только у тех, кто уже получал её от Django.
+"""
+import gzip
+import hashlib
+import json
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from apps.core.probing import probe_client
+
+from .models import Article, RelatedArticle
+from .views import ARTICLES_PER_PAGE, RELATED_ARTICLES
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - необязательная зависимость
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+# Файлы меньше этого размера не сжимаются: выигрыш меньше накладных расходов
+MIN_COMPRESS_SIZE = 256
+
+
+def _published():
+    return Article.objects.filter(status=Article.Status.PUBLISHED)
+
+
+def _num_pages(count):
+    """Число страниц списка, доступных по номеру (без курсорного продолжения)."""
+    num_pages = Paginator(range(count), ARTICLES_PER_PAGE).num_pages
+    if settings.BLOG_CURSOR_PAGINATION:
+        num_pages = min(num_pages, settings.BLOG_OFFSET_PAGES)
+    return num_pages
+
+
+def list_url(page=1, category=None):
+    params = []
+    if category:
+        params.append(f'category={category}')
+    if page > 1:
+        params.append(f'page={page}')
+    url = reverse('blog:article_list')
+    return f'{url}?{"&".join(params)}' if params else url
+
+
+def output_path(url):
+    """Путь файла относительно каталога экспорта для URL страницы."""
+    path, _, query = url.partition('?')
+    params = dict(part.split('=', 1) for part in query.split('&') if part)
+    parts = [path.strip('/')]
+    if 'category' in params:
+        parts += ['category', params['category']]
+    if 'page' in params:
+        parts += ['page', params['page']]
+    return str(Path(*[part for part in parts if part], 'index.html'))
+
+
+def _list_urls(ordered_ids, category=None, containing=None):
+    """URL страниц списка; с ``containing`` — только страниц, где стоят эти статьи."""
+    numbers = range(1, _num_pages(len(ordered_ids)) + 1)
+    if containing is not None:
+        pages = {index // ARTICLES_PER_PAGE + 1 for index, pk in enumerate(ordered_ids) if pk in containing}
+        numbers = [number for number in numbers if number in pages]
+    return {list_url(number, category) for number in numbers}
+
+
+def _related_slugs():
+    """Какие похожие статьи показаны на странице каждой статьи: {slug: [slug, ...]}."""
+    shown = {}
+    for slug, related in RelatedArticle.objects.filter(
+        article__status=Article.Status.PUBLISHED,
+        related__status=Article.Status.PUBLISHED,
+    ).order_by('article_id', 'rank').values_list('article__slug', 'related__slug'):
+        links = shown.setdefault(slug, [])
+        if len(links) < RELATED_ARTICLES:
+            links.append(related)
+    return shown
+
+
+def plan(previous=None):
+    """Что рендерить и что удалить.
+
+    Возвращает ``(urls, stale, articles)``: URL для рендера, URL, чьи файлы
+    больше не нужны, и состояние статей для манифеста (дата изменения,
+    категория и показанные похожие статьи). Без ``previous`` рендерятся
+    все страницы.
+    """
+    rows = list(_published().order_by('-created_at', '-pk').values_list('pk', 'slug', 'category__slug', 'updated_at'))
+    related = _related_slugs()
+    articles = {
+        slug: {'updated_at': updated_at.isoformat(), 'category': category, 'related': related.get(slug, [])}
+        for _, slug, category, updated_at in rows
+    }
+    lists = {None: [pk for pk, *_ in rows]}
+    for pk, _, category, _ in rows:
+        if category:
+            lists.setdefault(category, []).append(pk)
+    detail = {slug: reverse('blog:article_detail', kwargs={'slug': slug}) for slug in articles}
+
+    everything = {reverse('blog:index'), *detail.values()}
+    for category, ids in lists.items():
+        everything |= _list_urls(ids, category)
+    if previous is None:
+        return everything, set(), articles
+
+    stale = set(previous['pages']) - everything
+    since = parse_datetime(previous['generated_at'])
+    before = previous['articles']
+    # Статья сменила категорию: из одной она ушла, в другую добавилась — как при
+    # удалении и добавлении, сдвигаются все страницы обеих категорий. В манифесте
+    # прежнего формата категорий нет: все статьи считаются перенесёнными — полный экспорт
+    moved = {
+        pk: (before[slug].get('category'), category)
+        for pk, slug, category, _ in rows
+        if slug in before and before[slug].get('category') != category
+    }
+    moved_categories = {category for categories in moved.values() for category in categories}
+    changed = {pk for pk, slug, _, updated_at in rows if updated_at >= since or slug not in before} | moved.keys()
+    changed_slugs = {slug for pk, slug, *_ in rows if pk in changed}
+    removed = before.keys() - articles.keys()
+
+    # Страница статьи устарела, если изменилась она сама, её список похожих
+    # или заголовок одной из показанных в нём статей
+    urls = {
+        detail[slug] for slug, state in articles.items()
+        if slug in changed_slugs
+        or state['related'] != before.get(slug, {}).get('related')
+        or changed_slugs.intersection(state['related'])
+    }
+    if changed or removed:
+        urls.add(reverse('blog:index'))
+        # Появление или исчезновение статьи сдвигает все страницы списков, правка — только её страницу
+        added = any(slug not in before for slug in articles)
+        containing = None if (added or removed) else changed
+        for category, ids in lists.items():
+            urls |= _list_urls(ids, category, None if category in moved_categories else containing)
+    return urls, stale, articles
+
+
+def _write(path, content):
+    """Пишет файл атомарно; одинаковое содержимое не перезаписывается."""
+    if path.exists() and path.read_bytes() == content:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f'.{path.name}.tmp')
+    tmp.write_bytes(content)
+    os.replace(tmp, path)
+    return True
+
+
+def write_page(root, url, content):
+    """Записывает страницу и её сжатые копии. Возвращает запись манифеста и признак изменения файла."""
+    path = Path(root) / output_path(url)
+    written = _write(path, content)
+    entry = {
+        'path': output_path(url),
+        'sha256': hashlib.sha256(content).hexdigest(),
+        'size': len(content),
+    }
+    if len(content) >= MIN_COMPRESS_SIZE:
+        # mtime=0: одинаковая страница даёт побайтно одинаковый .gz
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        _write(path.with_name(path.name + '.gz'), compressed)
+        entry['gzip'] = len(compressed)
+        if brotli is not None:
+            compressed = brotli.compress(content)
+            _write(path.with_name(path.name + '.br'), compressed)
+            entry['br'] = len(compressed)
+    return entry, written
+
+
+def remove_page(root, entry):
+    path = Path(root) / entry['path']
+    for suffix in ('', '.gz', '.br'):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+def init_worker():
+    """Инициализация процесса пула: свои соединения с базой и рендер без кэша страниц."""
+    import django
+
+    django.setup()
+    connections.close_all()
+    override_settings(BLOG_PAGE_CACHE=False, PERF_INSTRUMENTATION=False).enable()
+
+
+def render_pages(root, urls):
+    """Рендерит страницы анонимным клиентом и записывает их.
+
+    Возвращает ``(записи манифеста, число изменённых файлов, {url: код ошибки})``.
+    """
+    client = probe_client()
+    entries, written, errors = {}, 0, {}
+    for url in urls:
+        response = client.get(url)
+        if response.status_code != 200:
+            errors[url] = response.status_code
+            continue
+        entries[url], changed = write_page(root, url, response.content)
+        written += changed
+    return entries, written, errors
+
+
+def read_manifest(root):
+    path = Path(root) / MANIFEST_NAME
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def write_manifest(root, started_at, pages, articles):
+    manifest = {
+        'generated_at': started_at.isoformat(),
+        'finished_at': timezone.now().isoformat(),
+        'brotli': brotli is not None,
+        'articles': articles,
+        'pages': dict(sorted(pages.items())),
+    }
+    path = Path(root) / MANIFEST_NAME
+    _write(path, json.dumps(manifest, ensure_ascii=False, indent=2).encode())
+    return manifest
@@ -0,0 +1,130 @@
+"""RSS/Atom-ленты и sitemap опубликованных статей.
+
+Документы отдаются через ``cache.cache_document``: собираются один раз после
+изменения статей и затем выдаются из кэша, а на условный GET краулер получает
+304 без обращения к базе.
+
+Статьи в sitemap разбиты на файлы по диапазонам ``id`` (``SITEMAP_SHARD_SIZE``
+на файл — предел протокола): статья всегда попадает в один и тот же файл, и при
+её изменении пересобирается только он и индекс.
+"""
+from django.contrib.syndication.views import Feed
+from django.db.models import F, Max, Q
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+
+from .models import Article, Category
+
+SITE_TITLE = 'Dev Notes'
+FEED_ITEMS = 20
+SITEMAP_SHARD_SIZE = 50_000
+
+
+def sitemap_shard(article_id):
+    return article_id // SITEMAP_SHARD_SIZE
+
+
+def sitemap_group(shard):
+    """Группа кэша файла sitemap, в который попадает статья."""
+    return f'sitemap:{shard}'
+
+
+def _published():
+    return Article.objects.filter(status=Article.Status.PUBLISHED)
+
+
+class LatestArticlesFeed(Feed):
+    title = SITE_TITLE
+    description = 'Новые статьи блога'
+    language = 'ru'
+
+    def link(self):
+        return reverse('blog:index')
+
+    def articles(self):
+        return _published().select_related('author', 'category').only(
+            'title', 'slug', 'description', 'excerpt', 'created_at', 'updated_at',
+            'author__username', 'category__name',
+        ).order_by('-created_at', '-pk')
+
+    def items(self):
+        return self.articles()[:FEED_ITEMS]
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.description or item.excerpt
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_categories(self, item):
+        return [item.category.name] if item.category_id else []
+
+
+class LatestArticlesAtomFeed(LatestArticlesFeed):
+    feed_type = Atom1Feed
+    subtitle = LatestArticlesFeed.description
+
+
+class CategoryFeed(LatestArticlesFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Category, slug=slug)
+
+    def title(self, obj):
+        return f'{SITE_TITLE}: {obj.name}'
+
+    def description(self, obj):
+        return f'Новые статьи в категории «{obj.name}»'
+
+    def link(self, obj):
+        return reverse('blog:article_list') + f'?category={obj.slug}'
+
+    def items(self, obj):
+        return self.articles().filter(category=obj)[:FEED_ITEMS]
+
+
+def sitemap_shards():
+    """Номера файлов sitemap со статьями и дата последнего изменения в каждом — одним запросом."""
+    return list(
+        _published()
+        .annotate(shard=F('id') / SITEMAP_SHARD_SIZE)
+        .values('shard')
+        .annotate(lastmod=Max('updated_at'))
+        .values_list('shard', 'lastmod')
+        .order_by('shard')
+    )
+
+
+def sitemap_articles(shard):
+    """Адреса и даты изменения опубликованных статей одного файла sitemap."""
+    articles = _published().filter(
+        id__gte=shard * SITEMAP_SHARD_SIZE,
+        id__lt=(shard + 1) * SITEMAP_SHARD_SIZE,
+    ).values_list('slug', 'updated_at').order_by('id')
+    return [
+        {'location': reverse('blog:article_detail', kwargs={'slug': slug}), 'lastmod': updated_at}
+        for slug, updated_at in articles
+    ]
+
+
+def sitemap_pages():
+    """Главная, список статей и страницы категорий; lastmod — по их свежим статьям."""
+    categories = list(Category.objects.annotate(
+        lastmod=Max('articles__updated_at', filter=Q(articles__status=Article.Status.PUBLISHED)),
+    ).filter(lastmod__isnull=False).values_list('slug', 'lastmod').order_by('slug'))
+    latest = max((lastmod for _, lastmod in categories), default=None)
+    list_url = reverse('blog:article_list')
+    return [
+        {'location': reverse('blog:index'), 'lastmod': latest},
+        {'location': list_url, 'lastmod': latest},
+        *({'location': f'{list_url}?category={slug}', 'lastmod': lastmod} for slug, lastmod in categories),
+    ]
@@ -1,4 +1,9 @@
+import re
+
 from django import forms
+from django.db import IntegrityError, transaction
+from django.db.models import Count, IntegerField, Max, Q
+from django.db.models.functions import Cast, Substr
 from django.utils.text import slugify
 from unidecode import unidecode
 
@@ -45,14 +50,44 @@ class ArticleForm(forms.ModelForm):
             }),
         }
 
+    # Сколько раз подбирать slug заново, если параллельный запрос занял его раньше
+    SLUG_ATTEMPTS = 5
+    # Запас длины под суффикс «-N»
+    SLUG_SUFFIX_RESERVE = 10
+
     def generate_unique_slug(self):
-        """Генерирует уникальный slug из title."""
-        base_slug = slugify(unidecode(self.cleaned_data['title']))
+        """Генерирует уникальный slug из title одним запросом к базе.
+
+        Занятые варианты — сам base_slug и base_slug-N; следующий суффикс
+        берётся как максимальный занятый плюс один.
+        """
+        max_length = Article._meta.get_field('slug').max_length
+        base_slug = slugify(unidecode(self.cleaned_data['title']))[:max_length - self.SLUG_SUFFIX_RESERVE].strip('-')
         if not base_slug:
             base_slug = 'article'
-        slug = base_slug
-        counter = 1
-        while Article.objects.filter(slug=slug).exclude(pk=self.instance.pk if self.instance.pk else None).exists():
-            slug = f'{base_slug}-{counter}'
-            counter += 1
-        return slug
+
+        suffixed = Q(slug__startswith=f'{base_slug}-', slug__regex=rf'^{re.escape(base_slug)}-[0-9]{{1,9}}$')
+        taken = Article.objects.filter(Q(slug=base_slug) | suffixed).exclude(pk=self.instance.pk).aggregate(
+            base=Count('pk', filter=Q(slug=base_slug)),
+            suffix=Max(Cast(Substr('slug', len(base_slug) + 2), IntegerField()), filter=suffixed),
+        )
+        if not taken['base'] and taken['suffix'] is None:
+            return base_slug
+        return f'{base_slug}-{(taken["suffix"] or 0) + 1}'
+
+    def save_with_unique_slug(self, article):
+        """Сохраняет статью под новым slug.
+
+        Два одновременных запроса могут выбрать один и тот же slug: проигравший
+        получает IntegrityError на уникальном индексе и подбирает slug заново.
+        """
+        for attempt in range(self.SLUG_ATTEMPTS):
+            article.slug = self.generate_unique_slug()
+            try:
+                with transaction.atomic():
+                    article.save()
+                return article
+            except IntegrityError:
+                conflict = Article.objects.filter(slug=article.slug).exclude(pk=article.pk).exists()
+                if not conflict or attempt == self.SLUG_ATTEMPTS - 1:
+                    raise
@@ -0,0 +1,82 @@
+"""Производные изображения статей для адаптивной разметки.
+
+После загрузки обложки создаются уменьшенные копии фиксированной ширины
+в AVIF, WebP и JPEG (форматы, которые не поддерживает текущая сборка Pillow,
+пропускаются). Описание копий хранится в ``Article.image_variants``::
+
+    {"source": "blog/images/cover.png", "width": 2400, "height": 1350,
+     "formats": {"avif": [[480, "blog/images/derivatives/cover-480w.avif"], ...], ...}}
+"""
+import hashlib
+import io
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+WIDTHS = (480, 960, 1600)
+DERIVATIVES_DIR = 'blog/images/derivatives'
+
+# Порядок важен: браузер берёт первый поддерживаемый <source>, JPEG — запасной вариант
+FORMATS = {
+    'avif': {'pil_format': 'AVIF', 'mime': 'image/avif', 'options': {'quality': 55}},
+    'webp': {'pil_format': 'WEBP', 'mime': 'image/webp', 'options': {'quality': 80, 'method': 4}},
+    'jpeg': {'pil_format': 'JPEG', 'mime': 'image/jpeg', 'options': {'quality': 82, 'optimize': True, 'progressive': True}},
+}
+FALLBACK_FORMAT = 'jpeg'
+
+
+def available_formats():
+    return [fmt for fmt in FORMATS if fmt == FALLBACK_FORMAT or features.check(fmt)]
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    buffer = io.BytesIO()
+    image.save(buffer, FORMATS[fmt]['pil_format'], **FORMATS[fmt]['options'])
+    return buffer.getvalue()
+
+
+def generate(field_file):
+    """Создаёт копии изображения в хранилище и возвращает их описание."""
+    storage = field_file.storage
+    with field_file.open('rb') as source:
+        image = ImageOps.exif_transpose(Image.open(source))
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() or image.mode == 'P' else 'RGB')
+
+    stem = PurePosixPath(field_file.name).stem
+    digest = hashlib.sha1(field_file.name.encode()).hexdigest()[:8]
+    widths = sorted({min(width, image.width) for width in WIDTHS})
+    formats = {}
+
+    for width in widths:
+        resized = image
+        if width < image.width:
+            resized = image.resize((width, round(image.height * width / image.width)), Image.Resampling.LANCZOS)
+        for fmt in available_formats():
+            name = f'{DERIVATIVES_DIR}/{stem}-{digest}-{width}w.{fmt}'
+            name = storage.save(name, ContentFile(_encode(resized, fmt)))
+            formats.setdefault(fmt, []).append([width, name])
+
+    return {
+        'source': field_file.name,
+        'width': image.width,
+        'height': image.height,
+        'formats': formats,
+    }
+
+
+def delete(variants, storage):
+    """Удаляет копии, перечисленные в описании."""
+    for derivatives in variants.get('formats', {}).values():
+        for _, name in derivatives:
+            storage.delete(name)
+
+
+def srcset(variants, fmt, storage):
+    return ', '.join(
+        f'{storage.url(name)} {width}w' for width, name in variants.get('formats', {}).get(fmt, [])
+    )
@@ -0,0 +1,94 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import override_settings
+from django.utils import timezone
+
+from apps.blog import export
+
+
+class Command(BaseCommand):
+    help = (
+        'Рендерит главную, страницы списка статей и все опубликованные статьи в статические '
+        'файлы с копиями .gz/.br и manifest.json. С --incremental пересобирает только страницы, '
+        'затронутые статьями, изменёнными после прошлого запуска.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            default=settings.BLOG_EXPORT_ROOT,
+            help=f'Каталог экспорта (по умолчанию {settings.BLOG_EXPORT_ROOT}).',
+        )
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Процессов рендера; 1 — в текущем процессе (по умолчанию число CPU).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Страниц в одной задаче процесса (по умолчанию 50).',
+        )
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Пересобрать только изменившееся с прошлого запуска (по manifest.json).',
+        )
+
+    def handle(self, *args, output, processes, chunk_size, incremental, **options):
+        if processes < 1 or chunk_size < 1:
+            raise CommandError('--processes и --chunk-size должны быть положительными.')
+        root = Path(output)
+        started = time.perf_counter()
+        # Время фиксируется до чтения статей: правки во время экспорта попадут в следующий запуск
+        started_at = timezone.now()
+
+        previous = export.read_manifest(root) if incremental else None
+        if incremental and previous is None:
+            self.stdout.write('manifest.json не найден — полный экспорт.')
+        urls, stale, articles = export.plan(previous)
+
+        urls = sorted(urls)
+        chunks = [urls[i:i + chunk_size] for i in range(0, len(urls), chunk_size)]
+        pages = dict(previous['pages']) if previous else {}
+        written, errors = 0, {}
+        for entries, chunk_written, chunk_errors in self.render(root, chunks, processes):
+            pages.update(entries)
+            written += chunk_written
+            errors.update(chunk_errors)
+
+        for url in stale:
+            export.remove_page(root, pages.pop(url))
+        export.write_manifest(root, started_at, pages, articles)
+
+        elapsed = time.perf_counter() - started
+        size = sum(entry['size'] for entry in pages.values())
+        compressed = sum(entry.get('gzip', entry['size']) for entry in pages.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Отрендерено {len(urls) - len(errors)} страниц, изменено файлов {written}, удалено {len(stale)}; '
+            f'всего в экспорте {len(pages)} страниц, {size / 1024:.0f} КБ ({compressed / 1024:.0f} КБ gzip). '
+            f'Время: {elapsed:.2f} с.'
+        ))
+        if not export.brotli:
+            self.stdout.write(self.style.WARNING('Пакет brotli не установлен — копии .br не созданы.'))
+        for url, status in sorted(errors.items()):
+            self.stdout.write(self.style.WARNING(f'{url}: ответ {status}, страница пропущена.'))
+
+    def render(self, root, chunks, processes):
+        if processes == 1 or len(chunks) <= 1:
+            with override_settings(BLOG_PAGE_CACHE=False, PERF_INSTRUMENTATION=False):
+                for chunk in chunks:
+                    yield export.render_pages(root, chunk)
+            return
+        # Дочерние процессы не должны унаследовать открытые соединения с базой
+        connections.close_all()
+        with ProcessPoolExecutor(max_workers=processes, initializer=export.init_worker) as pool:
+            yield from pool.map(export.render_pages, [root] * len(chunks), chunks)
@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from apps.blog.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Создаёт уменьшенные копии обложек статей, у которых их нет или они устарели.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересоздать копии для всех статей с обложкой.',
+        )
+
+    def handle(self, *args, force=False, **options):
+        articles = Article.objects.exclude(Q(image='') | Q(image__isnull=True)).only(
+            'pk', 'image', 'image_variants', 'status', 'slug', 'category_id',
+        ).order_by('pk')
+        generated = 0
+
+        for article in articles.iterator(chunk_size=100):
+            if article.refresh_image_variants(force=force):
+                generated += 1
+                self.stdout.write(f'{article.image.name}: форматов {len(article.image_variants["formats"])}')
+
+        self.stdout.write(self.style.SUCCESS(f'Обработано обложек: {generated}.'))
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from apps.blog import related
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает сигнатуры опубликованных статей и списки похожих статей с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество статей, читаемых из базы за раз (по умолчанию 500).',
+        )
+
+    def handle(self, *args, batch_size=500, **options):
+        started = time.perf_counter()
+        count = related.rebuild(batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Статей: {count}, соседей у каждой: до {related.TOP_K}, время: {elapsed:.2f} с.'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.blog import search
+from apps.blog.models import Article
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс статей с нуля.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Количество статей, читаемых из базы за раз (по умолчанию 500).',
+        )
+
+    def handle(self, *args, batch_size=500, **options):
+        backend = search.get_backend()
+        articles = Article.objects.only(
+            'pk', 'title', 'description', 'content', *Article.DERIVED_FIELDS
+        ).order_by('pk')
+        indexed = 0
+
+        with transaction.atomic():
+            backend.clear()
+            for article in articles.iterator(chunk_size=batch_size):
+                article.refresh_derived_fields()
+                backend.index(article)
+                indexed += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Бэкенд: {type(backend).__name__}, проиндексировано статей: {indexed}.'
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog import stats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает материализованные счётчики статей и исправляет расхождения.'
+
+    def handle(self, *args, **options):
+        fixed = stats.reconcile()
+        for row in fixed:
+            self.stdout.write(f'Исправлено: {row}')
+        self.stdout.write(self.style.SUCCESS(f'Строк исправлено: {len(fixed)}.'))
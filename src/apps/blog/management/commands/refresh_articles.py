@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+
+from apps.blog.models import Article
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает производные поля статей (HTML, оглавление, количество слов, '
+        'время чтения, отрывок) для строк, устаревших после правки текста или рендерера.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Пересчитать все статьи, а не только устаревшие.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Количество статей в одном UPDATE (по умолчанию 200).',
+        )
+
+    def handle(self, *args, force=False, batch_size=200, **options):
+        articles = Article.objects.only('pk', 'content', *Article.DERIVED_FIELDS).order_by('pk')
+        batch = []
+        checked = refreshed = 0
+
+        for article in articles.iterator(chunk_size=batch_size):
+            checked += 1
+            if article.refresh_derived_fields(force=force):
+                batch.append(article)
+            if len(batch) >= batch_size:
+                refreshed += Article.objects.bulk_update(batch, Article.DERIVED_FIELDS)
+                batch = []
+
+        if batch:
+            refreshed += Article.objects.bulk_update(batch, Article.DERIVED_FIELDS)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено статей: {checked}, пересчитано: {refreshed}.'
+        ))
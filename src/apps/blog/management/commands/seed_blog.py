@@ -0,0 +1,226 @@
+import io
+import random
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from PIL import Image, ImageDraw
+
+from apps.blog import cache, stats
+from apps.blog.models import Article, Category
+from apps.core.models import UserProfile
+
+User = get_user_model()
+
+# Всё, что создаёт команда, помечено префиксом — так его можно удалить через --clear
+PREFIX = 'seed'
+IMAGES_DIR = 'blog/seed'
+PASSWORD = 'password'
+
+TOPICS = [
+    'Python', 'Django', 'PostgreSQL', 'SQLite', 'Кэширование', 'Профилирование',
+    'Тестирование', 'Деплой', 'Архитектура', 'Инструменты', 'Асинхронность', 'Безопасность',
+]
+TITLE_PATTERNS = [
+    'Как мы ускорили {topic} в {n} раз',
+    '{topic}: заметки после года в продакшене',
+    'Практическое введение в {topic}',
+    'Пять ошибок, которые мы сделали с {topic}',
+    '{topic} без магии: разбор по шагам',
+    'Почему {topic} тормозит и что с этим делать',
+]
+WORDS = [
+    'запрос', 'индекс', 'кэш', 'страница', 'модель', 'шаблон', 'база', 'данных', 'миграция',
+    'сервер', 'клиент', 'задержка', 'нагрузка', 'профиль', 'метрика', 'тест', 'релиз', 'очередь',
+    'воркер', 'транзакция', 'блокировка', 'строка', 'колонка', 'план', 'выполнение', 'память',
+    'процесс', 'поток', 'соединение', 'ответ', 'заголовок', 'быстро', 'медленно', 'стабильно',
+    'просто', 'аккуратно', 'заметно', 'всегда', 'иногда', 'обычно', 'сразу',
+]
+CODE_SNIPPETS = [
+    ('python', 'def fetch(pk):\n    article = Article.objects.select_related("author").get(pk=pk)\n    return article.title\n'),
+    ('python', 'for chunk in queryset.iterator(chunk_size=500):\n    process(chunk)\n'),
+    ('sql', 'SELECT id, title\nFROM blog_article\nWHERE status = \'published\'\nORDER BY created_at DESC\nLIMIT 9;\n'),
+    ('bash', 'python manage.py migrate\npython manage.py runserver 0.0.0.0:8000\n'),
+    ('javascript', 'const response = await fetch("/articles/?q=django");\nconsole.log(response.status);\n'),
+]
+PALETTE = ['#0f1115', '#131a23', '#77f2c1', '#78a7ff', '#e6e9ef', '#f2c177']
+
+
+def _sentence(rng, words=(6, 16)):
+    text = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(*words)))
+    return text[0].upper() + text[1:] + '.'
+
+
+def _paragraph(rng):
+    return ' '.join(_sentence(rng) for _ in range(rng.randint(3, 6)))
+
+
+def markdown_body(rng, image_urls, sections=(3, 7)):
+    """Текст статьи: разделы с абзацами, списками, цитатами, кодом и картинками."""
+    blocks = [_paragraph(rng)]
+    for number in range(1, rng.randint(*sections) + 1):
+        blocks.append(f'## Раздел {number}. {_sentence(rng, (2, 5))[:-1]}')
+        blocks += [_paragraph(rng) for _ in range(rng.randint(1, 3))]
+        extra = rng.random()
+        if extra < 0.35:
+            language, code = rng.choice(CODE_SNIPPETS)
+            blocks.append(f'```{language}\n{code}```')
+        elif extra < 0.55 and image_urls:
+            blocks.append(f'![{_sentence(rng, (2, 4))[:-1]}]({rng.choice(image_urls)})')
+        elif extra < 0.75:
+            blocks.append('\n'.join(f'- {_sentence(rng, (3, 8))}' for _ in range(rng.randint(3, 5))))
+        elif extra < 0.85:
+            blocks.append(f'> {_sentence(rng)}')
+        if rng.random() < 0.3:
+            blocks.append(f'### {_sentence(rng, (2, 4))[:-1]}\n\n{_paragraph(rng)}')
+    return '\n\n'.join(blocks) + '\n'
+
+
+def placeholder_image(rng, width=1600, height=900):
+    """PNG с градиентными полосами — обложка или иллюстрация в тексте."""
+    image = Image.new('RGB', (width, height), rng.choice(PALETTE))
+    draw = ImageDraw.Draw(image)
+    for _ in range(12):
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.rectangle([x, y, x + rng.randint(80, 600), y + rng.randint(20, 200)], fill=rng.choice(PALETTE))
+    buffer = io.BytesIO()
+    image.save(buffer, 'PNG', optimize=True)
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Заполняет базу синтетическими пользователями, категориями, статьями и черновиками '
+        'для нагрузочного тестирования. Данные воспроизводимы при одинаковом --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=20, help='Количество авторов (по умолчанию 20).')
+        parser.add_argument('--categories', type=int, default=8, help='Количество категорий (по умолчанию 8).')
+        parser.add_argument('--articles', type=int, default=500, help='Опубликованных статей (по умолчанию 500).')
+        parser.add_argument('--drafts', type=int, default=50, help='Черновиков (по умолчанию 50).')
+        parser.add_argument('--images', type=int, default=6, help='Картинок для текста статей (по умолчанию 6).')
+        parser.add_argument(
+            '--cover-ratio',
+            type=float,
+            default=0.0,
+            help='Доля статей с обложкой, 0..1 (по умолчанию 0: копии обложек строятся долго).',
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Зерно генератора (по умолчанию 42).')
+        parser.add_argument('--batch-size', type=int, default=200, help='Строк в одном INSERT (по умолчанию 200).')
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Удалить ранее сгенерированные данные перед заполнением.',
+        )
+
+    def handle(self, *args, **options):
+        if not 0 <= options['cover_ratio'] <= 1:
+            raise CommandError('--cover-ratio должен быть в диапазоне от 0 до 1.')
+        if options['articles'] + options['drafts'] and not (options['users'] and options['categories']):
+            raise CommandError('Для статей нужны хотя бы один автор и одна категория.')
+
+        rng = random.Random(options['seed'])
+        if options['clear']:
+            self.clear()
+        elif User.objects.filter(username__startswith=f'{PREFIX}-').exists():
+            raise CommandError('Синтетические данные уже есть в базе — запустите с --clear.')
+
+        image_names = [
+            default_storage.save(f'{IMAGES_DIR}/image-{i}.png', ContentFile(placeholder_image(rng)))
+            for i in range(options['images'])
+        ]
+        image_urls = [default_storage.url(name) for name in image_names]
+
+        with transaction.atomic():
+            users = self.create_users(options['users'], options['batch_size'])
+            categories = self.create_categories(rng, options['categories'])
+            articles = self.create_articles(rng, users, categories, image_urls, options)
+
+        # bulk_create не вызывает сигналы: индекс, счётчики и кэш страниц обновляем целиком
+        call_command('rebuild_search_index', stdout=self.stdout)
+        call_command('rebuild_related', stdout=self.stdout)
+        stats.reconcile()
+        cache.invalidate('home', 'list', *(f'category:{category.pk}' for category in categories))
+
+        covered = [
+            article for article in articles
+            if image_names and article.status == Article.Status.PUBLISHED and rng.random() < options['cover_ratio']
+        ]
+        for article in covered:
+            article.image.name = rng.choice(image_names)
+        if covered:
+            Article.objects.bulk_update(covered, ['image'], batch_size=options['batch_size'])
+        # Копии пишутся, только если обложка уже в базе
+        for article in covered:
+            article.refresh_image_variants()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано: авторов {len(users)}, категорий {len(categories)}, '
+            f'статей {options["articles"]}, черновиков {options["drafts"]}, '
+            f'картинок {len(image_names)}, обложек {len(covered)}. Пароль авторов: «{PASSWORD}».'
+        ))
+
+    def clear(self):
+        with transaction.atomic():
+            Article.objects.filter(author__username__startswith=f'{PREFIX}-').delete()
+            Category.objects.filter(slug__startswith=f'{PREFIX}-').delete()
+            User.objects.filter(username__startswith=f'{PREFIX}-').delete()
+        _, files = default_storage.listdir(IMAGES_DIR) if default_storage.exists(IMAGES_DIR) else ([], [])
+        for name in files:
+            default_storage.delete(f'{IMAGES_DIR}/{name}')
+
+    def create_users(self, count, batch_size):
+        # Хеш пароля считается один раз: PBKDF2 на каждого пользователя занял бы минуты
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            [
+                User(username=f'{PREFIX}-user-{i}', first_name=f'Автор {i}', password=password)
+                for i in range(count)
+            ],
+            batch_size=batch_size,
+        )
+        UserProfile.objects.bulk_create(
+            [UserProfile(user=user, bio=f'Синтетический автор №{i}.') for i, user in enumerate(users)],
+            batch_size=batch_size,
+        )
+        return users
+
+    def create_categories(self, rng, count):
+        topics = rng.sample(TOPICS, min(count, len(TOPICS)))
+        topics += [f'Тема {i}' for i in range(len(topics), count)]
+        return Category.objects.bulk_create(
+            Category(name=name, slug=f'{PREFIX}-category-{i}') for i, name in enumerate(topics)
+        )
+
+    def create_articles(self, rng, users, categories, image_urls, options):
+        now = timezone.now()
+        total = options['articles'] + options['drafts']
+        articles = []
+        for i in range(total):
+            category = rng.choice(categories)
+            article = Article(
+                title=rng.choice(TITLE_PATTERNS).format(topic=category.name, n=rng.randint(2, 40))[:100],
+                slug=f'{PREFIX}-article-{i}',
+                category=category,
+                author=rng.choice(users),
+                description=_sentence(rng) if rng.random() < 0.6 else '',
+                content=markdown_body(rng, image_urls),
+                status=Article.Status.PUBLISHED if i < options['articles'] else Article.Status.DRAFT,
+            )
+            article.refresh_derived_fields()
+            articles.append(article)
+
+        articles = Article.objects.bulk_create(articles, batch_size=options['batch_size'])
+        # auto_now_add перезаписывает даты при вставке — разносим статьи по последним двум годам
+        for article in articles:
+            article.created_at = now - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60))
+            article.updated_at = min(now, article.created_at + timedelta(minutes=rng.randint(0, 30 * 24 * 60)))
+        Article.objects.bulk_update(articles, ['created_at', 'updated_at'], batch_size=options['batch_size'])
+        return articles
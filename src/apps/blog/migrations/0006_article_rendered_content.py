@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0005_article_description"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="content_hash",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Хеш Markdown-текста и версии рендерера",
+                max_length=64,
+                verbose_name="Хеш содержимого",
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="content_html",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="HTML статьи"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="content_toc",
+            field=models.TextField(
+                blank=True, default="", editable=False, verbose_name="Оглавление"
+            ),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0006_article_rendered_content"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="excerpt",
+            field=models.CharField(
+                blank=True,
+                default="",
+                editable=False,
+                help_text="Начало статьи простым текстом для карточек и meta-описаний",
+                max_length=300,
+                verbose_name="Отрывок",
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="reading_time",
+            field=models.PositiveSmallIntegerField(
+                default=1, editable=False, verbose_name="Время чтения, мин"
+            ),
+        ),
+        migrations.AddField(
+            model_name="article",
+            name="word_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество слов"
+            ),
+        ),
+    ]
@@ -0,0 +1,84 @@
+# Generated by Django 6.0.2 on 2026-10-18 10:40
+
+from html import unescape
+
+from django.db import migrations, utils
+from django.utils.html import strip_tags
+
+SQLITE_TABLE = "blog_article_fts"
+POSTGRES_TABLE = "blog_article_search"
+
+
+def _documents(Article):
+    for pk, title, description, content, content_html in Article.objects.values_list(
+        "pk", "title", "description", "content", "content_html"
+    ).iterator():
+        body = unescape(strip_tags(content_html)) if content_html else content
+        yield pk, title, description, " ".join(body.split())
+
+
+def create_search_index(apps, schema_editor):
+    Article = apps.get_model("blog", "Article")
+    connection = schema_editor.connection
+
+    if connection.vendor == "sqlite":
+        try:
+            schema_editor.execute(
+                f"CREATE VIRTUAL TABLE {SQLITE_TABLE} USING fts5("
+                "title, description, body, "
+                "tokenize = 'porter unicode61 remove_diacritics 2')"
+            )
+        except utils.OperationalError:
+            # SQLite собран без FTS5 — поиск останется на icontains
+            return
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {SQLITE_TABLE} (rowid, title, description, body) "
+                "VALUES (%s, %s, %s, %s)",
+                list(_documents(Article)),
+            )
+
+    elif connection.vendor == "postgresql":
+        schema_editor.execute(
+            f"CREATE TABLE {POSTGRES_TABLE} ("
+            "article_id bigint PRIMARY KEY REFERENCES blog_article (id) "
+            "ON DELETE CASCADE DEFERRABLE INITIALLY DEFERRED, "
+            "body text NOT NULL, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            f"CREATE INDEX {POSTGRES_TABLE}_document_idx "
+            f"ON {POSTGRES_TABLE} USING gin (document)"
+        )
+        with connection.cursor() as cursor:
+            for pk, title, description, body in _documents(Article):
+                cursor.execute(
+                    f"INSERT INTO {POSTGRES_TABLE} (article_id, body, document) VALUES "
+                    "(%(pk)s, %(body)s, "
+                    "setweight(to_tsvector('russian', %(title)s), 'A') || "
+                    "setweight(to_tsvector('english', %(title)s), 'A') || "
+                    "setweight(to_tsvector('russian', %(description)s), 'B') || "
+                    "setweight(to_tsvector('english', %(description)s), 'B') || "
+                    "setweight(to_tsvector('russian', %(body)s), 'C') || "
+                    "setweight(to_tsvector('english', %(body)s), 'C'))",
+                    {"pk": pk, "title": title, "description": description, "body": body},
+                )
+
+
+def drop_search_index(apps, schema_editor):
+    table = {"sqlite": SQLITE_TABLE, "postgresql": POSTGRES_TABLE}.get(
+        schema_editor.connection.vendor
+    )
+    if table:
+        schema_editor.execute(f"DROP TABLE IF EXISTS {table}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0007_article_derived_fields"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0008_article_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["status", "-created_at"], name="blog_art_status_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["category", "status", "-created_at"],
+                name="blog_art_cat_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["author", "status", "-created_at"],
+                name="blog_art_author_status_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                fields=["author", "status", "-updated_at"],
+                name="blog_art_author_updated_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="article",
+            index=models.Index(
+                condition=models.Q(("status", "published")),
+                fields=["-created_at", "-id"],
+                name="blog_art_published_idx",
+            ),
+        ),
+    ]
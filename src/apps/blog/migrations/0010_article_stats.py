@@ -0,0 +1,110 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:20
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Article = apps.get_model("blog", "Article")
+    ArticleStats = apps.get_model("blog", "ArticleStats")
+    Category = apps.get_model("blog", "Category")
+
+    published = Article.objects.filter(status="published")
+    by_author = published.values_list("author").annotate(n=Count("pk")).order_by()
+    by_category = published.values_list("category").annotate(n=Count("pk")).order_by()
+
+    rows = [
+        ArticleStats(scope="author", object_id=pk, articles=n) for pk, n in by_author
+    ]
+    rows += [
+        ArticleStats(scope="category", object_id=pk, articles=n)
+        for pk, n in by_category
+    ]
+    rows.append(
+        ArticleStats(
+            scope="site",
+            object_id=0,
+            articles=published.count(),
+            authors=len(by_author),
+            categories=Category.objects.count(),
+        )
+    )
+    ArticleStats.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0009_article_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleStats",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "scope",
+                    models.CharField(
+                        choices=[
+                            ("site", "Сайт"),
+                            ("category", "Категория"),
+                            ("author", "Автор"),
+                        ],
+                        max_length=10,
+                        verbose_name="Область",
+                    ),
+                ),
+                (
+                    "object_id",
+                    models.PositiveBigIntegerField(
+                        default=0,
+                        help_text="0 для счётчиков всего сайта",
+                        verbose_name="ID категории или автора",
+                    ),
+                ),
+                (
+                    "articles",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Опубликовано статей"
+                    ),
+                ),
+                (
+                    "authors",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Только для счётчиков сайта",
+                        verbose_name="Авторов с публикациями",
+                    ),
+                ),
+                (
+                    "categories",
+                    models.PositiveIntegerField(
+                        default=0,
+                        help_text="Только для счётчиков сайта",
+                        verbose_name="Категорий",
+                    ),
+                ),
+                ("updated_at", models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                "verbose_name": "Статистика",
+                "verbose_name_plural": "Статистика",
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("scope", "object_id"),
+                        name="blog_stats_scope_object_uniq",
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
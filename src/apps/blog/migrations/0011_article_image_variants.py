@@ -0,0 +1,24 @@
+# Generated by Django 6.0.2 on 2026-10-18 11:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0010_article_stats"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                help_text="Уменьшенные копии обложки для srcset",
+                verbose_name="Копии изображения",
+            ),
+        ),
+    ]
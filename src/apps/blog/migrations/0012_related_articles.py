@@ -0,0 +1,95 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0011_article_image_variants"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleSignature",
+            fields=[
+                (
+                    "article",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="signature",
+                        serialize=False,
+                        to="blog.article",
+                        verbose_name="Статья",
+                    ),
+                ),
+                (
+                    "terms",
+                    models.JSONField(
+                        default=dict,
+                        help_text="Взвешенные частоты самых частых терминов заголовка, описания и текста",
+                        verbose_name="Термины",
+                    ),
+                ),
+                (
+                    "source_hash",
+                    models.CharField(
+                        help_text="Хеш заголовка, описания и текста, по которым посчитаны термины",
+                        max_length=64,
+                        verbose_name="Хеш источника",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Сигнатура статьи",
+                "verbose_name_plural": "Сигнатуры статей",
+            },
+        ),
+        migrations.CreateModel(
+            name="RelatedArticle",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("rank", models.PositiveSmallIntegerField(verbose_name="Место")),
+                ("score", models.FloatField(verbose_name="Косинусная близость")),
+                (
+                    "article",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_links",
+                        to="blog.article",
+                        verbose_name="Статья",
+                    ),
+                ),
+                (
+                    "related",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="related_to",
+                        to="blog.article",
+                        verbose_name="Похожая статья",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Похожая статья",
+                "verbose_name_plural": "Похожие статьи",
+                "ordering": ["article", "rank"],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("article", "rank"),
+                        name="blog_related_article_rank_uniq",
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0012_related_articles"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="article",
+            name="revision",
+            field=models.PositiveIntegerField(
+                default=0,
+                editable=False,
+                help_text="Растёт при каждом сохранении из редактора; автосохранение принимает правку только от текущей ревизии",
+                verbose_name="Ревизия",
+            ),
+        ),
+    ]
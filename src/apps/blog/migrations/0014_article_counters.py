@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0013_article_revision"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArticleCounters",
+            fields=[
+                (
+                    "article",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name="counters",
+                        serialize=False,
+                        to="blog.article",
+                        verbose_name="Статья",
+                    ),
+                ),
+                (
+                    "views",
+                    models.PositiveBigIntegerField(default=0, verbose_name="Просмотры"),
+                ),
+                (
+                    "reactions",
+                    models.PositiveIntegerField(default=0, verbose_name="Реакции"),
+                ),
+            ],
+            options={
+                "verbose_name": "Счётчики статьи",
+                "verbose_name_plural": "Счётчики статей",
+            },
+        ),
+    ]
@@ -1,8 +1,16 @@
-from django.db import models
+import math
+from html import unescape
+
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils.html import strip_tags
+from django.utils.safestring import mark_safe
+from django.utils.text import Truncator
 from apps.core.models import TimeStampedModel
 
+from . import cache, images, rendering
+
 
 
 User = get_user_model()
@@ -38,6 +46,22 @@ class Article(TimeStampedModel):
         verbose_name = 'Статья'
         verbose_name_plural = 'Статьи'
         ordering = ['-created_at']
+        indexes = [
+            # Лента и список статей: status + свежие сверху
+            models.Index(fields=['status', '-created_at'], name='blog_art_status_created_idx'),
+            # Фильтр по категории и похожие статьи
+            models.Index(fields=['category', 'status', '-created_at'], name='blog_art_cat_status_idx'),
+            # Профиль: опубликованные статьи автора и черновики по дате правки
+            models.Index(fields=['author', 'status', '-created_at'], name='blog_art_author_status_idx'),
+            models.Index(fields=['author', 'status', '-updated_at'], name='blog_art_author_updated_idx'),
+            # Частичный индекс только по опубликованным (SQLite, PostgreSQL);
+            # порядок совпадает с ключом курсорной пагинации
+            models.Index(
+                fields=['-created_at', '-id'],
+                condition=models.Q(status='published'),
+                name='blog_art_published_idx',
+            ),
+        ]
 
 
     title = models.CharField(
@@ -83,9 +107,332 @@ class Article(TimeStampedModel):
         choices=Status.choices,
         default=Status.DRAFT
     )
+    content_html = models.TextField(
+        verbose_name='HTML статьи',
+        blank=True,
+        default='',
+        editable=False,
+    )
+    content_toc = models.TextField(
+        verbose_name='Оглавление',
+        blank=True,
+        default='',
+        editable=False,
+    )
+    content_hash = models.CharField(
+        verbose_name='Хеш содержимого',
+        max_length=64,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Хеш Markdown-текста и версии рендерера',
+    )
+    word_count = models.PositiveIntegerField(
+        verbose_name='Количество слов',
+        default=0,
+        editable=False,
+    )
+    reading_time = models.PositiveSmallIntegerField(
+        verbose_name='Время чтения, мин',
+        default=1,
+        editable=False,
+    )
+    excerpt = models.CharField(
+        verbose_name='Отрывок',
+        max_length=300,
+        blank=True,
+        default='',
+        editable=False,
+        help_text='Начало статьи простым текстом для карточек и meta-описаний',
+    )
+    image_variants = models.JSONField(
+        verbose_name='Копии изображения',
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Уменьшенные копии обложки для srcset',
+    )
+    revision = models.PositiveIntegerField(
+        verbose_name='Ревизия',
+        default=0,
+        editable=False,
+        help_text='Растёт при каждом сохранении из редактора; автосохранение принимает правку только от текущей ревизии',
+    )
+
+    # Поля, вычисляемые из content при сохранении
+    DERIVED_FIELDS = [
+        'content_html', 'content_toc', 'content_hash',
+        'word_count', 'reading_time', 'excerpt',
+    ]
+    # Увеличить при изменении вычисления производных полей — все строки станут устаревшими
+    DERIVED_VERSION = 2
+    WORDS_PER_MINUTE = 200
+    EXCERPT_WORDS = 40
 
     def __str__(self):
         return self.title
 
+    def save(self, **kwargs):
+        # Производные поля пересчитываются только при изменении текста или рендерера
+        if self.refresh_derived_fields() and kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.DERIVED_FIELDS}
+        # Копии новой обложки создаются после коммита в фоне (apps.blog.signals), до тех пор — оригинал
+        super().save(**kwargs)
+
+    def _source_hash(self):
+        return rendering.content_hash(f'{self.DERIVED_VERSION}:{self.content}')
+
+    @property
+    def is_derived_stale(self):
+        return self.content_hash != self._source_hash()
+
+    def refresh_derived_fields(self, force=False):
+        """Пересчитывает HTML, оглавление и статистику. Возвращает True, если поля обновлены."""
+        if not force and not self.is_derived_stale:
+            return False
+        self.content_html, self.content_toc = rendering.render(self.content)
+        self.content_hash = self._source_hash()
+        self.refresh_text_stats()
+        return True
+
+    def refresh_text_stats(self):
+        """Число слов, время чтения и отрывок по ``content`` и ``content_html``."""
+        self.word_count = len(self.content.split())
+        self.reading_time = max(1, math.ceil(self.word_count / self.WORDS_PER_MINUTE))
+        self.excerpt = Truncator(self.plain_text()).words(self.EXCERPT_WORDS)[:300]
+
+    def plain_text(self):
+        """Текст статьи без разметки — для отрывка и поискового индекса."""
+        return ' '.join(unescape(strip_tags(self.content_html)).split())
+
+    @property
+    def is_image_variants_stale(self):
+        return (self.image.name or '') != self.image_variants.get('source', '')
+
+    @property
+    def current_image_variants(self):
+        """Копии текущей обложки; пока их нет (или они от прежней обложки) — пустой словарь."""
+        return {} if self.is_image_variants_stale else self.image_variants
+
+    def refresh_image_variants(self, force=False):
+        """Создаёт копии обложки, если она изменилась. Старые копии удаляются после коммита.
+
+        Копии записываются, только если обложка в базе всё ещё та же: иначе их
+        создаст обработка новой обложки.
+        """
+        if not force and not self.is_image_variants_stale:
+            return False
+        storage = self.image.storage
+        variants = images.generate(self.image) if self.image else {}
+        same_image = models.Q(image=self.image.name) if self.image else models.Q(image='') | models.Q(image__isnull=True)
+        if not type(self).objects.filter(same_image, pk=self.pk).update(image_variants=variants):
+            images.delete(variants, storage)
+            return False
+        previous, self.image_variants = self.image_variants, variants
+        if previous:
+            transaction.on_commit(lambda: images.delete(previous, storage))
+        if self.status == self.Status.PUBLISHED:
+            cache.invalidate('home', 'list', f'article:{self.slug}', f'category:{self.category_id}')
+        return True
+
+    @property
+    def engagement(self):
+        """Счётчики просмотров и реакций; у статьи без строки счётчиков — нули."""
+        try:
+            return self.counters
+        except ArticleCounters.DoesNotExist:
+            return ArticleCounters(article=self)
+
+    @property
+    def image_sources(self):
+        """Элементы <source> для <picture>: современные форматы в порядке предпочтения."""
+        storage, variants = self.image.storage, self.current_image_variants
+        return [
+            {'type': images.FORMATS[fmt]['mime'], 'srcset': images.srcset(variants, fmt, storage)}
+            for fmt in variants.get('formats', {})
+            if fmt != images.FALLBACK_FORMAT
+        ]
+
+    @property
+    def image_srcset(self):
+        return images.srcset(self.current_image_variants, images.FALLBACK_FORMAT, self.image.storage)
+
+    @property
+    def og_image_url(self):
+        """Самая крупная JPEG-копия обложки, без копий — оригинал."""
+        fallback = self.current_image_variants.get('formats', {}).get(images.FALLBACK_FORMAT)
+        if fallback:
+            return self.image.storage.url(fallback[-1][1])
+        return self.image.url
+
+    @property
+    def rendered_content(self):
+        """HTML статьи; устаревший HTML пересобирается на лету без сохранения."""
+        self.refresh_derived_fields()
+        return mark_safe(self.content_html)
+
     def get_absolute_url(self):
-        return reverse('blog:article_detail', kwargs={'slug': self.slug})
\ No newline at end of file
+        return reverse('blog:article_detail', kwargs={'slug': self.slug})
+
+class ArticleStats(models.Model):
+    """Материализованные счётчики опубликованных статей по сайту, категориям и авторам.
+
+    Поддерживаются сигналами при сохранении и удалении статей и категорий;
+    расхождения исправляет команда ``reconcile_stats``.
+    """
+
+    class Scope(models.TextChoices):
+        SITE = 'site', 'Сайт'
+        CATEGORY = 'category', 'Категория'
+        AUTHOR = 'author', 'Автор'
+
+    scope = models.CharField(
+        verbose_name='Область',
+        max_length=10,
+        choices=Scope.choices,
+    )
+    object_id = models.PositiveBigIntegerField(
+        verbose_name='ID категории или автора',
+        default=0,
+        help_text='0 для счётчиков всего сайта',
+    )
+    articles = models.PositiveIntegerField(
+        verbose_name='Опубликовано статей',
+        default=0,
+    )
+    authors = models.PositiveIntegerField(
+        verbose_name='Авторов с публикациями',
+        default=0,
+        help_text='Только для счётчиков сайта',
+    )
+    categories = models.PositiveIntegerField(
+        verbose_name='Категорий',
+        default=0,
+        help_text='Только для счётчиков сайта',
+    )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Статистика'
+        verbose_name_plural = 'Статистика'
+        constraints = [
+            models.UniqueConstraint(fields=['scope', 'object_id'], name='blog_stats_scope_object_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.get_scope_display()} #{self.object_id}: {self.articles}'
+
+    @classmethod
+    def get(cls, scope, object_id=0):
+        """Строка счётчиков; если её ещё нет — несохранённая строка с нулями."""
+        return (
+            cls.objects.filter(scope=scope, object_id=object_id).first()
+            or cls(scope=scope, object_id=object_id)
+        )
+
+    @classmethod
+    def site(cls):
+        return cls.get(cls.Scope.SITE)
+
+    @classmethod
+    async def aget(cls, scope, object_id=0):
+        return (
+            await cls.objects.filter(scope=scope, object_id=object_id).afirst()
+            or cls(scope=scope, object_id=object_id)
+        )
+
+    @classmethod
+    async def asite(cls):
+        return await cls.aget(cls.Scope.SITE)
+
+
+class ArticleSignature(models.Model):
+    """Частоты терминов статьи для поиска похожих (см. ``apps.blog.related``)."""
+
+    article = models.OneToOneField(
+        Article,
+        verbose_name='Статья',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='signature',
+    )
+    terms = models.JSONField(
+        verbose_name='Термины',
+        default=dict,
+        help_text='Взвешенные частоты самых частых терминов заголовка, описания и текста',
+    )
+    source_hash = models.CharField(
+        verbose_name='Хеш источника',
+        max_length=64,
+        help_text='Хеш заголовка, описания и текста, по которым посчитаны термины',
+    )
+
+    class Meta:
+        verbose_name = 'Сигнатура статьи'
+        verbose_name_plural = 'Сигнатуры статей'
+
+    def __str__(self):
+        return f'Сигнатура #{self.article_id}'
+
+
+class RelatedArticle(models.Model):
+    """Заранее посчитанные похожие статьи: top-K соседей каждой опубликованной статьи."""
+
+    article = models.ForeignKey(
+        Article,
+        verbose_name='Статья',
+        on_delete=models.CASCADE,
+        related_name='related_links',
+    )
+    related = models.ForeignKey(
+        Article,
+        verbose_name='Похожая статья',
+        on_delete=models.CASCADE,
+        related_name='related_to',
+    )
+    rank = models.PositiveSmallIntegerField(verbose_name='Место')
+    score = models.FloatField(verbose_name='Косинусная близость')
+
+    class Meta:
+        verbose_name = 'Похожая статья'
+        verbose_name_plural = 'Похожие статьи'
+        ordering = ['article', 'rank']
+        constraints = [
+            # Индекс (article, rank) — страница статьи читает соседей одним запросом по нему
+            models.UniqueConstraint(fields=['article', 'rank'], name='blog_related_article_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.article_id} → {self.related_id} ({self.score:.3f})'
+
+
+class ArticleCounters(models.Model):
+    """Просмотры и реакции статьи.
+
+    Отдельная таблица: сохранение статьи из редактора не перезаписывает
+    счётчики, а их запись не трогает ``updated_at``. Пишется только пачками
+    из ``apps.blog.counters``.
+    """
+
+    article = models.OneToOneField(
+        Article,
+        verbose_name='Статья',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='counters',
+    )
+    views = models.PositiveBigIntegerField(
+        verbose_name='Просмотры',
+        default=0,
+    )
+    reactions = models.PositiveIntegerField(
+        verbose_name='Реакции',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Счётчики статьи'
+        verbose_name_plural = 'Счётчики статей'
+
+    def __str__(self):
+        return f'#{self.article_id}: {self.views} просмотров, {self.reactions} реакций'
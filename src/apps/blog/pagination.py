@@ -0,0 +1,154 @@
+"""Постраничная навигация для длинных списков статей.
+
+``CursorPaginator`` листает queryset по ключу сортировки (keyset):
+каждая страница — это ``WHERE (created_at, id) < (...) ORDER BY ... LIMIT``,
+без ``COUNT(*)`` и ``OFFSET``, поэтому глубина страницы не влияет на стоимость
+запроса. Курсоры подписаны и непрозрачны для клиента.
+
+``CappedPaginator`` — обычный ``Paginator`` с ограниченным числом страниц:
+первые страницы по-прежнему доступны по номеру, а слишком глубокие номера
+сводятся к последней разрешённой странице вместо сканирования с большим OFFSET.
+"""
+import datetime
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class CappedPaginator(Paginator):
+    """Paginator, отдающий не больше ``max_pages`` страниц."""
+
+    def __init__(self, object_list, per_page, max_pages, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.max_pages = max_pages
+
+    @cached_property
+    def num_pages(self):
+        return min(super().num_pages, self.max_pages)
+
+    @property
+    def is_capped(self):
+        """Есть ли объекты за последней доступной по номеру страницей."""
+        return self.count > self.max_pages * self.per_page
+
+
+class CursorPage:
+    """Страница курсорной пагинации."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по уникальной комбинации полей сортировки."""
+
+    salt = 'blog.pagination.cursor'
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-pk')):
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = per_page
+        self.ordering = ordering
+
+    def _key(self, obj):
+        values = []
+        for field in self.ordering:
+            value = getattr(obj, field.lstrip('-'))
+            if isinstance(value, datetime.datetime):
+                value = value.isoformat()
+            values.append(value)
+        return values
+
+    def _encode(self, obj, direction):
+        return signing.dumps({'k': self._key(obj), 'd': direction}, salt=self.salt)
+
+    def _decode(self, cursor):
+        try:
+            data = signing.loads(cursor, salt=self.salt)
+            key, direction = data['k'], data['d']
+        except (signing.BadSignature, KeyError, TypeError):
+            return None, None
+        if len(key) != len(self.ordering) or direction not in ('next', 'prev'):
+            return None, None
+        return key, direction
+
+    def _after(self, key, backwards=False):
+        """Условие «строго после ключа» в порядке сортировки (или до него, если backwards)."""
+        condition = Q()
+        equal = {}
+        for field, value in zip(self.ordering, key):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != backwards
+            condition |= Q(**equal, **{f'{name}__{"lt" if descending else "gt"}': value})
+            equal[name] = value
+        return condition
+
+    def cursor_after(self, obj):
+        """Курсор на страницу, следующую за объектом."""
+        return self._encode(obj, 'next')
+
+    def _rows_query(self, cursor):
+        """Запрос строк страницы (на одну больше per_page, чтобы узнать о следующей)."""
+        key, direction = self._decode(cursor) if cursor else (None, None)
+        if direction == 'prev':
+            reverse_ordering = [f[1:] if f.startswith('-') else f'-{f}' for f in self.ordering]
+            queryset = self.queryset.filter(self._after(key, backwards=True)).order_by(*reverse_ordering)
+        else:
+            queryset = self.queryset.filter(self._after(key)) if key else self.queryset
+        return queryset[:self.per_page + 1], key, direction
+
+    def _build_page(self, rows, key, direction):
+        if direction == 'prev':
+            has_previous = len(rows) > self.per_page
+            items = rows[:self.per_page][::-1]
+            has_next = True
+        else:
+            has_next = len(rows) > self.per_page
+            items = rows[:self.per_page]
+            has_previous = key is not None
+
+        if not items:
+            return CursorPage([])
+        return CursorPage(
+            items,
+            next_cursor=self._encode(items[-1], 'next') if has_next else None,
+            previous_cursor=self._encode(items[0], 'prev') if has_previous else None,
+        )
+
+    def page(self, cursor=None):
+        """Возвращает страницу после (или перед) курсором; неверный курсор — первая страница."""
+        queryset, key, direction = self._rows_query(cursor)
+        return self._build_page(list(queryset), key, direction)
+
+    async def apage(self, cursor=None):
+        queryset, key, direction = self._rows_query(cursor)
+        return self._build_page([row async for row in queryset], key, direction)
+
+
+async def aget_page(paginator, number):
+    """``Paginator.get_page`` для async-view: COUNT и строки страницы читаются async ORM."""
+    paginator.count = await paginator.object_list.acount()
+    page = paginator.get_page(number)
+    page.object_list = [obj async for obj in page.object_list]
+    return page
@@ -0,0 +1,291 @@
+"""Похожие статьи по TF-IDF.
+
+Для каждой статьи хранится сигнатура (``ArticleSignature``) — взвешенные
+частоты терминов заголовка, описания и текста. Вектор статьи —
+``(1 + log tf) * idf``, нормированный по длине; близость — косинусная.
+Для каждой опубликованной статьи в ``RelatedArticle`` лежат ``TOP_K``
+ближайших соседей.
+
+``update`` пересчитывает соседей только для изменившихся статей и тех,
+в чьих списках они стоят или могут появиться; IDF при этом берётся по
+текущему корпусу, а списки остальных статей не трогаются, поэтому со
+временем веса немного расходятся с точными. Команда ``rebuild_related``
+пересчитывает всё заново.
+
+``update`` читает весь корпус, поэтому запрос его не ждёт: сохранение статьи
+только ставит её в очередь процесса (``QUEUE``, как счётчики в
+``apps.blog.counters``), а пересчёт идёт в потоке таймера через
+``BLOG_RELATED_UPDATE_DELAY`` секунд — одним ``update`` на все правки за это
+время. При аварийной остановке процесса очередь теряется; списки поправит
+следующая правка статьи или ``rebuild_related``.
+"""
+import atexit
+import hashlib
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+
+from . import cache
+from .models import Article, ArticleSignature, RelatedArticle
+
+logger = logging.getLogger(__name__)
+
+TOP_K = 6
+# Сколько терминов хранится в сигнатуре и сколько самых весомых попадает в вектор
+MAX_TERMS = 100
+VECTOR_TERMS = 40
+# Термины, встречающиеся больше чем в половине статей, почти не различают их,
+# но дают основную часть работы при подсчёте близости — их пропускаем
+MAX_DOCUMENT_RATIO = 0.5
+MIN_CORPUS_FOR_CUTOFF = 20
+# Термин из заголовка весит как три вхождения в тексте, из описания — как два
+FIELD_WEIGHTS = {'title': 3, 'description': 2, 'text': 1}
+# Увеличить при изменении токенизации — все сигнатуры станут устаревшими
+SIGNATURE_VERSION = 1
+
+TOKEN_RE = re.compile(r'[^\W\d_]{3,}')
+STOP_WORDS = frozenset({
+    'and', 'are', 'but', 'for', 'from', 'has', 'have', 'how', 'not', 'that', 'the', 'this', 'was',
+    'were', 'what', 'when', 'which', 'with', 'you', 'your',
+    'без', 'был', 'была', 'были', 'было', 'быть', 'для', 'его', 'если', 'есть', 'еще', 'ещё', 'или',
+    'как', 'когда', 'они', 'при', 'про', 'так', 'там', 'тем', 'то', 'того', 'тоже', 'только', 'уже',
+    'что', 'чтобы', 'это', 'этот', 'эта', 'эти',
+})
+
+
+def source_hash(article):
+    source = f'{SIGNATURE_VERSION}\0{article.title}\0{article.description}\0{article.content_hash}'
+    return hashlib.sha256(source.encode()).hexdigest()
+
+
+def _tokens(text):
+    return [token for token in TOKEN_RE.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def term_counts(article):
+    """Взвешенные частоты MAX_TERMS самых частых терминов статьи."""
+    counts = Counter()
+    fields = {'title': article.title, 'description': article.description, 'text': article.plain_text()}
+    for field, text in fields.items():
+        for token in _tokens(text):
+            counts[token] += FIELD_WEIGHTS[field]
+    return dict(counts.most_common(MAX_TERMS))
+
+
+def refresh_signatures(articles):
+    """Пересчитывает устаревшие сигнатуры статей. Возвращает число обновлённых."""
+    articles = list(articles)
+    existing = {
+        signature.article_id: signature
+        for signature in ArticleSignature.objects.filter(article__in=[a.pk for a in articles])
+    }
+    stale = []
+    for article in articles:
+        signature = existing.get(article.pk)
+        digest = source_hash(article)
+        if signature is None or signature.source_hash != digest:
+            article.refresh_derived_fields()
+            signature = ArticleSignature(article_id=article.pk, terms=term_counts(article), source_hash=digest)
+            stale.append(signature)
+    if stale:
+        ArticleSignature.objects.bulk_create(
+            stale,
+            update_conflicts=True,
+            unique_fields=['article'],
+            update_fields=['terms', 'source_hash'],
+        )
+    return len(stale)
+
+
+class Corpus:
+    """Нормированные TF-IDF векторы опубликованных статей и инвертированный индекс."""
+
+    def __init__(self, signatures):
+        document_frequency = Counter(term for terms in signatures.values() for term in terms)
+        total = len(signatures)
+        cutoff = total * MAX_DOCUMENT_RATIO if total >= MIN_CORPUS_FOR_CUTOFF else total
+        self.idf = {
+            term: math.log((1 + total) / (1 + df)) + 1
+            for term, df in document_frequency.items()
+            if df <= cutoff
+        }
+        self.vectors = {pk: self.vectorize(terms) for pk, terms in signatures.items()}
+        self.postings = defaultdict(list)
+        for pk, vector in self.vectors.items():
+            for term, weight in vector.items():
+                self.postings[term].append((pk, weight))
+
+    def vectorize(self, terms):
+        weights = {
+            term: (1 + math.log(count)) * self.idf[term]
+            for term, count in terms.items()
+            if term in self.idf
+        }
+        vector = dict(sorted(weights.items(), key=lambda item: -item[1])[:VECTOR_TERMS])
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        return {term: weight / norm for term, weight in vector.items()}
+
+    def scores(self, pk):
+        """Косинусная близость статьи ко всем статьям с общими терминами."""
+        scores = defaultdict(float)
+        for term, weight in self.vectors.get(pk, {}).items():
+            for other, other_weight in self.postings[term]:
+                scores[other] += weight * other_weight
+        scores.pop(pk, None)
+        return scores
+
+    def neighbours(self, pk, k=TOP_K):
+        scores = self.scores(pk)
+        # При равной близости выше более новая статья (больший pk)
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))[:k]
+
+
+def _published():
+    return Article.objects.filter(status=Article.Status.PUBLISHED).only(
+        'pk', 'title', 'description', 'content', *Article.DERIVED_FIELDS
+    ).order_by('pk')
+
+
+def _corpus():
+    signatures = dict(
+        ArticleSignature.objects.filter(article__status=Article.Status.PUBLISHED).values_list('article_id', 'terms')
+    )
+    return Corpus(signatures)
+
+
+def _links(pk, neighbours):
+    return [
+        RelatedArticle(article_id=pk, related_id=other, rank=rank, score=round(score, 6))
+        for rank, (other, score) in enumerate(neighbours)
+    ]
+
+
+def rebuild(batch_size=500):
+    """Пересчитывает сигнатуры всех опубликованных статей и соседей каждой. Возвращает число статей."""
+    batch = []
+    for article in _published().iterator(chunk_size=batch_size):
+        batch.append(article)
+        if len(batch) >= batch_size:
+            refresh_signatures(batch)
+            batch = []
+    if batch:
+        refresh_signatures(batch)
+
+    corpus = _corpus()
+    with transaction.atomic():
+        RelatedArticle.objects.all().delete()
+        links = []
+        for pk in corpus.vectors:
+            links += _links(pk, corpus.neighbours(pk))
+        RelatedArticle.objects.bulk_create(links, batch_size=batch_size)
+    cache.invalidate(*(f'article:{slug}' for slug in Article.objects.filter(
+        status=Article.Status.PUBLISHED
+    ).values_list('slug', flat=True)))
+    return len(corpus.vectors)
+
+
+def update(article_ids):
+    """Пересчитывает соседей изменившихся статей и списки, на которые они влияют."""
+    article_ids = set(article_ids)
+    if not article_ids:
+        return set()
+    refresh_signatures(_published().filter(pk__in=article_ids))
+    corpus = _corpus()
+
+    current = defaultdict(list)
+    for article_id, related_id, score in RelatedArticle.objects.filter(
+        article__status=Article.Status.PUBLISHED
+    ).values_list('article_id', 'related_id', 'score'):
+        current[article_id].append((related_id, score))
+
+    affected = {pk for pk in article_ids if pk in corpus.vectors}
+    for pk in article_ids:
+        scores = corpus.scores(pk)
+        for other in corpus.vectors.keys() - article_ids:
+            links = current.get(other, [])
+            listed = any(related == pk for related, _ in links)
+            # Статья уже в списке (близость могла измениться) или теперь ближе последнего соседа
+            if listed or (scores.get(other, 0) > 0 and (
+                len(links) < TOP_K or scores[other] > min(score for _, score in links)
+            )):
+                affected.add(other)
+
+    with transaction.atomic():
+        # Списки снятых с публикации статей больше не нужны
+        RelatedArticle.objects.filter(article__in=article_ids | affected).delete()
+        links = []
+        for pk in affected:
+            links += _links(pk, corpus.neighbours(pk))
+        RelatedArticle.objects.bulk_create(links)
+    cache.invalidate(*(
+        f'article:{slug}' for slug in Article.objects.filter(pk__in=affected).values_list('slug', flat=True)
+    ))
+    return affected
+
+
+class UpdateQueue:
+    """Статьи процесса, ждущие пересчёта соседей."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._timer = None
+
+    def __len__(self):
+        return len(self._pending)
+
+    def add(self, article_ids):
+        # Без задержки — сразу, как раньше: для тестов и маленьких сайтов
+        if not settings.BLOG_RELATED_UPDATE_DELAY:
+            update(article_ids)
+            return
+        with self._lock:
+            self._pending.update(article_ids)
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(settings.BLOG_RELATED_UPDATE_DELAY, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Пересчитывает соседей накопленных статей. Возвращает статьи с новыми списками."""
+        with self._lock:
+            pending, self._pending = self._pending, set()
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return set()
+        try:
+            return update(pending)
+        except DatabaseError:
+            logger.exception('Не удалось пересчитать похожие для %d статей', len(pending))
+            with self._lock:
+                self._pending |= pending
+                self._schedule()
+            raise
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+        finally:
+            # У потока таймера своё соединение с базой
+            connection.close()
+
+
+QUEUE = UpdateQueue()
+
+
+@atexit.register
+def _flush_on_exit():
+    if len(QUEUE):
+        QUEUE.flush()
@@ -0,0 +1,151 @@
+"""Рендеринг Markdown статей в HTML.
+
+Набор расширений задан в одном месте: его используют и фильтр ``markdown``,
+и сохранённый на модели HTML. ``RENDERER_VERSION`` вычисляется из конфигурации,
+поэтому любое изменение списка расширений инвалидирует сохранённый HTML.
+"""
+import hashlib
+import json
+import re
+from collections import namedtuple
+
+import markdown
+from django.conf import settings
+from django.core.cache import cache
+from markdown.extensions.toc import unique
+
+from apps.core.perf import timed
+
+EXTENSIONS = [
+    "fenced_code",
+    "codehilite",
+    "tables",
+    "nl2br",
+    "smarty",
+    "toc",
+]
+
+EXTENSION_CONFIGS = {
+    "codehilite": {"css_class": "highlight", "linenums": False},
+}
+
+RENDERER_VERSION = hashlib.sha1(
+    json.dumps([markdown.__version__, EXTENSIONS, EXTENSION_CONFIGS], sort_keys=True).encode()
+).hexdigest()[:12]
+
+
+def content_hash(text):
+    """Хеш текста с учётом версии рендерера."""
+    return hashlib.sha256(f"{RENDERER_VERSION}:{text}".encode()).hexdigest()
+
+
+@timed("markdown")
+def render(text):
+    """Возвращает пару (html, toc) для Markdown-текста."""
+    md = markdown.Markdown(extensions=EXTENSIONS, extension_configs=EXTENSION_CONFIGS)
+    html = md.convert(text)
+    toc = md.toc if md.toc_tokens else ""
+    return html, toc
+
+
+def render_html(text):
+    """Возвращает только HTML для Markdown-текста."""
+    return render(text)[0]
+
+
+# Предпросмотр в редакторе рендерит документ по блокам верхнего уровня (абзац,
+# заголовок, список, блок кода...) и кэширует HTML каждого блока по хешу его
+# текста: при наборе меняется один блок, остальные, включая дорогую подсветку
+# кода, берутся из кэша. Склеенный результат совпадает с render_html.
+
+PREVIEW_CACHE_PREFIX = "blog:preview-block"
+
+FENCE_RE = re.compile(r"^ {0,3}(`{3,}|~{3,})")
+LIST_ITEM_RE = re.compile(r"^ {0,3}([*+-]|\d+\.)[ \t]")
+HEADING_ID_RE = re.compile(r'(<h[1-6] id=")([^"]*)(")')
+# Конструкции, которые связывают блоки между собой: ссылки-сноски [name]: url,
+# маркер [TOC] и сырой HTML (может занимать несколько абзацев). С ними документ
+# рендерится целиком — тоже через кэш, но одним блоком.
+WHOLE_DOCUMENT_RE = re.compile(r"^ {0,3}\[[^\]]+\]:|^\[TOC\]\s*$|^<[a-zA-Z/!?]", re.MULTILINE)
+
+# Абзац после блока: рендер блока вместе с ним даёт HTML блока так, как он стоит
+# внутри документа, вместе с разделителем (после подсветки кода это пустая строка)
+BLOCK_END = "preview-block-end"
+BLOCK_END_HTML = f"<p>{BLOCK_END}</p>"
+
+Preview = namedtuple("Preview", ["html", "blocks", "rendered"])
+
+
+def _continues(block, line):
+    """Продолжает ли строка после пустой строки текущий блок, а не начинает новый."""
+    if line[:1] in (" ", "\t"):
+        # Отступ: продолжение пункта списка или блок кода
+        return True
+    first = block[0]
+    if LIST_ITEM_RE.match(first) and LIST_ITEM_RE.match(line):
+        return True
+    return first.startswith(">") and line.startswith(">")
+
+
+def split_blocks(text):
+    """Делит Markdown на блоки верхнего уровня по пустым строкам вне блоков кода."""
+    text = text.replace("\r\n", "\n").replace("\r", "\n")
+    if WHOLE_DOCUMENT_RE.search(text):
+        return [text] if text.strip() else []
+
+    blocks, block, fence, gap = [], [], None, False
+    for line in text.split("\n"):
+        if fence:
+            block.append(line)
+            if line.strip().startswith(fence) and not line.strip().lstrip(fence[0]):
+                fence = None
+            continue
+        if not line.strip():
+            gap = bool(block)
+            if block:
+                block.append(line)
+            continue
+        if gap and not _continues(block, line):
+            blocks.append("\n".join(block).strip("\n"))
+            block = []
+        gap = False
+        block.append(line)
+        match = FENCE_RE.match(line)
+        if match:
+            fence = match.group(1)
+    if block:
+        blocks.append("\n".join(block).strip("\n"))
+    return blocks
+
+
+def _render_block(block):
+    html = render_html(f"{block}\n\n{BLOCK_END}")
+    if html.endswith(BLOCK_END_HTML):
+        return html.removesuffix(BLOCK_END_HTML)
+    return render_html(block) + "\n"
+
+
+def _preview_key(block):
+    return f"{PREVIEW_CACHE_PREFIX}:{content_hash(block)}"
+
+
+def _unique_heading_ids(parts):
+    """Делает id заголовков уникальными по всему документу, как расширение toc при полном рендере."""
+    used = set()
+
+    def rename(match):
+        return f"{match.group(1)}{unique(match.group(2), used)}{match.group(3)}"
+
+    return [HEADING_ID_RE.sub(rename, part) for part in parts]
+
+
+def render_preview(text):
+    """HTML предпросмотра: рендерятся только блоки, которых ещё нет в кэше."""
+    blocks = split_blocks(text)
+    keys = [_preview_key(block) for block in blocks]
+    cached = cache.get_many(keys)
+    missing = {key: _render_block(block) for key, block in zip(keys, blocks) if key not in cached}
+    if missing:
+        cache.set_many(missing, timeout=settings.BLOG_PREVIEW_CACHE_TIMEOUT)
+    parts = [cached.get(key) or missing[key] for key in keys]
+    return Preview("".join(_unique_heading_ids(parts)).strip(), len(blocks), len(missing))
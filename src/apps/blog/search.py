@@ -0,0 +1,203 @@
+"""Полнотекстовый поиск по статьям.
+
+Индекс хранится в отдельной таблице и обновляется сигналами при сохранении
+и удалении статьи:
+
+* SQLite — виртуальная таблица FTS5 ``blog_article_fts`` (токенизатор porter
+  поверх unicode61: стемминг английского). Русского стеммера в FTS5 нет,
+  поэтому русские слова запроса сокращаются до основы (snowball) и ищутся
+  по префиксу: «запросы» → ``"запрос"*`` найдёт и «запросов». Формы с
+  чередованием в основе («сон» — «сна») так не находятся;
+* PostgreSQL — таблица ``blog_article_search`` с ``tsvector`` по русской
+  и английской конфигурациям и GIN-индексом;
+* остальные СУБД — прежний поиск через ``icontains``.
+
+Бэкенд возвращает queryset, отфильтрованный по запросу, упорядоченный
+по релевантности и аннотированный ``search_snippet`` — фрагментом текста,
+где совпадения обрамлены управляющими символами (см. ``highlight``).
+"""
+import functools
+import re
+
+import snowballstemmer
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+SNIPPET_START = '\x02'
+SNIPPET_END = '\x03'
+SNIPPET_WORDS = 24
+MAX_TERMS = 8
+CYRILLIC_RE = re.compile('[а-яё]')
+
+# Индексируемые поля статьи: вес заголовка выше описания, описания — выше текста
+INDEXED_FIELDS = {'title', 'description', 'content'}
+
+
+def _terms(query):
+    """Слова запроса без операторов и кавычек."""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _stem_prefix(term, stemmer):
+    """Префикс для поиска слова в FTS5: у русского слова — основа, у остальных — само слово."""
+    if not CYRILLIC_RE.search(term):
+        return term
+    stem = stemmer.stemWord(term)
+    # Стеммер заменяет «ё» на «е», а unicode61 их не отождествляет — берём начало исходного слова
+    prefix = term[:len(stem)]
+    return prefix if prefix.replace('ё', 'е') == stem else stem
+
+
+def _document(article):
+    return article.title, article.description, article.plain_text()
+
+
+def highlight(snippet):
+    """Экранирует фрагмент и заменяет маркеры совпадений на <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(SNIPPET_START, '<mark>')
+        .replace(SNIPPET_END, '</mark>')
+    )
+
+
+class IcontainsBackend:
+    """Поиск без индекса: LIKE по заголовку, описанию и тексту."""
+
+    def index(self, article):
+        pass
+
+    def remove(self, pk):
+        pass
+
+    def clear(self):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(
+            Q(title__icontains=query)
+            | Q(description__icontains=query)
+            | Q(content__icontains=query)
+        )
+
+
+class SQLiteFTSBackend:
+    """Поиск через SQLite FTS5 с ранжированием bm25."""
+
+    table = 'blog_article_fts'
+
+    def index(self, article):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [article.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, title, description, body) VALUES (%s, %s, %s, %s)',
+                [article.pk, *_document(article)],
+            )
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [pk])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, queryset, query):
+        terms = _terms(query)
+        if not terms:
+            return queryset.none()
+        # Каждое слово ищется по префиксу: «тесты» → «тест» найдёт «тестов» и «тестирование».
+        # Стеммер хранит состояние, поэтому свой на каждый запрос
+        stemmer = snowballstemmer.stemmer('russian')
+        match = ' AND '.join(f'"{_stem_prefix(term, stemmer)}"*' for term in terms)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', [match]),
+        ).annotate(
+            search_rank=RawSQL(
+                f'SELECT bm25({self.table}, 10.0, 4.0, 1.0) FROM {self.table} '
+                f'WHERE {self.table} MATCH %s AND rowid = blog_article.id',
+                [match],
+            ),
+            search_snippet=RawSQL(
+                f"SELECT snippet({self.table}, -1, %s, %s, '…', %s) FROM {self.table} "
+                f'WHERE {self.table} MATCH %s AND rowid = blog_article.id',
+                [SNIPPET_START, SNIPPET_END, SNIPPET_WORDS, match],
+            ),
+        ).order_by('search_rank', '-created_at')
+
+
+class PostgresSearchBackend:
+    """Поиск через tsvector с русской и английской морфологией."""
+
+    table = 'blog_article_search'
+    document_sql = (
+        "setweight(to_tsvector('russian', %(title)s), 'A') || setweight(to_tsvector('english', %(title)s), 'A') || "
+        "setweight(to_tsvector('russian', %(description)s), 'B') || setweight(to_tsvector('english', %(description)s), 'B') || "
+        "setweight(to_tsvector('russian', %(body)s), 'C') || setweight(to_tsvector('english', %(body)s), 'C')"
+    )
+    query_sql = "(to_tsquery('russian', %s) || to_tsquery('english', %s))"
+
+    def index(self, article):
+        title, description, body = _document(article)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (article_id, body, document) '
+                f'VALUES (%(pk)s, %(body)s, {self.document_sql}) '
+                'ON CONFLICT (article_id) DO UPDATE SET body = EXCLUDED.body, document = EXCLUDED.document',
+                {'pk': article.pk, 'title': title, 'description': description, 'body': body},
+            )
+
+    def remove(self, pk):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE article_id = %s', [pk])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def search(self, queryset, query):
+        terms = _terms(query)
+        if not terms:
+            return queryset.none()
+        tsquery = ' & '.join(f"'{term}':*" for term in terms)
+        options = (
+            f'StartSel="{SNIPPET_START}", StopSel="{SNIPPET_END}", '
+            f'MaxWords={SNIPPET_WORDS}, MinWords={SNIPPET_WORDS // 2}'
+        )
+        return queryset.filter(
+            pk__in=RawSQL(
+                f'SELECT article_id FROM {self.table} WHERE document @@ {self.query_sql}',
+                [tsquery, tsquery],
+            ),
+        ).annotate(
+            # Знак инвертирован, чтобы, как и bm25, лучшее совпадение было меньшим
+            search_rank=RawSQL(
+                f'SELECT -ts_rank_cd(document, {self.query_sql}) FROM {self.table} '
+                'WHERE article_id = blog_article.id',
+                [tsquery, tsquery],
+            ),
+            search_snippet=RawSQL(
+                f"SELECT ts_headline('russian', body, {self.query_sql}, %s) FROM {self.table} "
+                'WHERE article_id = blog_article.id',
+                [tsquery, tsquery, options],
+            ),
+        ).order_by('search_rank', '-created_at')
+
+
+@functools.cache
+def get_backend():
+    """Бэкенд поиска для текущей СУБД; FTS5 используется, только если таблица создана."""
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite' and SQLiteFTSBackend.table in connection.introspection.table_names():
+        return SQLiteFTSBackend()
+    return IcontainsBackend()
+
+
+async def aget_backend():
+    # Первый вызов проверяет таблицы через introspection — это синхронный запрос к базе
+    return await sync_to_async(get_backend)()
@@ -0,0 +1,191 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import cache, counters, feeds, images, related, search, stats
+from .models import Article, ArticleSignature, ArticleStats, Category, RelatedArticle
+
+logger = logging.getLogger(__name__)
+
+# Поля, от которых зависят сигнатура статьи и её участие в похожих
+RELATED_FIELDS = {'title', 'description', 'content', 'status'}
+
+
+@receiver(post_save, sender=Article)
+def index_article(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Обновляет поисковый индекс после сохранения статьи."""
+    if raw:
+        return
+    if update_fields is not None and not search.INDEXED_FIELDS & set(update_fields):
+        return
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Article)
+def unindex_article(sender, instance, **kwargs):
+    """Удаляет статью из поискового индекса."""
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_delete, sender=Article)
+def delete_image_variants(sender, instance, **kwargs):
+    """Удаляет копии обложки удалённой статьи после коммита."""
+    if instance.image_variants:
+        variants, storage = instance.image_variants, instance.image.storage
+        transaction.on_commit(lambda: images.delete(variants, storage))
+
+
+def _generate_image_variants(pk):
+    """Фоновый поток: копии обложки статьи ``pk``. Упавшую генерацию повторит generate_image_variants."""
+    try:
+        article = Article.objects.filter(pk=pk).first()
+        if article is not None:
+            article.refresh_image_variants()
+    except Exception:
+        logger.exception('Не удалось создать копии обложки статьи %s', pk)
+    finally:
+        connection.close()
+
+
+@receiver(post_save, sender=Article)
+def schedule_image_variants(sender, instance, raw=False, **kwargs):
+    """Создаёт копии новой обложки после коммита, не задерживая сохранение; до тех пор страницы показывают оригинал."""
+    if raw or not settings.BLOG_IMAGE_VARIANTS_ON_SAVE or not instance.is_image_variants_stale:
+        return
+    pk = instance.pk
+    transaction.on_commit(
+        lambda: threading.Thread(target=_generate_image_variants, args=[pk], daemon=True).start()
+    )
+
+
+def _published_key(status, category_id, author_id):
+    """Категория и автор, к счётчикам которых относится статья, или None для черновика."""
+    if status == Article.Status.PUBLISHED:
+        return category_id, author_id
+    return None
+
+
+@receiver(pre_save, sender=Article)
+def remember_previous_state(sender, instance, raw=False, **kwargs):
+    """Запоминает статус, категорию, автора и slug статьи до сохранения."""
+    previous = None
+    if not raw and not instance._state.adding:
+        previous = Article.objects.filter(pk=instance.pk).values(
+            'status', 'category_id', 'author_id', 'slug'
+        ).first()
+    instance._previous_state = previous
+
+
+@receiver(post_save, sender=Article)
+def update_article_stats(sender, instance, raw=False, **kwargs):
+    """Переносит вклад статьи в счётчики, если изменились статус, категория или автор."""
+    if raw:
+        return
+    state = getattr(instance, '_previous_state', None)
+    previous = state and _published_key(state['status'], state['category_id'], state['author_id'])
+    current = _published_key(instance.status, instance.category_id, instance.author_id)
+    if previous == current:
+        return
+    if previous:
+        stats.published_changed(*previous, delta=-1)
+    if current:
+        stats.published_changed(*current, delta=1)
+
+
+def _article_page_groups(article, state=None):
+    groups = {
+        'home', 'list', f'article:{article.slug}', f'category:{article.category_id}',
+        feeds.sitemap_group(feeds.sitemap_shard(article.pk)),
+    }
+    if state:
+        groups |= {f'article:{state["slug"]}', f'category:{state["category_id"]}'}
+    return groups
+
+
+@receiver(post_save, sender=Article)
+def invalidate_article_pages(sender, instance, raw=False, **kwargs):
+    """Сбрасывает кэш страницы статьи, страниц её категории, главной и списков."""
+    if raw:
+        return
+    state = getattr(instance, '_previous_state', None)
+    # Черновик, который и раньше не был опубликован, на публичных страницах не виден
+    was_published = state and state['status'] == Article.Status.PUBLISHED
+    if was_published or instance.status == Article.Status.PUBLISHED:
+        cache.invalidate(*_article_page_groups(instance, state))
+
+
+@receiver(post_delete, sender=Article)
+def discount_article(sender, instance, **kwargs):
+    current = _published_key(instance.status, instance.category_id, instance.author_id)
+    if current:
+        stats.published_changed(*current, delta=-1)
+        cache.invalidate(*_article_page_groups(instance))
+
+
+@receiver(post_save, sender=Article)
+def forget_unpublished_counters(sender, instance, raw=False, **kwargs):
+    """Статья снята с публикации: счётчики перестают принимать к ней просмотры и реакции."""
+    if raw or instance.status == Article.Status.PUBLISHED:
+        return
+    state = getattr(instance, '_previous_state', None)
+    if state and state['status'] == Article.Status.PUBLISHED:
+        counters.forget(instance.pk)
+
+
+@receiver(post_delete, sender=Article)
+def forget_deleted_counters(sender, instance, **kwargs):
+    if instance.status == Article.Status.PUBLISHED:
+        counters.forget(instance.pk)
+
+
+@receiver(post_save, sender=Article)
+def update_related_articles(sender, instance, raw=False, update_fields=None, **kwargs):
+    """Ставит статью в очередь пересчёта похожих после коммита, если изменились текст или статус."""
+    if raw or (update_fields is not None and not RELATED_FIELDS & set(update_fields)):
+        return
+    state = getattr(instance, '_previous_state', None)
+    was_published = bool(state) and state['status'] == Article.Status.PUBLISHED
+    is_published = instance.status == Article.Status.PUBLISHED
+    if not (was_published or is_published):
+        return
+    if was_published == is_published and ArticleSignature.objects.filter(
+        pk=instance.pk, source_hash=related.source_hash(instance)
+    ).exists():
+        return
+    pk = instance.pk
+    transaction.on_commit(lambda: related.QUEUE.add([pk]))
+
+
+@receiver(pre_delete, sender=Article)
+def remember_related_referrers(sender, instance, **kwargs):
+    """Статьи, в чьих списках похожих стоит удаляемая, — их списки нужно дополнить."""
+    instance._related_referrers = list(
+        RelatedArticle.objects.filter(related=instance).values_list('article_id', flat=True)
+    )
+
+
+@receiver(post_delete, sender=Article)
+def refill_related_articles(sender, instance, **kwargs):
+    referrers = getattr(instance, '_related_referrers', [])
+    if referrers:
+        transaction.on_commit(lambda: related.QUEUE.add(referrers))
+
+
+@receiver(post_save, sender=Category)
+def count_category(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        stats.categories_changed(1)
+    cache.invalidate('home', 'list', f'category:{instance.pk}')
+
+
+@receiver(post_delete, sender=Category)
+def discount_category(sender, instance, **kwargs):
+    stats.categories_changed(-1)
+    ArticleStats.objects.filter(scope=ArticleStats.Scope.CATEGORY, object_id=instance.pk).delete()
+    cache.invalidate('home', 'list', f'category:{instance.pk}')
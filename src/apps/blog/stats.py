@@ -0,0 +1,79 @@
+"""Поддержка материализованных счётчиков ``ArticleStats``.
+
+Сигналы передают сюда изменения «вклада» статьи в счётчики: опубликованная
+статья добавляет единицу сайту, своей категории и автору. Изменения
+применяются атомарными ``UPDATE ... SET x = x + n``.
+"""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Article, ArticleStats, Category
+
+Scope = ArticleStats.Scope
+
+
+def _ensure(scope, object_id=0):
+    ArticleStats.objects.get_or_create(scope=scope, object_id=object_id)
+
+
+def _add(scope, object_id=0, **deltas):
+    _ensure(scope, object_id)
+    ArticleStats.objects.filter(scope=scope, object_id=object_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def published_changed(category_id, author_id, delta):
+    """Учитывает появление (delta=1) или исчезновение (delta=-1) опубликованной статьи."""
+    with transaction.atomic():
+        _add(Scope.SITE, articles=delta)
+        _add(Scope.CATEGORY, category_id, articles=delta)
+        _add(Scope.AUTHOR, author_id, articles=delta)
+        # Число авторов меняется, когда у автора появляется первая или исчезает последняя публикация
+        author_total = ArticleStats.objects.get(scope=Scope.AUTHOR, object_id=author_id).articles
+        if (delta > 0 and author_total == 1) or (delta < 0 and author_total == 0):
+            _add(Scope.SITE, authors=delta)
+
+
+def categories_changed(delta):
+    _add(Scope.SITE, categories=delta)
+
+
+def compute():
+    """Фактические значения счётчиков: {(scope, object_id): {поле: значение}}."""
+    published = Article.objects.filter(status=Article.Status.PUBLISHED)
+    by_author = dict(published.values_list('author').annotate(n=Count('pk')).order_by())
+    by_category = dict(published.values_list('category').annotate(n=Count('pk')).order_by())
+
+    actual = {
+        (Scope.SITE, 0): {
+            'articles': sum(by_author.values()),
+            'authors': len(by_author),
+            'categories': Category.objects.count(),
+        },
+    }
+    actual.update({(Scope.AUTHOR, pk): {'articles': n} for pk, n in by_author.items()})
+    actual.update({(Scope.CATEGORY, pk): {'articles': n} for pk, n in by_category.items()})
+    return actual
+
+
+def reconcile():
+    """Приводит таблицу счётчиков к фактическим значениям. Возвращает список исправленных строк."""
+    fields = ['articles', 'authors', 'categories']
+    with transaction.atomic():
+        actual = compute()
+        rows = {
+            (row.scope, row.object_id): row
+            for row in ArticleStats.objects.select_for_update()
+        }
+        fixed = []
+        for key in rows.keys() | actual.keys():
+            row = rows.get(key) or ArticleStats(scope=key[0], object_id=key[1])
+            expected = {field: 0 for field in fields} | actual.get(key, {})
+            if row.pk and all(getattr(row, f) == v for f, v in expected.items()):
+                continue
+            for field, value in expected.items():
+                setattr(row, field, value)
+            row.save()
+            fixed.append(row)
+    return fixed
@@ -0,0 +1,11 @@
+from django import template
+
+from apps.blog import cards
+
+register = template.Library()
+
+
+@register.simple_tag
+def article_cards(articles, animation_class=''):
+    """Карточки статей списка: одно чтение из кэша, рендер только отсутствующих."""
+    return cards.render_cards(articles, animation_class)
@@ -1,26 +1,12 @@
-import markdown
 from django import template
 from django.utils.safestring import mark_safe
 
+from apps.blog import rendering
+
 register = template.Library()
 
 
 @register.filter(name="markdown")
 def markdown_format(text):
     """Convert Markdown text to HTML."""
-    return mark_safe(
-        markdown.markdown(
-            text,
-            extensions=[
-                "fenced_code",
-                "codehilite",
-                "tables",
-                "nl2br",
-                "smarty",
-                "toc",
-            ],
-            extension_configs={
-                "codehilite": {"css_class": "highlight", "linenums": False},
-            },
-        )
-    )
+    return mark_safe(rendering.render_html(text))
@@ -0,0 +1,1316 @@
+import gzip
+import io
+import json
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.safestring import mark_safe
+from PIL import Image
+
+from apps.accounts import urls as accounts_urls
+from apps.blog import (
+    autosave,
+    cards,
+    counters,
+    export,
+    feeds,
+    images,
+    related,
+    rendering,
+    signals,
+    stats,
+)
+from apps.blog import urls as blog_urls
+from apps.blog.cache import CSRF_PLACEHOLDER
+from apps.blog.forms import ArticleForm
+from apps.blog.models import (
+    Article,
+    ArticleCounters,
+    ArticleStats,
+    Category,
+    RelatedArticle,
+)
+from apps.blog.pagination import CursorPaginator
+from apps.core import routers
+from apps.core.models import UserProfile
+from apps.core.probing import build_probes, probe_client
+
+User = get_user_model()
+
+# Максимум SQL-запросов на один запрос к странице при холодном кэше.
+# Новая страница без бюджета или N+1 в существующей ломают тесты.
+QUERY_BUDGETS = {
+    'blog:index': 2,
+    'blog:article_list': 3,
+    'blog:article_list?page': 3,
+    'blog:article_list?category': 3,
+    'blog:article_list?q': 3,
+    'blog:article_detail': 2,
+    'blog:article_create': 3,
+    'blog:article_edit': 4,
+    'blog:article_delete': 18,
+    'blog:article_view': 1,
+    'blog:article_react': 1,
+    'blog:article_preview': 2,
+    'blog:article_autosave': 4,
+    'blog:subscribe': 4,
+    'blog:feed': 1,
+    'blog:feed_atom': 1,
+    'blog:category_feed': 2,
+    'blog:sitemap': 2,
+    'blog:sitemap_pages': 1,
+    'blog:sitemap_articles': 1,
+    'accounts:login': 0,
+    'accounts:signup': 0,
+    'accounts:profile': 6,
+    'accounts:logout': 4,
+}
+
+
+def seed_blog(authors=3, categories=4, published=30, drafts=5):
+    """Небольшой, но реалистичный набор данных: несколько страниц списка на каждую категорию."""
+    users = [
+        User.objects.create_user(username=f'author{i}', password='password', first_name=f'Автор {i}')
+        for i in range(authors)
+    ]
+    UserProfile.objects.bulk_create(UserProfile(user=user) for user in users)
+    cats = [Category.objects.create(name=f'Категория {i}', slug=f'category-{i}') for i in range(categories)]
+    body = '## Раздел\n\nТекст статьи с `кодом`.\n\n```python\nprint("hello")\n```\n\n' * 20
+    for i in range(published):
+        Article.objects.create(
+            title=f'Опубликованная статья {i}',
+            slug=f'published-{i}',
+            category=cats[i % categories],
+            author=users[i % authors],
+            content=body,
+            status=Article.Status.PUBLISHED,
+        )
+    for i in range(drafts):
+        Article.objects.create(
+            title=f'Черновик {i}',
+            slug=f'draft-{i}',
+            category=cats[0],
+            author=users[0],
+            content=body,
+        )
+    return users
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class QueryBudgetTests(TestCase):
+    """Число запросов к базе на каждую страницу блога и аккаунта."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_blog()[0]
+
+    def assertWithinBudget(self, name, request):
+        with CaptureQueriesContext(connection) as ctx:
+            response = request()
+        self.assertLess(response.status_code, 400, name)
+        queries = '\n'.join(q['sql'] for q in ctx.captured_queries)
+        self.assertLessEqual(
+            len(ctx.captured_queries), QUERY_BUDGETS[name],
+            f'{name}: {len(ctx.captured_queries)} запросов при бюджете {QUERY_BUDGETS[name]}\n{queries}',
+        )
+
+    def test_every_url_has_budget(self):
+        names = {
+            f'{module.app_name}:{pattern.name}'
+            for module in (blog_urls, accounts_urls)
+            for pattern in module.urlpatterns
+        }
+        self.assertEqual(names - QUERY_BUDGETS.keys(), set())
+
+    def test_get_pages(self):
+        anonymous, author = probe_client(), probe_client(self.author)
+        probes = build_probes(self.author)
+        self.assertGreaterEqual(len(probes), 9)
+        for probe in probes:
+            client = author if probe.login_required else anonymous
+            with self.subTest(probe.name):
+                self.assertWithinBudget(probe.name, lambda client=client, url=probe.url: client.get(url))
+
+    def test_anonymous_forms(self):
+        client = probe_client()
+        for name in ('accounts:login', 'accounts:signup'):
+            with self.subTest(name):
+                self.assertWithinBudget(name, lambda name=name: client.get(reverse(name)))
+
+    def test_subscribe(self):
+        client = probe_client()
+        self.assertWithinBudget(
+            'blog:subscribe',
+            lambda: client.post(reverse('blog:subscribe'), {'email': 'reader@example.com'}),
+        )
+
+    def test_article_delete(self):
+        client = probe_client(self.author)
+        article = Article.objects.filter(author=self.author, status=Article.Status.PUBLISHED).first()
+        self.assertWithinBudget(
+            'blog:article_delete',
+            lambda: client.post(reverse('blog:article_delete', args=[article.slug])),
+        )
+
+    def test_article_autosave(self):
+        client = probe_client(self.author)
+        draft = Article.objects.filter(author=self.author, status=Article.Status.DRAFT).first()
+        self.assertWithinBudget(
+            'blog:article_autosave',
+            lambda: client.post(
+                reverse('blog:article_autosave', args=[draft.pk]),
+                {'revision': draft.revision, 'patch': [0, 0, 'Вступление. ']},
+                content_type='application/json',
+            ),
+        )
+
+    def test_article_preview(self):
+        client = probe_client(self.author)
+        self.assertWithinBudget(
+            'blog:article_preview',
+            lambda: client.post(reverse('blog:article_preview'), {'content': '# Заголовок'}),
+        )
+
+    def test_article_counters(self):
+        client = probe_client()
+        article = Article.objects.filter(status=Article.Status.PUBLISHED).first()
+        with mock.patch.object(counters, 'BUFFER', counters.CounterBuffer()) as buffer:
+            self.addCleanup(buffer.flush)
+            for name in ('blog:article_view', 'blog:article_react'):
+                with self.subTest(name):
+                    self.assertWithinBudget(name, lambda name=name: client.post(reverse(name, args=[article.pk])))
+
+    def test_logout(self):
+        client = probe_client(self.author)
+        self.assertWithinBudget('accounts:logout', lambda: client.post(reverse('accounts:logout')))
+
+
+@override_settings(BLOG_PAGE_CACHE=False, BLOG_RELATED_UPDATE_DELAY=0)
+class SlugAllocationTests(TransactionTestCase):
+    """Подбор slug одним запросом и повтор при гонке двух сохранений."""
+
+    def setUp(self):
+        self.author = User.objects.create_user(username='author', password='password')
+        self.category = Category.objects.create(name='Дайджест', slug='digest')
+
+    def post_article(self, client, title='Weekly digest', url=None):
+        return client.post(url or reverse('blog:article_create'), {
+            'title': title,
+            'category': self.category.pk,
+            'content': 'Текст',
+            'status': Article.Status.PUBLISHED,
+        })
+
+    def test_single_query_suffix(self):
+        for suffix in ('', '-1', '-2', '-7', '-x', '-2-draft'):
+            Article.objects.create(
+                title='Weekly digest', slug=f'weekly-digest{suffix}',
+                category=self.category, author=self.author,
+            )
+        form = ArticleForm(data={'title': 'Weekly digest', 'category': self.category.pk, 'content': 'Текст'})
+        self.assertTrue(form.is_valid())
+        with self.assertNumQueries(1):
+            self.assertEqual(form.generate_unique_slug(), 'weekly-digest-8')
+
+    def test_edit_keeps_own_slug(self):
+        client = probe_client(self.author)
+        self.post_article(client)
+        article = Article.objects.get()
+        self.post_article(client, title='Weekly  digest', url=reverse('blog:article_edit', args=[article.slug]))
+        self.assertEqual(Article.objects.get().slug, 'weekly-digest')
+
+    def test_concurrent_create(self):
+        """Оба запроса выбирают один slug до того, как любой из них сохранит статью."""
+        generate = ArticleForm.generate_unique_slug
+        both_generated = threading.Barrier(2, timeout=10)
+        first_saved = threading.Event()
+        responses = {}
+
+        def racing_generate(form):
+            slug = generate(form)
+            name = threading.current_thread().name
+            if name not in responses:
+                responses[name] = None
+                both_generated.wait()
+                if name == 'second':
+                    # Второй сохраняет устаревший slug уже после коммита первого
+                    first_saved.wait(10)
+            return slug
+
+        def create(name):
+            try:
+                responses[name] = self.post_article(probe_client(self.author))
+            finally:
+                if name == 'first':
+                    first_saved.set()
+                connections.close_all()
+
+        with mock.patch.object(ArticleForm, 'generate_unique_slug', racing_generate):
+            threads = [threading.Thread(target=create, args=(name,), name=name) for name in ('first', 'second')]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual([responses[name].status_code for name in ('first', 'second')], [302, 302])
+        self.assertEqual(
+            sorted(Article.objects.values_list('slug', flat=True)),
+            ['weekly-digest', 'weekly-digest-1'],
+        )
+
+
+@override_settings(BLOG_PAGE_CACHE=False, BLOG_RELATED_UPDATE_DELAY=0)
+class RelatedArticlesTests(TestCase):
+    """Похожие статьи: TF-IDF соседи, пересчёт после правок и чтение на странице статьи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.category = Category.objects.create(name='Заметки', slug='notes')
+
+    def create(self, title, content, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Article.objects.create(
+                title=title, slug=f'article-{Article.objects.count()}', content=content,
+                category=self.category, author=self.author, status=Article.Status.PUBLISHED, **kwargs,
+            )
+
+    def neighbours(self, article):
+        return list(RelatedArticle.objects.filter(article=article).values_list('related__title', flat=True))
+
+    def test_similar_articles_ranked_first(self):
+        postgres = self.create('Индексы в PostgreSQL', 'Планировщик PostgreSQL выбирает индекс по статистике.')
+        self.create('Вакуум в PostgreSQL', 'Автовакуум PostgreSQL чистит мёртвые строки и статистику.')
+        self.create('Вёрстка карточек', 'Сетка карточек на CSS grid с адаптивными колонками.')
+        self.assertEqual(self.neighbours(postgres), ['Вакуум в PostgreSQL'])
+
+    def test_updates_after_edit_and_delete(self):
+        grid = self.create('Вёрстка карточек', 'Сетка карточек на CSS grid.')
+        flex = self.create('Flexbox и колонки', 'Колонки на flexbox.')
+        self.assertEqual(self.neighbours(grid), [])
+
+        flex.title, flex.content = 'Сетка карточек на grid', 'Карточки и сетка на CSS grid.'
+        with self.captureOnCommitCallbacks(execute=True):
+            flex.save()
+        self.assertEqual(self.neighbours(grid), ['Сетка карточек на grid'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            flex.delete()
+        self.assertEqual(self.neighbours(grid), [])
+
+    def test_unpublished_article_leaves_lists(self):
+        grid = self.create('Сетка карточек', 'Карточки на CSS grid.')
+        draft = self.create('Сетка на grid', 'Карточки и сетка на CSS grid.')
+        draft.status = Article.Status.DRAFT
+        with self.captureOnCommitCallbacks(execute=True):
+            draft.save()
+        self.assertEqual(self.neighbours(grid), [])
+        self.assertFalse(RelatedArticle.objects.filter(article=draft).exists())
+
+    @override_settings(BLOG_RELATED_UPDATE_DELAY=60)
+    def test_save_cost_does_not_grow_with_corpus(self):
+        queue = related.UpdateQueue()
+        self.enterContext(mock.patch.object(related, 'QUEUE', queue))
+        self.addCleanup(queue.flush)
+        grid = self.create('Сетка карточек', 'Карточки на CSS grid.')
+        flex = self.create('Flexbox и колонки', 'Колонки на flexbox.')
+
+        costs = []
+        for size in (10, 50):
+            Article.objects.bulk_create(
+                Article(
+                    title=f'Статья про сетку {len(costs)}-{i}', slug=f'bulk-{len(costs)}-{i}', content='Сетка и карточки.',
+                    category=self.category, author=self.author, status=Article.Status.PUBLISHED,
+                )
+                for i in range(size)
+            )
+            grid.content += ' Ещё про grid.'
+            with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+                grid.save()
+            costs.append([query['sql'] for query in queries.captured_queries])
+        self.assertEqual(len(costs[0]), len(costs[1]))
+        self.assertNotIn('blog_relatedarticle', ' '.join(costs[1]))
+
+        flex.title, flex.content = 'Сетка карточек на grid', 'Карточки и сетка на CSS grid.'
+        with self.captureOnCommitCallbacks(execute=True):
+            flex.save()
+        self.assertEqual(self.neighbours(grid), [])
+        with mock.patch.object(related, 'update', wraps=related.update) as update:
+            queue.flush()
+        update.assert_called_once_with({grid.pk, flex.pk})
+        self.assertEqual(self.neighbours(grid)[0], 'Сетка карточек на grid')
+
+    def test_detail_reads_precomputed_neighbours(self):
+        first = self.create('Кэш страниц', 'Кэш страниц для анонимных читателей.')
+        self.create('Инвалидация кэша', 'Версии групп кэша страниц.')
+        self.assertEqual(related.rebuild(), 2)
+        with self.assertNumQueries(QUERY_BUDGETS['blog:article_detail']):
+            response = probe_client().get(first.get_absolute_url())
+        self.assertEqual([a.title for a in response.context['related_articles']], ['Инвалидация кэша'])
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class AsyncViewTests(TestCase):
+    """Публичные async-view через AsyncClient: ASGI-путь без перехода в sync."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_blog(authors=1, published=12, drafts=1)[0]
+        cls.draft = Article.objects.get(status=Article.Status.DRAFT)
+
+    async def test_pages(self):
+        article = await Article.objects.filter(status=Article.Status.PUBLISHED).afirst()
+        await self.async_client.aforce_login(self.author)
+        for url in (
+            reverse('blog:index'),
+            reverse('blog:article_list') + '?page=2',
+            reverse('blog:article_list') + '?q=статья',
+            article.get_absolute_url(),
+        ):
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.context['user'], self.author)
+
+    async def test_draft_visible_to_author_only(self):
+        url = self.draft.get_absolute_url()
+        self.assertEqual((await self.async_client.get(url)).status_code, 404)
+        await self.async_client.aforce_login(self.author)
+        self.assertEqual((await self.async_client.get(url)).status_code, 200)
+
+    async def test_subscribe(self):
+        url = reverse('blog:subscribe')
+        first = await self.async_client.post(url, {'email': 'reader@example.com'})
+        again = await self.async_client.post(url, {'email': 'reader@example.com'})
+        self.assertEqual(first.json()['message'], 'Вы успешно подписались!')
+        self.assertEqual(again.json()['message'], 'Вы уже подписаны.')
+
+
+class CounterTests(TestCase):
+    """Счётчики с отложенной записью: приращения копятся в буфере и пишутся одним UPDATE."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(authors=1, categories=1, published=3, drafts=1)
+        cls.published = list(Article.objects.filter(status=Article.Status.PUBLISHED).order_by('pk'))
+        cls.draft = Article.objects.get(status=Article.Status.DRAFT)
+
+    def setUp(self):
+        cache.clear()
+        # Свой буфер на тест: глобальный помнит строки счётчиков, откаченные вместе с прошлым тестом
+        self.buffer = counters.CounterBuffer()
+        patcher = mock.patch.object(counters, 'BUFFER', self.buffer)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.buffer.flush)
+
+    def test_one_update_per_flush(self):
+        first, second, third = self.published
+        for article in self.published:
+            self.buffer.add(article.pk, 'views')
+        self.buffer.add(first.pk, 'views', 2)
+        self.buffer.add(second.pk, 'reactions')
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.buffer.flush(), 3)
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+
+        self.buffer.add(third.pk, 'reactions')
+        with CaptureQueriesContext(connection) as ctx:
+            self.buffer.flush()
+        # Строки уже есть: только UPDATE и чтение новых значений для кэша
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries if 'SAVEPOINT' not in q['sql']]
+        self.assertEqual(statements, ['UPDATE', 'SELECT'])
+        self.assertEqual(
+            list(ArticleCounters.objects.order_by('pk').values_list('views', 'reactions')),
+            [(3, 0), (1, 1), (1, 1)],
+        )
+
+    def test_unpublished_are_ignored(self):
+        self.buffer.add(self.draft.pk, 'views')
+        self.buffer.add(10 ** 6, 'views')
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertFalse(ArticleCounters.objects.exists())
+        self.assertEqual(len(self.buffer), 0)
+
+    def test_failed_flush_requeues(self):
+        article = self.published[0]
+        self.buffer.add(article.pk, 'views', 5)
+        with mock.patch.object(self.buffer, '_create_rows', side_effect=DatabaseError('database is locked')), \
+                self.assertLogs('apps.blog.counters', 'ERROR'), self.assertRaises(DatabaseError):
+            self.buffer.flush()
+        self.assertEqual(len(self.buffer), 1)
+        self.buffer.flush()
+        self.assertEqual(ArticleCounters.objects.get(pk=article.pk).views, 5)
+
+    def test_endpoints(self):
+        article = self.published[0]
+        view_url = reverse('blog:article_view', args=[article.pk])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.post(view_url).json(), {'views': 0, 'reactions': 0})
+        self.client.post(reverse('blog:article_react', args=[article.pk]))
+        self.buffer.flush()
+
+        # Снимок после записи берётся из кэша
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.post(view_url).json(), {'views': 1, 'reactions': 1})
+        self.assertEqual(self.client.get(view_url).status_code, 405)
+
+    def test_reaction_requires_csrf(self):
+        url = reverse('blog:article_react', args=[self.published[0].pk])
+        client = Client(enforce_csrf_checks=True)
+        self.assertEqual(client.post(url).status_code, 403)
+        self.assertEqual(client.post(reverse('blog:article_view', args=[self.published[0].pk])).status_code, 200)
+        self.assertEqual(len(self.buffer), 1)
+
+    @override_settings(DATABASE_REPLICAS=['replica1'])
+    def test_counters_keep_replica_reads(self):
+        """Счётчики не пишут статьи: после них читатель остаётся на реплике."""
+        client = Client()
+        for name in ('blog:article_view', 'blog:article_react'):
+            with self.subTest(name):
+                response = client.post(reverse(name, args=[self.published[0].pk]))
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn(routers.STICKY_COOKIE, response.cookies)
+        response = client.post(reverse('blog:subscribe'), {'email': 'not-an-email'})
+        self.assertIn(routers.STICKY_COOKIE, response.cookies)
+
+    def test_unknown_articles_are_rejected(self):
+        """Буфер не растёт от запросов к произвольным id: в нём только опубликованные статьи."""
+        for pk in (self.draft.pk, 10 ** 6):
+            for name in ('blog:article_view', 'blog:article_react'):
+                with self.subTest(pk=pk, name=name):
+                    self.assertEqual(self.client.post(reverse(name, args=[pk])).status_code, 404)
+        self.assertEqual(len(self.buffer), 0)
+        # Отказ не кэшируется: опубликованная позже статья начинает считаться сразу
+        self.draft.status = Article.Status.PUBLISHED
+        self.draft.save()
+        self.assertEqual(self.client.post(reverse('blog:article_view', args=[self.draft.pk])).status_code, 200)
+        self.assertEqual(len(self.buffer), 1)
+
+    @override_settings(BLOG_RELATED_UPDATE_DELAY=0)
+    def test_unpublished_article_stops_counting(self):
+        article = self.published[0]
+        view_url = reverse('blog:article_view', args=[article.pk])
+        self.client.post(view_url)
+        self.buffer.flush()
+        # Строка счётчиков и снимок в кэше уже есть, ещё одно приращение ждёт записи
+        self.client.post(view_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.status = Article.Status.DRAFT
+            article.save()
+
+        self.assertEqual(self.client.post(view_url).status_code, 404)
+        self.assertEqual(self.buffer.flush(), 0)
+        self.assertEqual(ArticleCounters.objects.get(pk=article.pk).views, 1)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_pages_show_counts(self):
+        article = self.published[0]
+        self.buffer.add(article.pk, 'views', 42)
+        self.buffer.add(article.pk, 'reactions', 7)
+        self.buffer.flush()
+        response = self.client.get(article.get_absolute_url())
+        self.assertContains(response, '<span data-counter="views">42</span>')
+        self.assertContains(response, '<span data-counter="reactions">7</span>')
+        self.assertContains(self.client.get(reverse('blog:article_list')), '42 просм.')
+
+
+@override_settings(BLOG_RELATED_UPDATE_DELAY=0)
+class CounterConcurrencyTests(TransactionTestCase):
+    """Несколько воркеров со своими буферами пишут одни и те же счётчики без потерь."""
+
+    def test_concurrent_flushes_lose_nothing(self):
+        author = User.objects.create_user(username='author', password='password')
+        category = Category.objects.create(name='Заметки', slug='notes')
+        ids = [
+            Article.objects.create(
+                title=f'Статья {i}', slug=f'article-{i}', category=category, author=author,
+                content='Текст', status=Article.Status.PUBLISHED,
+            ).pk
+            for i in range(2)
+        ]
+        workers, hits = 4, 50
+        start = threading.Barrier(workers, timeout=10)
+
+        def flush(buffer):
+            # «database table is locked» в общей базе в памяти: приращения в буфере, повторяем
+            try:
+                buffer.flush()
+            except DatabaseError:
+                time.sleep(0.01)
+
+        def work():
+            buffer = counters.CounterBuffer()
+            try:
+                start.wait()
+                for hit in range(hits):
+                    for pk in ids:
+                        buffer.add(pk, 'views')
+                    if hit % 10 == 9:
+                        flush(buffer)
+                while len(buffer):
+                    flush(buffer)
+            finally:
+                connections.close_all()
+
+        # Повторы после блокировки ожидаемы — не засоряем вывод тестов трассировками
+        with mock.patch.object(counters.logger, 'exception'):
+            threads = [threading.Thread(target=work) for _ in range(workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(
+            dict(ArticleCounters.objects.values_list('pk', 'views')),
+            dict.fromkeys(ids, workers * hits),
+        )
+
+
+@override_settings(BLOG_PAGE_CACHE=True, BLOG_RELATED_UPDATE_DELAY=0)
+class FeedTests(TestCase):
+    """Ленты и sitemap собираются один раз на версию данных и отвечают 304 без SQL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(published=12, drafts=1)
+
+    def setUp(self):
+        cache.clear()
+        shard_size = mock.patch.object(feeds, 'SITEMAP_SHARD_SIZE', 5)
+        shard_size.start()
+        self.addCleanup(shard_size.stop)
+
+    def test_conditional_get(self):
+        client = probe_client()
+        for name in ('blog:feed', 'blog:feed_atom', 'blog:sitemap'):
+            with self.subTest(name):
+                url = reverse(name)
+                response = client.get(url)
+                self.assertEqual(response.status_code, 200)
+                with self.assertNumQueries(0):
+                    cached = client.get(url)
+                    by_etag = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+                    by_date = client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(cached.content, response.content)
+                self.assertEqual(by_etag.status_code, 304)
+                self.assertEqual(by_date.status_code, 304)
+
+    def test_sitemap_shards(self):
+        client = probe_client()
+        published = Article.objects.filter(status=Article.Status.PUBLISHED)
+        shards = sorted({feeds.sitemap_shard(pk) for pk in published.values_list('pk', flat=True)})
+        index = client.get(reverse('blog:sitemap')).content.decode()
+        for shard in shards:
+            self.assertIn(reverse('blog:sitemap_articles', args=[shard]), index)
+        urls = ''.join(
+            client.get(reverse('blog:sitemap_articles', args=[shard])).content.decode() for shard in shards
+        )
+        self.assertEqual(urls.count('<url>'), published.count())
+        self.assertNotIn('draft-0', urls)
+
+    def test_only_changed_shard_is_rebuilt(self):
+        client = probe_client()
+        article = Article.objects.filter(status=Article.Status.PUBLISHED).order_by('pk').first()
+        changed = reverse('blog:sitemap_articles', args=[feeds.sitemap_shard(article.pk)])
+        other = reverse('blog:sitemap_articles', args=[feeds.sitemap_shard(article.pk) + 1])
+        feed = client.get(reverse('blog:feed'))
+        client.get(changed)
+        client.get(other)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            article.title = 'Новый заголовок'
+            article.save()
+
+        with self.assertNumQueries(0):
+            client.get(other)
+        with self.assertNumQueries(1):
+            client.get(changed)
+        response = client.get(reverse('blog:feed'), HTTP_IF_NONE_MATCH=feed['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый заголовок')
+
+
+class ExportStaticTests(TestCase):
+    """Статический экспорт: полный, затем инкрементальный после правки и снятия статьи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(published=12, drafts=1)
+
+    def setUp(self):
+        self.root = Path(self.enterContext(tempfile.TemporaryDirectory()))
+
+    def export(self, *args):
+        call_command('export_static', '--output', str(self.root), '--processes', '1', *args, stdout=io.StringIO())
+        return json.loads((self.root / 'manifest.json').read_text())
+
+    def test_full_then_incremental(self):
+        manifest = self.export()
+        published = Article.objects.filter(status=Article.Status.PUBLISHED)
+        article = published.order_by('created_at').first()
+        detail = article.get_absolute_url()
+        # Главная, 2 страницы общего списка, 4 категории по одной странице и все статьи
+        self.assertEqual(len(manifest['pages']), 1 + 2 + 4 + published.count())
+        self.assertTrue((self.root / 'article' / article.slug / 'index.html').exists())
+        self.assertTrue((self.root / 'articles' / 'page' / '2' / 'index.html.gz').exists())
+        self.assertNotIn(reverse('blog:article_detail', args=['draft-0']), manifest['pages'])
+        with gzip.open(self.root / 'index.html.gz') as compressed:
+            self.assertEqual(compressed.read(), (self.root / 'index.html').read_bytes())
+
+        article.title = 'Обновлённый заголовок'
+        article.save()
+        with mock.patch.object(export, 'write_page', wraps=export.write_page) as write_page:
+            self.export('--incremental')
+        rendered = {call.args[1] for call in write_page.call_args_list}
+        self.assertIn(detail, rendered)
+        self.assertIn(reverse('blog:index'), rendered)
+        # Самая старая статья — на последней странице общего списка и своей категории
+        self.assertIn(reverse('blog:article_list') + '?page=2', rendered)
+        self.assertNotIn(reverse('blog:article_list'), rendered)
+        self.assertIn('Обновлённый заголовок', (self.root / 'article' / article.slug / 'index.html').read_text())
+
+        article.status = Article.Status.DRAFT
+        article.save()
+        manifest = self.export('--incremental')
+        self.assertNotIn(detail, manifest['pages'])
+        self.assertFalse((self.root / 'article' / article.slug / 'index.html').exists())
+
+    def test_category_move(self):
+        self.export()
+        article = Article.objects.filter(status=Article.Status.PUBLISHED, category__slug='category-0').first()
+        target = Category.objects.get(slug='category-1')
+        Article.objects.filter(pk=article.pk).update(category=target)
+
+        with mock.patch.object(export, 'write_page', wraps=export.write_page) as write_page:
+            manifest = self.export('--incremental')
+        rendered = {call.args[1] for call in write_page.call_args_list}
+        self.assertLessEqual(
+            {export.list_url(category='category-0'), export.list_url(category='category-1'), article.get_absolute_url()},
+            rendered,
+        )
+        self.assertNotIn(article.title, (self.root / 'articles' / 'category' / 'category-0' / 'index.html').read_text())
+        self.assertIn(article.title, (self.root / 'articles' / 'category' / 'category-1' / 'index.html').read_text())
+        self.assertEqual(manifest['articles'][article.slug]['category'], 'category-1')
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class CardCacheTests(TestCase):
+    """Кэш карточек: список читает все карточки одним запросом к кэшу и рендерит только изменённые."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(authors=1, categories=2, published=9, drafts=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def articles(self):
+        return list(Article.objects.select_related('category').order_by('pk'))
+
+    def render(self, articles):
+        with mock.patch.object(cards, '_render', wraps=cards._render) as render:
+            html = cards.render_cards(articles)
+        return html, render.call_count
+
+    def test_renders_only_misses(self):
+        with override_settings(BLOG_CARD_CACHE=False):
+            uncached = cards.render_cards(self.articles())
+        self.assertEqual(self.render(self.articles()), (uncached, 9))
+        self.assertEqual(self.render(self.articles()), (uncached, 0))
+
+        article = Article.objects.get(slug='published-3')
+        article.title = 'Новый заголовок'
+        article.save()
+        html, rendered = self.render(self.articles())
+        self.assertEqual(rendered, 1)
+        self.assertIn('Новый заголовок', html)
+
+    def test_category_rename(self):
+        self.render(self.articles())
+        category = Category.objects.get(slug='category-0')
+        category.name = 'Переименованная'
+        with self.captureOnCommitCallbacks(execute=True):
+            category.save()
+        html, rendered = self.render(self.articles())
+        self.assertEqual(rendered, 5)
+        self.assertIn('Переименованная', html)
+
+    def test_search_results_are_not_cached(self):
+        articles = self.articles()
+        articles[0].search_snippet = mark_safe('найденный <mark>фрагмент</mark>')
+        self.render(articles)
+        html, rendered = self.render(articles)
+        self.assertEqual(rendered, 1)
+        self.assertIn('найденный <mark>фрагмент</mark>', html)
+
+    def test_list_page(self):
+        self.client.get(reverse('blog:article_list'))
+        with mock.patch.object(cards, '_render') as render:
+            response = self.client.get(reverse('blog:article_list'))
+        render.assert_not_called()
+        self.assertContains(response, 'class="group fade-up article-card', count=9)
+
+
+class AutosaveTests(TestCase):
+    """Автосохранение черновика: правка относительно ревизии, условный UPDATE и конфликт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.category = Category.objects.create(name='Заметки', slug='notes')
+        cls.draft = Article.objects.create(
+            title='Черновик', slug='draft', category=cls.category, author=cls.author,
+            content='Первая строка\r\nвторая строка 🙂 и ' + 'текст ' * 8000,
+        )
+
+    def setUp(self):
+        self.client = probe_client(self.author)
+        self.url = reverse('blog:article_autosave', args=[self.draft.pk])
+
+    def post(self, **payload):
+        return self.client.post(self.url, payload, content_type='application/json')
+
+    def test_applies_patch(self):
+        # Смещения — по тексту с \n: «🙂» — один символ, как в textarea после нормализации
+        start = len('Первая строка\nвторая строка 🙂')
+        response = self.post(revision=0, title='Новый заголовок', patch=[start, start, ' правка'])
+        self.assertEqual(response.json(), {'ok': True, 'revision': 1})
+
+        draft = Article.objects.get(pk=self.draft.pk)
+        self.assertTrue(draft.content.startswith('Первая строка\nвторая строка 🙂 правка и текст'))
+        self.assertEqual((draft.title, draft.revision), ('Новый заголовок', 1))
+        self.assertGreater(draft.updated_at, self.draft.updated_at)
+        # HTML пересчитывается при сохранении формы, не автосохранением; до тех пор он помечен устаревшим
+        self.assertEqual(draft.content_html, self.draft.content_html)
+        self.assertTrue(draft.is_derived_stale)
+        self.assertEqual(draft.word_count, self.draft.word_count + 1)
+        self.assertTrue(draft.excerpt.startswith('Первая строка вторая строка 🙂 правка и текст'))
+        self.assertEqual(draft.slug, 'draft')
+
+    def test_profile_shows_autosaved_excerpt(self):
+        self.post(revision=0, patch=[0, len(self.draft.content.replace('\r\n', '\n')), 'Совсем **новый** текст.'])
+        draft = Article.objects.get(pk=self.draft.pk)
+        self.assertEqual((draft.excerpt, draft.word_count, draft.reading_time), ('Совсем новый текст.', 3, 1))
+        self.assertContains(self.client.get(reverse('accounts:profile')), 'Совсем новый текст.')
+
+    def test_stale_revision_conflicts(self):
+        self.assertEqual(self.post(revision=0, patch=[0, 0, 'А']).status_code, 200)
+        response = self.post(revision=0, patch=[0, 0, 'Б'])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['revision'], 1)
+        self.assertTrue(Article.objects.get(pk=self.draft.pk).content.startswith('АПервая'))
+
+    def test_concurrent_write_between_read_and_update(self):
+        article = Article.objects.only('pk', 'content', 'revision').get(pk=self.draft.pk)
+        Article.objects.filter(pk=self.draft.pk).update(revision=5)
+        with self.assertRaises(autosave.RevisionConflict) as conflict:
+            autosave.save_draft(article, 0, {'patch': [0, 0, 'А']})
+        self.assertEqual(conflict.exception.revision, 5)
+
+    def test_length_mismatch_conflicts(self):
+        self.assertEqual(self.post(revision=0, patch=[0, 0, 'А'], length=3).status_code, 409)
+
+    def test_invalid_requests(self):
+        for payload in (
+            {'patch': [0, 0, 'А']},
+            {'revision': 0, 'patch': [5, 2, '']},
+            {'revision': 0, 'patch': ['0', 0, 'А']},
+            {'revision': 0, 'patch': [0, 1.5, 'А']},
+            {'revision': 0, 'patch': [0, 0, 5]},
+            {'revision': 0, 'patch': None},
+            {'revision': 0, 'title': ''},
+        ):
+            with self.subTest(payload=payload):
+                self.assertEqual(self.post(**payload).status_code, 400)
+        self.assertEqual(self.client.post(self.url, 'не json', content_type='application/json').status_code, 400)
+
+    def test_only_own_drafts(self):
+        Article.objects.filter(pk=self.draft.pk).update(status=Article.Status.PUBLISHED)
+        self.assertEqual(self.post(revision=0, patch=[0, 0, 'А']).status_code, 404)
+        other = User.objects.create_user(username='other', password='password')
+        self.assertEqual(
+            probe_client(other).post(self.url, {'revision': 0}, content_type='application/json').status_code,
+            404,
+        )
+
+    def test_form_save_bumps_revision(self):
+        self.post(revision=0, title='Заголовок из автосохранения')
+        response = self.client.post(reverse('blog:article_edit', args=['draft']), {
+            'title': 'Заголовок из автосохранения',
+            'category': self.category.pk,
+            'content': 'Текст',
+            'status': Article.Status.DRAFT,
+        })
+        self.assertEqual(response.status_code, 302)
+        draft = Article.objects.get(pk=self.draft.pk)
+        self.assertEqual(draft.revision, 2)
+        # slug черновика догоняет заголовок, записанный автосохранением
+        self.assertEqual(draft.slug, 'zagolovok-iz-avtosokhraneniia')
+        self.assertEqual(self.post(revision=1, patch=[0, 0, 'А']).status_code, 409)
+
+
+class PreviewTests(TestCase):
+    """Предпросмотр в редакторе: HTML как у статьи, повторно рендерятся только изменённые блоки."""
+
+    DOCUMENT = (
+        '# Введение\r\n\r\nТекст с "кавычками" -- и переносом\r\nстроки.\r\n\r\n'
+        '```python\r\ndef handler():\r\n\r\n    return 1\r\n```\r\n\r\n'
+        '- пункт\r\n\r\n- пункт с продолжением\r\n\r\n    второй абзац\r\n\r\n'
+        '| a | b |\r\n|---|---|\r\n| 1 | 2 |\r\n\r\n'
+        '> цитата\r\n\r\n> продолжение\r\n\r\n'
+        '# Введение\r\n\r\nКонец.'
+    )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_matches_full_render(self):
+        for text in (self.DOCUMENT, 'см. [ссылку][1]\n\n[1]: https://example.com', '', '```\nнезакрытый\n\nблок'):
+            with self.subTest(text=text[:20]):
+                self.assertEqual(rendering.render_preview(text).html, rendering.render_html(text))
+
+    def test_renders_only_changed_blocks(self):
+        first = rendering.render_preview(self.DOCUMENT)
+        # Два одинаковых заголовка — один блок в кэше
+        self.assertEqual((first.blocks, first.rendered), (8, 7))
+        self.assertEqual(rendering.render_preview(self.DOCUMENT).rendered, 0)
+
+        edited = self.DOCUMENT.replace('Конец.', 'Конец статьи.')
+        with mock.patch.object(rendering, 'render', wraps=rendering.render) as render:
+            preview = rendering.render_preview(edited)
+        self.assertEqual(preview.rendered, 1)
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(preview.html, rendering.render_html(edited))
+
+    def test_view(self):
+        url = reverse('blog:article_preview')
+        self.assertEqual(self.client.post(url, {'content': '# Заголовок'}).status_code, 302)
+
+        author = User.objects.create_user(username='author', password='password')
+        response = probe_client(author).post(url, {'content': '**жирный**'})
+        self.assertEqual(response.json(), {'html': '<p><strong>жирный</strong></p>', 'blocks': 1, 'rendered': 1})
+
+
+class RenderedContentTests(TestCase):
+    """HTML и оглавление статьи считаются при сохранении и только при изменении текста."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.category = Category.objects.create(name='Заметки', slug='notes')
+
+    def create(self, content):
+        return Article.objects.create(
+            title='Статья', slug='article', content=content, category=self.category, author=self.author,
+        )
+
+    def test_rendered_on_save(self):
+        article = self.create('[TOC]\n\n## Раздел\n\n```python\nprint(1)\n```')
+        html, toc = rendering.render(article.content)
+        self.assertEqual((article.content_html, article.content_toc), (html, toc))
+        self.assertIn('class="highlight"', article.content_html)
+        self.assertIn('href="#_1"', article.content_toc)
+
+        with mock.patch.object(rendering, 'render', wraps=rendering.render) as render:
+            article.title = 'Новый заголовок'
+            article.save()
+            self.assertEqual(render.call_count, 0)
+            article.content = '## Другой раздел'
+            article.save()
+            self.assertEqual(render.call_count, 1)
+        self.assertIn('Другой раздел', Article.objects.get(pk=article.pk).content_html)
+
+    def test_stale_html(self):
+        article = self.create('**жирный**')
+        # Строка, сохранённая до смены рендерера
+        Article.objects.filter(pk=article.pk).update(content_html='старый', content_hash='')
+        stale = Article.objects.get(pk=article.pk)
+        self.assertTrue(stale.is_derived_stale)
+        self.assertEqual(stale.rendered_content, '<p><strong>жирный</strong></p>')
+
+        call_command('refresh_articles', stdout=io.StringIO())
+        self.assertEqual(Article.objects.get(pk=article.pk).content_html, '<p><strong>жирный</strong></p>')
+        self.assertFalse(Article.objects.get(pk=article.pk).is_derived_stale)
+
+
+class DerivedFieldsTests(TestCase):
+    """Количество слов, время чтения и отрывок хранятся на статье, списки не грузят текст."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.category = Category.objects.create(name='Заметки', slug='notes')
+
+    def test_fields_on_save(self):
+        content = '## Заголовок\n\nТекст с **разметкой** и [ссылкой](https://example.com).\n\n' + 'слово ' * 450
+        article = Article.objects.create(
+            title='Статья', slug='article', content=content, category=self.category, author=self.author,
+        )
+        self.assertEqual(article.word_count, len(content.split()))
+        self.assertEqual(article.reading_time, 3)
+        self.assertTrue(article.excerpt.startswith('Заголовок Текст с разметкой и ссылкой.'))
+        self.assertEqual(len(article.excerpt.split()), Article.EXCERPT_WORDS)
+        self.assertNotIn('<', article.excerpt)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_list_uses_stored_fields(self):
+        Article.objects.create(
+            title='Статья', slug='article', content='Первые слова статьи.', category=self.category,
+            author=self.author, status=Article.Status.PUBLISHED,
+        )
+        response = self.client.get(reverse('blog:article_list'))
+        article = response.context['articles'][0]
+        self.assertTrue({'content', 'content_html'} <= article.get_deferred_fields())
+        self.assertContains(response, 'Первые слова статьи.')
+        self.assertContains(response, '1 мин')
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class SearchTests(TestCase):
+    """Полнотекстовый поиск: русские словоформы, ранжирование, подсветка и обновление индекса."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author', password='password')
+        cls.category = Category.objects.create(name='Заметки', slug='notes')
+
+    def create(self, title, content, slug):
+        return Article.objects.create(
+            title=title, slug=slug, content=content, category=self.category,
+            author=self.author, status=Article.Status.PUBLISHED,
+        )
+
+    def found(self, query):
+        return [article.slug for article in self.client.get(reverse('blog:article_list'), {'q': query}).context['articles']]
+
+    def test_russian_inflections(self):
+        self.create('Кэш', 'Планы медленных запросов к базе данных.', 'plans')
+        self.create('Ёлки', 'Ёлочные игрушки.', 'trees')
+        for query in ('запросы', 'запросами', 'медленный запрос', 'базы', 'ёлка'):
+            with self.subTest(query):
+                self.assertEqual(len(self.found(query)), 1)
+        self.assertEqual(self.found('запросы кэша'), ['plans'])
+        self.assertEqual(self.found('индексы'), [])
+
+    def test_title_ranked_first_and_highlighted(self):
+        self.create('Заметка', 'Кратко про индексы в SQLite & PostgreSQL.', 'body')
+        self.create('Индексы', 'Подробный разбор.', 'title')
+        response = self.client.get(reverse('blog:article_list'), {'q': 'индексов'})
+        self.assertEqual([article.slug for article in response.context['articles']], ['title', 'body'])
+        self.assertContains(response, '<mark>индексы</mark> в SQLite &amp; PostgreSQL.')
+
+    def test_index_follows_changes(self):
+        article = self.create('Заметка', 'Про кэширование.', 'note')
+        article.content = 'Про репликацию.'
+        article.save()
+        self.assertEqual(self.found('кэширование'), [])
+        self.assertEqual(self.found('репликации'), ['note'])
+        article.delete()
+        self.assertEqual(self.found('репликации'), [])
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class CursorPaginationTests(TestCase):
+    """Курсорная пагинация: без COUNT и OFFSET, стабильна при одинаковом created_at."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(authors=1, categories=1, published=23, drafts=0)
+        # Одинаковое время у соседних статей: порядок держится на id
+        first = Article.objects.order_by('pk').first()
+        Article.objects.filter(pk__lte=first.pk + 5).update(created_at=first.created_at)
+
+    def test_walks_forward_and_back(self):
+        expected = list(Article.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+        paginator = CursorPaginator(Article.objects.all(), 5)
+        pages, cursor = [], None
+        while True:
+            with CaptureQueriesContext(connection) as ctx:
+                page = paginator.page(cursor)
+            sql = ctx.captured_queries[0]['sql']
+            self.assertNotIn('COUNT(', sql)
+            self.assertNotIn('OFFSET', sql)
+            pages.append(page)
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([article.pk for page in pages for article in page], expected)
+        self.assertEqual([len(page) for page in pages], [5, 5, 5, 5, 3])
+
+        back = paginator.page(pages[-1].previous_cursor)
+        self.assertEqual(list(back), list(pages[-2]))
+        self.assertEqual(list(paginator.page('подделка')), list(pages[0]))
+
+    @override_settings(BLOG_CURSOR_PAGINATION=True, BLOG_OFFSET_PAGES=2)
+    def test_article_list_switches_to_cursor(self):
+        url = reverse('blog:article_list')
+        deep = self.client.get(url, {'page': 99})
+        self.assertEqual(deep.context['page_obj'].number, 2)
+        next_cursor = deep.context['next_cursor']
+        self.assertIsNotNone(next_cursor)
+
+        third = self.client.get(url, {'cursor': next_cursor})
+        self.assertEqual(len(third.context['articles']), 5)
+        self.assertNotIn(third.context['articles'][0], list(deep.context['articles']))
+
+
+class ArticleStatsTests(TestCase):
+    """Счётчики публикаций поддерживаются сигналами и совпадают с пересчётом по статьям."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.authors = seed_blog(authors=2, categories=2, published=6, drafts=2)
+
+    def assertStatsMatch(self):
+        fields = ('articles', 'authors', 'categories')
+        stored = {
+            (row.scope, row.object_id): {field: getattr(row, field) for field in fields}
+            for row in ArticleStats.objects.all()
+        }
+        for key, values in stats.compute().items():
+            self.assertEqual({f: stored[key][f] for f in values}, values, key)
+        self.assertFalse(stats.reconcile())
+
+    def test_signals_keep_counters(self):
+        self.assertStatsMatch()
+        site = ArticleStats.site()
+        self.assertEqual((site.articles, site.authors, site.categories), (6, 2, 2))
+
+        draft = Article.objects.filter(status=Article.Status.DRAFT).first()
+        draft.status = Article.Status.PUBLISHED
+        draft.save()
+        moved = Article.objects.filter(status=Article.Status.PUBLISHED, category__slug='category-0').first()
+        moved.category = Category.objects.get(slug='category-1')
+        moved.save()
+        # Все публикации второго автора уходят в черновики — авторов с публикациями становится меньше
+        for article in Article.objects.filter(author=self.authors[1], status=Article.Status.PUBLISHED):
+            article.status = Article.Status.DRAFT
+            article.save()
+        Article.objects.filter(status=Article.Status.PUBLISHED).first().delete()
+        Category.objects.create(name='Новая', slug='new')
+        self.assertStatsMatch()
+        self.assertEqual(ArticleStats.site().authors, 1)
+
+    def test_reconcile(self):
+        ArticleStats.objects.filter(scope=ArticleStats.Scope.SITE).update(articles=100)
+        stdout = io.StringIO()
+        call_command('reconcile_stats', stdout=stdout)
+        self.assertIn('Строк исправлено: 1.', stdout.getvalue())
+        self.assertEqual(ArticleStats.site().articles, 6)
+
+    @override_settings(BLOG_PAGE_CACHE=False)
+    def test_index_reads_counters(self):
+        response = self.client.get(reverse('blog:index'))
+        self.assertEqual(
+            (response.context['total_articles'], response.context['total_categories'], response.context['total_authors']),
+            (6, 2, 2),
+        )
+
+
+@override_settings(BLOG_PAGE_CACHE=True, BLOG_RELATED_UPDATE_DELAY=0)
+class PageCacheTests(TestCase):
+    """Кэш страниц для анонимов: повтор без SQL, сброс при сохранении, свой CSRF-токен у каждого."""
+
+    TOKEN_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(published=8, drafts=0)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_hit_and_invalidation(self):
+        client = probe_client()
+        client.get(reverse('blog:index'))
+        with self.assertNumQueries(0):
+            response = client.get(reverse('blog:index'))
+        self.assertEqual(response.status_code, 200)
+
+        article = Article.objects.filter(status=Article.Status.PUBLISHED).order_by('-created_at').first()
+        with self.captureOnCommitCallbacks(execute=True):
+            article.title = 'Новый заголовок'
+            article.save()
+        self.assertContains(client.get(reverse('blog:index')), 'Новый заголовок')
+
+    def test_csrf_token_is_not_shared(self):
+        first, second = Client(enforce_csrf_checks=True), Client(enforce_csrf_checks=True)
+        first_page = first.get(reverse('blog:index')).content.decode()
+        with self.assertNumQueries(0):
+            second_page = second.get(reverse('blog:index')).content.decode()
+
+        self.assertNotIn(CSRF_PLACEHOLDER.decode(), second_page)
+        first_token = self.TOKEN_RE.search(first_page).group(1)
+        second_token = self.TOKEN_RE.search(second_page).group(1)
+        self.assertNotEqual(first_token, second_token)
+        self.assertNotEqual(first.cookies['csrftoken'].value, second.cookies['csrftoken'].value)
+
+        # Токен из кэша подходит только к cookie своего посетителя
+        subscribe = reverse('blog:subscribe')
+        response = second.post(subscribe, {'email': 'reader@example.com', 'csrfmiddlewaretoken': second_token})
+        self.assertEqual(response.status_code, 200)
+        response = second.post(subscribe, {'email': 'reader@example.com', 'csrfmiddlewaretoken': first_token})
+        self.assertEqual(response.status_code, 403)
+
+
+@override_settings(BLOG_PAGE_CACHE=True, BLOG_RELATED_UPDATE_DELAY=0, DATABASE_REPLICAS=['replica1'])
+class ReplicaPageCacheTests(TransactionTestCase):
+    """Реплика — отдельный файл SQLite, скопированный с основной базы и не догоняющий её."""
+
+    @classmethod
+    def setUpClass(cls):
+        directory = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(directory.cleanup)
+        cls.replica_path = Path(directory.name, 'replica.sqlite3')
+        connections.settings['replica1'] = {**connections.settings['default'], 'NAME': str(cls.replica_path)}
+        cls.addClassCleanup(cls.drop_replica)
+        # Псевдоним появляется только здесь: раннер тестов проверяет базы классов заранее
+        cls.databases = {'default', 'replica1'}
+        super().setUpClass()
+
+    @classmethod
+    def drop_replica(cls):
+        connections['replica1'].close()
+        del connections['replica1']
+        del connections.settings['replica1']
+
+    def setUp(self):
+        cache.clear()
+        seed_blog(authors=1, categories=1, published=3, drafts=0)
+        connections['replica1'].close()
+        connection.ensure_connection()
+        with closing(sqlite3.connect(self.replica_path)) as replica:
+            connection.connection.backup(replica)
+
+    def test_miss_after_publish_renders_from_primary(self):
+        client = Client()
+        self.assertEqual(client.get(reverse('blog:index')).status_code, 200)
+        self.assertEqual(client.get(reverse('blog:feed')).status_code, 200)
+        article = Article.objects.create(
+            title='Свежая статья', slug='fresh', category=Category.objects.get(), author=User.objects.get(),
+            content='Текст', status=Article.Status.PUBLISHED,
+        )
+        self.assertFalse(Article.objects.using('replica1').filter(pk=article.pk).exists())
+
+        for url in (reverse('blog:index'), reverse('blog:article_list'), article.get_absolute_url(), reverse('blog:feed')):
+            with self.subTest(url):
+                self.assertContains(client.get(url), 'Свежая статья')
+                # Повтор отдаётся из кэша — той же страницей
+                self.assertContains(client.get(url), 'Свежая статья')
+        # Вне кэша страниц чтение по-прежнему идёт с реплики
+        with self.settings(BLOG_PAGE_CACHE=False):
+            self.assertNotContains(client.get(reverse('blog:article_list')), 'Свежая статья')
+
+
+def png_upload(name='cover.png', size=(1000, 500)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'steelblue').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(BLOG_PAGE_CACHE=False, BLOG_RELATED_UPDATE_DELAY=0)
+class ImageVariantsTests(TestCase):
+    """Копии обложки создаются после коммита вне сохранения; до этого страницы показывают оригинал."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(authors=1, categories=1, published=1, drafts=0)
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+        self.article = Article.objects.get()
+
+    def test_save_does_not_generate(self):
+        with mock.patch.object(images, 'generate') as generate, \
+                mock.patch.object(signals.threading, 'Thread') as thread, \
+                self.captureOnCommitCallbacks(execute=True):
+            self.article.image = png_upload()
+            self.article.save()
+        generate.assert_not_called()
+        thread.assert_called_once_with(target=signals._generate_image_variants, args=[self.article.pk], daemon=True)
+        thread.return_value.start.assert_called_once_with()
+
+        self.article.refresh_from_db()
+        self.assertEqual((self.article.image_sources, self.article.image_srcset), ([], ''))
+        self.assertEqual(self.article.og_image_url, self.article.image.url)
+        response = probe_client().get(self.article.get_absolute_url())
+        self.assertContains(response, f'src="{self.article.image.url}"')
+        self.assertNotContains(response, 'srcset=')
+
+    @override_settings(BLOG_IMAGE_VARIANTS_ON_SAVE=False)
+    def test_command_generates_variants(self):
+        self.article.image = png_upload()
+        self.article.save()
+        call_command('generate_image_variants', stdout=io.StringIO())
+
+        self.article.refresh_from_db()
+        variants = self.article.current_image_variants
+        self.assertEqual((variants['width'], variants['height']), (1000, 500))
+        self.assertIn('480w', self.article.image_srcset)
+        self.assertTrue(self.article.og_image_url.endswith('-1000w.jpeg'))
+        self.assertContains(probe_client().get(self.article.get_absolute_url()), 'width="1000" height="500"')
+
+        # Новая обложка: до новых копий — оригинал, а не копии прежней
+        self.article.image = png_upload('second.png', (600, 300))
+        self.article.save()
+        self.article.refresh_from_db()
+        self.assertEqual(self.article.current_image_variants, {})
+        self.assertEqual(self.article.og_image_url, self.article.image.url)
+        self.assertTrue(self.article.refresh_image_variants())
+        self.assertEqual(Article.objects.get().image_variants['source'], self.article.image.name)
+
+
+@override_settings(BLOG_PAGE_CACHE=False, BLOG_IMAGE_VARIANTS_ON_SAVE=False)
+class SeedBlogCommandTests(TestCase):
+    """Синтетические данные: воспроизводимы, согласованы со счётчиками, индексом и похожими."""
+
+    OPTIONS = {'users': 2, 'categories': 3, 'articles': 6, 'drafts': 2, 'images': 1, 'batch_size': 4}
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media.name))
+
+    def seed(self, **options):
+        call_command('seed_blog', **{**self.OPTIONS, **options}, stdout=io.StringIO())
+        return list(Article.objects.order_by('slug').values_list('slug', 'title', 'status'))
+
+    def test_seed_and_clear(self):
+        articles = self.seed(cover_ratio=1)
+        self.assertEqual(len(articles), 8)
+        self.assertEqual(sum(status == Article.Status.PUBLISHED for *_, status in articles), 6)
+        self.assertEqual(stats.reconcile(), [])
+        self.assertEqual(RelatedArticle.objects.values('article').distinct().count(), 6)
+        for article in Article.objects.filter(status=Article.Status.PUBLISHED):
+            self.assertTrue(article.image)
+            self.assertIn('jpeg', article.current_image_variants['formats'])
+        self.assertEqual(probe_client().get(reverse('blog:article_list')).status_code, 200)
+
+        with self.assertRaisesMessage(CommandError, '--clear'):
+            self.seed()
+        self.assertEqual(self.seed(clear=True), articles)
+        self.assertNotEqual(self.seed(clear=True, seed=7), articles)
+
+    def test_invalid_options(self):
+        with self.assertRaisesMessage(CommandError, '--cover-ratio'):
+            self.seed(cover_ratio=2)
+        with self.assertRaisesMessage(CommandError, 'хотя бы один автор'):
+            self.seed(users=0)
@@ -9,6 +9,19 @@ urlpatterns = [
     path("article/<slug:slug>/", views.article_detail, name="article_detail"),
     path("editor/", views.article_create, name="article_create"),
     path("editor/<slug:slug>/", views.article_edit, name="article_edit"),
+    path("editor/<int:pk>/autosave/", views.article_autosave, name="article_autosave"),
+    # Не под editor/: там адрес занял бы slug статьи «preview»
+    path("preview/", views.article_preview, name="article_preview"),
     path("article/<slug:slug>/delete/", views.article_delete, name="article_delete"),
+    # Счётчики: запись отложенная, ответ — из кэша (apps.blog.counters)
+    path("article/<int:pk>/view/", views.article_view, name="article_view"),
+    path("article/<int:pk>/react/", views.article_react, name="article_react"),
     path("subscribe/", views.subscribe, name="subscribe"),
+    # Ленты и sitemap для краулеров
+    path("feed/", views.feed, name="feed"),
+    path("feed/atom/", views.feed_atom, name="feed_atom"),
+    path("feed/category/<slug:slug>/", views.category_feed, name="category_feed"),
+    path("sitemap.xml", views.sitemap_index, name="sitemap"),
+    path("sitemap-pages.xml", views.sitemap_pages, name="sitemap_pages"),
+    path("sitemap-articles-<int:shard>.xml", views.sitemap_articles, name="sitemap_articles"),
 ]
\ No newline at end of file
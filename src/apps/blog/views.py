@@ -1,121 +1,194 @@
-import math
+import asyncio
+import json
 
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
-from django.db.models import Q
-from django.http import JsonResponse
-from django.shortcuts import render, get_object_or_404, redirect
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.shortcuts import aget_object_or_404, render, get_object_or_404, redirect
 from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils.http import http_date
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
+from apps.core import routers, subscriptions
 from apps.core.models import Subscriber
+from . import autosave, counters, feeds, rendering, search
+from .cache import aadd_page_dependencies, cache_document, cache_page_for_anonymous
 from .forms import ArticleForm
-from .models import Article, Category
+from .models import Article, ArticleStats, Category
+from .pagination import CappedPaginator, CursorPaginator, aget_page
 
 
-def _reading_time(text):
-    """Calculate reading time in minutes (avg 200 wpm)."""
-    return max(1, math.ceil(len(text.split()) / 200))
+# Тяжёлые текстовые поля, не нужные спискам: карточки используют excerpt и reading_time
+LIST_DEFERRED_FIELDS = ('content', 'content_html', 'content_toc')
+ARTICLES_PER_PAGE = 9
+RELATED_ARTICLES = 2
 
 
-def index(request):
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+@cache_page_for_anonymous('home')
+async def index(request):
     """Главная страница с featured-статьёй и последними постами."""
     published = Article.objects.filter(
         status=Article.Status.PUBLISHED
-    ).order_by('-created_at')
-
-    featured = published.first()
-    articles = published.exclude(pk=featured.pk)[:6] if featured else published[:6]
+    ).select_related('category', 'counters').defer(*LIST_DEFERRED_FIELDS).order_by('-created_at')
 
-    # Annotate reading time
-    for article in articles:
-        article.reading_time = _reading_time(article.content)
-    if featured:
-        featured.reading_time = _reading_time(featured.content)
+    # Лента и счётчики не зависят друг от друга — запрашиваем их одновременно.
+    # Первая статья ленты — featured, следующие шесть — карточки.
+    latest, stats, user = await asyncio.gather(
+        _alist(published[:7]),
+        ArticleStats.asite(),
+        request.auser(),
+    )
+    featured, articles = (latest[0], latest[1:]) if latest else (None, [])
 
     return render(request, 'blog/index.html', {
+        'user': user,
         'featured': featured,
         'articles': articles,
-        'total_articles': published.count(),
-        'total_categories': Category.objects.count(),
-        'total_authors': published.values('author').distinct().count(),
+        'total_articles': stats.articles,
+        'total_categories': stats.categories,
+        'total_authors': stats.authors,
     })
 
 
-def article_list(request):
+@cache_page_for_anonymous('list')
+async def article_list(request):
     """Все статьи с поиском и фильтрацией по категориям."""
     query = request.GET.get('q', '')
     category_slug = request.GET.get('category', '')
 
     articles = Article.objects.filter(
         status=Article.Status.PUBLISHED
-    ).order_by('-created_at')
+    ).select_related('category', 'counters').defer(*LIST_DEFERRED_FIELDS).order_by('-created_at', '-pk')
 
     if query:
-        articles = articles.filter(
-            Q(title__icontains=query)
-            | Q(description__icontains=query)
-            | Q(content__icontains=query)
-        )
+        articles = (await search.aget_backend()).search(articles, query)
 
     if category_slug:
         articles = articles.filter(category__slug=category_slug)
 
-    categories = Category.objects.all()
-
-    paginator = Paginator(articles, 9)
-    page = request.GET.get('page')
-    page_obj = paginator.get_page(page)
-
-    # Annotate reading time
+    async def load_page():
+        """Страница статей и курсор продолжения после последней страницы по номеру."""
+        cursor = request.GET.get('cursor')
+        # Результаты поиска упорядочены по релевантности, а не по дате — для них только номера страниц
+        if settings.BLOG_CURSOR_PAGINATION and cursor and not query:
+            return await CursorPaginator(articles, ARTICLES_PER_PAGE).apage(cursor), None
+        if settings.BLOG_CURSOR_PAGINATION:
+            paginator = CappedPaginator(articles, ARTICLES_PER_PAGE, settings.BLOG_OFFSET_PAGES)
+            page_obj = await aget_page(paginator, request.GET.get('page'))
+            # С последней страницы по номеру листаем дальше курсором
+            if not query and paginator.is_capped and page_obj.number == paginator.num_pages:
+                return page_obj, CursorPaginator(articles, ARTICLES_PER_PAGE).cursor_after(page_obj[-1])
+            return page_obj, None
+        return await aget_page(Paginator(articles, ARTICLES_PER_PAGE), request.GET.get('page')), None
+
+    (page_obj, next_cursor), categories, user = await asyncio.gather(
+        load_page(),
+        _alist(Category.objects.all()),
+        request.auser(),
+    )
+
+    # Фрагменты с подсвеченными совпадениями для карточек результатов поиска
     for article in page_obj:
-        article.reading_time = _reading_time(article.content)
+        if getattr(article, 'search_snippet', None):
+            article.search_snippet = search.highlight(article.search_snippet)
 
     return render(request, 'blog/article_list.html', {
+        'user': user,
         'articles': page_obj,
         'page_obj': page_obj,
+        'next_cursor': next_cursor,
         'categories': categories,
         'current_category': category_slug,
         'search_query': query,
     })
 
 
-def article_detail(request, slug):
+@cache_page_for_anonymous(lambda request, slug: f'article:{slug}')
+async def article_detail(request, slug):
     """Страница отдельной статьи с похожими постами."""
-    article = get_object_or_404(Article, slug=slug)
+    article, user = await asyncio.gather(
+        aget_object_or_404(Article.objects.select_related('category', 'author', 'counters'), slug=slug),
+        request.auser(),
+    )
 
     # Черновики видны только автору
-    if article.status != Article.Status.PUBLISHED:
-        if not request.user.is_authenticated or request.user != article.author:
-            from django.http import Http404
-            raise Http404
-
-    article.reading_time = _reading_time(article.content)
+    if article.status != Article.Status.PUBLISHED and user != article.author:
+        raise Http404
 
-    # Похожие статьи: из той же категории, кроме текущей
+    # Похожие статьи посчитаны заранее (apps.blog.related): один запрос по индексу (article, rank)
     related_articles = Article.objects.filter(
+        related_to__article=article,
         status=Article.Status.PUBLISHED,
-        category=article.category,
-    ).exclude(pk=article.pk).order_by('-created_at')[:2] if article.category else []
+    ).only('slug', 'title', 'created_at').order_by('related_to__rank')[:RELATED_ARTICLES]
+
+    related_articles, _ = await asyncio.gather(
+        _alist(related_articles),
+        # Название категории на странице зависит от самой категории
+        aadd_page_dependencies(request, f'category:{article.category_id}'),
+    )
 
     return render(request, 'blog/article_detail.html', {
+        'user': user,
         'article': article,
         'related_articles': related_articles,
     })
 
 
 @require_POST
-def subscribe(request):
+async def subscribe(request):
     """Подписка на рассылку (AJAX)."""
     email = request.POST.get('email', '').strip()
     if not email:
         return JsonResponse({'ok': False, 'error': 'Email обязателен.'}, status=400)
+    try:
+        validate_email(email)
+    except ValidationError:
+        return JsonResponse({'ok': False, 'error': 'Некорректный email.'}, status=400)
 
-    _, created = Subscriber.objects.get_or_create(email=email)
+    if settings.SUBSCRIBE_COALESCE:
+        created = await subscriptions.asubscribe(email)
+    else:
+        _, created = await Subscriber.objects.aget_or_create(email=email)
     if created:
         return JsonResponse({'ok': True, 'message': 'Вы успешно подписались!'})
     return JsonResponse({'ok': True, 'message': 'Вы уже подписаны.'})
 
+
+# Страница статьи отдаётся из кэша страниц (и из статического экспорта) без
+# CSRF-cookie, а поддельный просмотр стоит не дороже настоящего — поэтому без CSRF
+@routers.not_sticky
+@csrf_exempt
+@require_POST
+async def article_view(request, pk):
+    """Просмотр статьи: его отправляет скрипт страницы. Отвечает текущими счётчиками."""
+    snapshot = await counters.asnapshot(pk)
+    if snapshot is None:
+        raise Http404
+    counters.BUFFER.add(pk, 'views')
+    return JsonResponse(snapshot)
+
+
+@routers.not_sticky
+@require_POST
+async def article_react(request, pk):
+    """Реакция на статью (AJAX). Отвечает счётчиками без учёта ещё не записанных приращений."""
+    snapshot = await counters.asnapshot(pk)
+    if snapshot is None:
+        raise Http404
+    counters.BUFFER.add(pk, 'reactions')
+    return JsonResponse(snapshot)
+
+
 @login_required
 def article_create(request):
     """Создание новой статьи."""
@@ -124,10 +197,9 @@ def article_create(request):
         if form.is_valid():
             article = form.save(commit=False)
             article.author = request.user
-            article.slug = form.generate_unique_slug()
             # Кнопка "Опубликовать" передаёт status=published, иначе — черновик
             article.status = request.POST.get('status', Article.Status.DRAFT)
-            article.save()
+            form.save_with_unique_slug(article)
             if article.status == Article.Status.PUBLISHED:
                 return redirect(article.get_absolute_url())
             return redirect('accounts:profile')
@@ -146,14 +218,19 @@ def article_edit(request, slug):
     article = get_object_or_404(Article, slug=slug, author=request.user)
 
     if request.method == 'POST':
+        was_draft = article.status == Article.Status.DRAFT
         form = ArticleForm(request.POST, request.FILES, instance=article)
         if form.is_valid():
             article = form.save(commit=False)
             article.status = request.POST.get('status', article.status)
-            # Обновляем slug только если заголовок изменился
-            if 'title' in form.changed_data:
-                article.slug = form.generate_unique_slug()
-            article.save()
+            # Автосохранение открытых редакторов этой статьи получит конфликт
+            article.revision = F('revision') + 1
+            # Обновляем slug только если заголовок изменился. Заголовок черновика
+            # могло уже записать автосохранение, поэтому его slug пересчитывается всегда.
+            if 'title' in form.changed_data or was_draft:
+                form.save_with_unique_slug(article)
+            else:
+                article.save()
             if article.status == Article.Status.PUBLISHED:
                 return redirect(article.get_absolute_url())
             return redirect('accounts:profile')
@@ -167,6 +244,40 @@ def article_edit(request, slug):
     })
 
 
+@login_required
+@require_POST
+def article_autosave(request, pk):
+    """Автосохранение черновика: JSON с ревизией и правкой текста вместо всей формы."""
+    article = get_object_or_404(
+        Article.objects.only('pk', 'content', 'revision'),
+        pk=pk, author=request.user, status=Article.Status.DRAFT,
+    )
+    try:
+        changes = json.loads(request.body)
+        revision = changes['revision']
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'ok': False, 'error': 'Некорректный запрос.'}, status=400)
+    try:
+        revision = autosave.save_draft(article, revision, changes)
+    except autosave.RevisionConflict as conflict:
+        return JsonResponse({
+            'ok': False,
+            'error': 'Черновик изменён в другом окне. Обновите страницу, чтобы не потерять правки.',
+            'revision': conflict.revision,
+        }, status=409)
+    except ValueError as error:
+        return JsonResponse({'ok': False, 'error': str(error)}, status=400)
+    return JsonResponse({'ok': True, 'revision': revision})
+
+
+@login_required
+@require_POST
+def article_preview(request):
+    """Предпросмотр Markdown из редактора тем же рендерером, что и у опубликованной статьи."""
+    preview = rendering.render_preview(request.POST.get('content', ''))
+    return JsonResponse({'html': preview.html, 'blocks': preview.blocks, 'rendered': preview.rendered})
+
+
 @login_required
 @require_POST
 def article_delete(request, slug):
@@ -174,4 +285,47 @@ def article_delete(request, slug):
     article = get_object_or_404(Article, slug=slug, author=request.user)
     article.delete()
     messages.success(request, 'Статья удалена.')
-    return redirect('accounts:profile')
\ No newline at end of file
+    return redirect('accounts:profile')
+
+feed = cache_document('list')(feeds.LatestArticlesFeed())
+feed_atom = cache_document('list')(feeds.LatestArticlesAtomFeed())
+category_feed = cache_document('list')(feeds.CategoryFeed())
+
+
+def _sitemap_response(request, template_name, context, lastmods):
+    response = render(request, template_name, {
+        'base_url': request.build_absolute_uri('/')[:-1],
+        **context,
+    }, content_type='application/xml')
+    lastmods = [lastmod for lastmod in lastmods if lastmod]
+    if lastmods:
+        response['Last-Modified'] = http_date(max(lastmods).timestamp())
+    return response
+
+
+@cache_document('list')
+def sitemap_index(request):
+    """Индекс sitemap: страницы сайта и файлы со статьями."""
+    pages = feeds.sitemap_pages()
+    sitemaps = [{'location': reverse('blog:sitemap_pages'), 'lastmod': pages[0]['lastmod']}]
+    sitemaps += [
+        {'location': reverse('blog:sitemap_articles', args=[shard]), 'lastmod': lastmod}
+        for shard, lastmod in feeds.sitemap_shards()
+    ]
+    return _sitemap_response(request, 'blog/sitemap_index.xml', {'sitemaps': sitemaps}, [
+        sitemap['lastmod'] for sitemap in sitemaps
+    ])
+
+
+@cache_document('list')
+def sitemap_pages(request):
+    urls = feeds.sitemap_pages()
+    return _sitemap_response(request, 'blog/sitemap.xml', {'urls': urls}, [url['lastmod'] for url in urls])
+
+
+@cache_document(lambda request, shard: feeds.sitemap_group(shard))
+def sitemap_articles(request, shard):
+    urls = feeds.sitemap_articles(shard)
+    if not urls:
+        raise Http404('Пустой файл sitemap.')
+    return _sitemap_response(request, 'blog/sitemap.xml', {'urls': urls}, [url['lastmod'] for url in urls])
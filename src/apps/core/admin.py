@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Subscriber, UserProfile
+from .models import Newsletter, Subscriber, UserProfile
 
 
 @admin.register(UserProfile)
@@ -14,3 +14,10 @@ class SubscriberAdmin(admin.ModelAdmin):
     list_display = ['email', 'created_at']
     search_fields = ['email']
     readonly_fields = ['created_at']
+
+
+@admin.register(Newsletter)
+class NewsletterAdmin(admin.ModelAdmin):
+    list_display = ['subject', 'created_at', 'sent_count', 'failed_count', 'finished_at']
+    search_fields = ['subject']
+    readonly_fields = ['created_at', 'started_at', 'finished_at', 'last_subscriber_id', 'sent_count', 'failed_count']
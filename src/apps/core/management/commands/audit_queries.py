@@ -0,0 +1,112 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from apps.blog.models import Article
+from apps.core.probing import build_probes, probe_client
+
+User = get_user_model()
+
+# Справочники, которые страницы выводят целиком: полный проход по ним ожидаем
+DEFAULT_ALLOWED_SCANS = ['blog_category']
+
+# Проход по таблице или по всему индексу («USING [COVERING] INDEX»). У виртуальных
+# таблиц (FTS) свой поиск — «SCAN ... VIRTUAL TABLE INDEX» полным проходом не считается
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)\b(?! VIRTUAL TABLE)( USING (?:COVERING )?INDEX)?')
+ORDER_BY_LIMIT = re.compile(r'\bORDER BY\b.*\bLIMIT\b', re.DOTALL)
+POSTGRES_SCAN = re.compile(r'Seq Scan on (\w+)')
+
+
+def _full_scans(sql):
+    """Таблицы, которые запрос читает полным проходом, по плану EXPLAIN."""
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            details = [row[-1] for row in cursor.fetchall()]
+            # Индекс в порядке ORDER BY без сортировки во временном B-tree: чтение закончится после LIMIT строк
+            early_exit = ORDER_BY_LIMIT.search(sql) and not any(
+                'TEMP B-TREE' in detail and 'ORDER BY' in detail for detail in details
+            )
+            tables = [
+                m.group(1) for m in map(SQLITE_SCAN.match, details)
+                if m and not (m.group(2) and early_exit)
+            ]
+        else:
+            cursor.execute(f'EXPLAIN {sql}')
+            tables = POSTGRES_SCAN.findall('\n'.join(row[0] for row in cursor.fetchall()))
+    # Подзапросы и служебные таблицы СУБД в план попадают тоже — проверяем только свои
+    return [t for t in tables if t in connection.introspection.table_names()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Открывает страницы блога и аккаунта, выполняет EXPLAIN для каждого SELECT '
+        'и завершается с ошибкой, если какой-либо запрос читает полным проходом таблицу или весь её индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--username',
+            help='Пользователь для авторских страниц (по умолчанию — автор последней статьи).',
+        )
+        parser.add_argument(
+            '--allow-scan',
+            action='append',
+            default=None,
+            metavar='TABLE',
+            help=f'Таблица, полный проход по которой допустим (по умолчанию: {", ".join(DEFAULT_ALLOWED_SCANS)}).',
+        )
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Печатать SQL каждого запроса с полным проходом.',
+        )
+
+    def handle(self, *args, username=None, allow_scan=None, verbose_plans=False, **options):
+        if connection.vendor not in ('sqlite', 'postgresql'):
+            raise CommandError(f'Аудит планов не поддерживается для {connection.vendor}.')
+
+        allowed = set(allow_scan if allow_scan is not None else DEFAULT_ALLOWED_SCANS)
+        user = self._get_user(username)
+        clients = {False: probe_client(), True: probe_client(user) if user else None}
+        failures = 0
+
+        for probe in build_probes(user):
+            with CaptureQueriesContext(connection) as ctx:
+                response = clients[probe.login_required].get(probe.url)
+
+            scans = []
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if not sql.lstrip().upper().startswith('SELECT'):
+                    continue
+                tables = [t for t in _full_scans(sql) if t not in allowed]
+                if tables:
+                    scans.append((tables, sql))
+
+            status = self.style.ERROR('SCAN') if scans else self.style.SUCCESS('OK')
+            self.stdout.write(
+                f'{status:<4} {probe.name:<30} {response.status_code} '
+                f'запросов: {len(ctx.captured_queries)}'
+            )
+            for tables, sql in scans:
+                self.stdout.write(f'     полный проход: {", ".join(tables)}')
+                if verbose_plans:
+                    self.stdout.write(f'     {sql}')
+            failures += len(scans)
+
+        if failures:
+            raise CommandError(f'Запросов с полным проходом по таблице: {failures}.')
+        self.stdout.write(self.style.SUCCESS('Полных проходов не найдено.'))
+
+    def _get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь «{username}» не найден.')
+        article = Article.objects.select_related('author').order_by('-created_at').first()
+        return article.author if article else None
@@ -0,0 +1,300 @@
+import itertools
+import json
+import platform
+import queue
+import random
+import statistics
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import nullcontext
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.blog.models import Article
+from apps.core import subscriptions
+from apps.core.probing import Probe, build_probes, probe_client
+
+User = get_user_model()
+
+
+def pages_scenario(user):
+    """Все GET-страницы блога и аккаунта, включая авторские."""
+    return build_probes(user) + [
+        Probe('accounts:login', reverse('accounts:login')),
+        Probe('accounts:signup', reverse('accounts:signup')),
+    ]
+
+
+def anonymous_scenario(user):
+    """Только страницы, доступные читателю без входа."""
+    return [probe for probe in pages_scenario(None) if not probe.login_required]
+
+
+def cards_scenario(user):
+    """Страницы списка по 9 карточек; замерять с --no-page-cache, иначе их отдаёт кэш страниц."""
+    url = reverse('blog:article_list')
+    return [Probe(f'blog:article_list?page={page}', f'{url}?page={page}') for page in range(1, 6)]
+
+
+def subscribe_scenario(user):
+    """Поток подписок: в основном новые адреса, каждый пятый — повтор недавнего."""
+    run = uuid.uuid4().hex[:8]
+    counter = itertools.count()
+    lock = threading.Lock()
+
+    def data():
+        with lock:
+            n = next(counter)
+        if n % 5 == 4:
+            n -= 3
+        return {'email': f'bench-{run}-{n}@example.com'}
+
+    return [Probe('blog:subscribe', reverse('blog:subscribe'), data=data)]
+
+
+# Сценарий — функция (user) -> список Probe; запросы распределяются по ним поровну
+SCENARIOS = {
+    'pages': pages_scenario,
+    'anonymous': anonymous_scenario,
+    'cards': cards_scenario,
+    'subscribe': subscribe_scenario,
+}
+
+
+def percentile(values, q):
+    """Перцентиль q (0..100) с линейной интерполяцией."""
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100, method='inclusive')[q - 1]
+
+
+def summarize(samples, elapsed=None):
+    latencies = sorted(sample['latency'] * 1000 for sample in samples)
+    # Число запросов к базе известно не всегда (например, при замере по HTTP без Server-Timing)
+    queries = [sample['queries'] for sample in samples if sample.get('queries') is not None]
+    summary = {
+        'requests': len(samples),
+        'errors': sum(sample['status'] >= 400 for sample in samples),
+        'latency_ms': {
+            'mean': round(statistics.fmean(latencies), 3),
+            'p50': round(percentile(latencies, 50), 3),
+            'p95': round(percentile(latencies, 95), 3),
+            'p99': round(percentile(latencies, 99), 3),
+            'max': round(latencies[-1], 3),
+        },
+    }
+    if queries:
+        summary['queries_per_request'] = {
+            'mean': round(statistics.fmean(queries), 2),
+            'max': max(queries),
+        }
+    if elapsed:
+        summary['throughput_rps'] = round(len(samples) / elapsed, 2)
+    return summary
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест внутри процесса: несколько потоков открывают страницы блога '
+        'тестовым клиентом и измеряют пропускную способность, задержки p50/p95/p99 '
+        'и число SQL-запросов. Результат сохраняется в JSON для сравнения запусков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenario',
+            choices=sorted(SCENARIOS),
+            default='pages',
+            help='Набор страниц (по умолчанию pages).',
+        )
+        parser.add_argument('--requests', type=int, default=50, help='Запросов на каждую страницу (по умолчанию 50).')
+        parser.add_argument('--concurrency', type=int, default=4, help='Количество потоков (по умолчанию 4).')
+        parser.add_argument('--warmup', type=int, default=2, help='Прогревочных запросов на страницу (по умолчанию 2).')
+        parser.add_argument(
+            '--username',
+            help='Пользователь для авторских страниц (по умолчанию — автор последней статьи).',
+        )
+        parser.add_argument(
+            '--no-page-cache',
+            action='store_true',
+            help='Отключить кэш страниц (BLOG_PAGE_CACHE) на время замера.',
+        )
+        parser.add_argument(
+            '--no-card-cache',
+            action='store_true',
+            help='Отключить кэш карточек статей (BLOG_CARD_CACHE) на время замера.',
+        )
+        parser.add_argument(
+            '--coalesce-subscribe',
+            action='store_true',
+            help='Включить пакетную запись подписок (SUBSCRIBE_COALESCE) на время замера.',
+        )
+        parser.add_argument('--label', default='', help='Метка запуска, попадает в JSON.')
+        parser.add_argument('--output', help='Файл для результата в JSON.')
+        parser.add_argument('--compare', help='JSON предыдущего запуска: вывести изменение p95 и пропускной способности.')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно для порядка запросов (по умолчанию 0).')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or options['concurrency'] < 1:
+            raise CommandError('--requests и --concurrency должны быть положительными.')
+        if connection.vendor == 'sqlite' and connection.settings_dict['NAME'] in ('', ':memory:'):
+            raise CommandError('База SQLite в памяти не видна другим потокам — нужен файл.')
+
+        user = self._get_user(options['username'])
+        probes = SCENARIOS[options['scenario']](user)
+        if not probes:
+            raise CommandError('Нет страниц для замера: заполните базу командой seed_blog.')
+
+        started_at = timezone.now()
+        overrides = {}
+        if options['no_page_cache']:
+            overrides['BLOG_PAGE_CACHE'] = False
+        if options['no_card_cache']:
+            overrides['BLOG_CARD_CACHE'] = False
+        if options['coalesce_subscribe']:
+            overrides['SUBSCRIBE_COALESCE'] = True
+        with override_settings(**overrides) if overrides else nullcontext():
+            clients = [
+                {False: probe_client(), True: probe_client(user) if user else None}
+                for _ in range(options['concurrency'])
+            ]
+            for probe in probes:
+                for _ in range(options['warmup']):
+                    self.request(clients[0][probe.login_required], probe)
+
+            jobs = [probe for probe in probes for _ in range(options['requests'])]
+            random.Random(options['seed']).shuffle(jobs)
+            samples, elapsed = self.run(jobs, clients)
+            page_cache_enabled = settings.BLOG_PAGE_CACHE
+            card_cache_enabled = settings.BLOG_CARD_CACHE
+            subscribe_coalesce = settings.SUBSCRIBE_COALESCE
+        # Подписки, оставшиеся в буфере, записываются вне замера
+        subscriptions.BUFFER.flush()
+
+        by_probe = defaultdict(list)
+        for sample in samples:
+            by_probe[sample['name']].append(sample)
+
+        result = {
+            'label': options['label'],
+            'scenario': options['scenario'],
+            'started_at': started_at.isoformat(),
+            'environment': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'page_cache': page_cache_enabled,
+                'card_cache': card_cache_enabled,
+                'subscribe_coalesce': subscribe_coalesce,
+                'cache_backend': settings.CACHES['default']['BACKEND'],
+                'published_articles': Article.objects.filter(status=Article.Status.PUBLISHED).count(),
+            },
+            'options': {
+                'requests': options['requests'],
+                'concurrency': options['concurrency'],
+                'warmup': options['warmup'],
+                'seed': options['seed'],
+            },
+            'elapsed_s': round(elapsed, 3),
+            'total': summarize(samples, elapsed),
+            'pages': {name: summarize(by_probe[name]) for name in sorted(by_probe)},
+        }
+
+        self.report(result, options['compare'])
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Результат сохранён в {path}.'))
+
+    def run(self, jobs, clients):
+        """Выполняет запросы в потоках; у каждого потока свой клиент и соединение с базой."""
+        pending = queue.SimpleQueue()
+        for job in jobs:
+            pending.put(job)
+        samples, lock = [], threading.Lock()
+
+        def worker(client):
+            try:
+                while True:
+                    try:
+                        probe = pending.get_nowait()
+                    except queue.Empty:
+                        return
+                    with CaptureQueriesContext(connection) as ctx:
+                        started = time.perf_counter()
+                        response = self.request(client[probe.login_required], probe)
+                        latency = time.perf_counter() - started
+                    with lock:
+                        samples.append({
+                            'name': probe.name,
+                            'status': response.status_code,
+                            'latency': latency,
+                            'queries': len(ctx.captured_queries),
+                        })
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - started
+
+    @staticmethod
+    def request(client, probe):
+        if probe.data:
+            return client.post(probe.url, probe.data())
+        return client.get(probe.url)
+
+    def report(self, result, compare=None):
+        previous = json.loads(Path(compare).read_text()) if compare else None
+        self.stdout.write(
+            f'{"страница":<30} {"запросов":>8} {"ошибок":>6} {"p50, мс":>9} '
+            f'{"p95, мс":>9} {"p99, мс":>9} {"SQL":>5}'
+        )
+        rows = [*result['pages'].items(), ('итого', result['total'])]
+        for name, page in rows:
+            latency = page['latency_ms']
+            queries = page.get('queries_per_request')
+            queries = f'{queries["mean"]:>5.1f}' if queries else f'{"-":>5}'
+            line = (
+                f'{name:<30} {page["requests"]:>8} {page["errors"]:>6} {latency["p50"]:>9.1f} '
+                f'{latency["p95"]:>9.1f} {latency["p99"]:>9.1f} {queries}'
+            )
+            before = previous and (previous['total'] if name == 'итого' else previous['pages'].get(name))
+            if before:
+                change = (latency['p95'] / before['latency_ms']['p95'] - 1) * 100
+                line += f'   p95 {change:+.0f}%'
+            self.stdout.write(line)
+
+        throughput = result['total']['throughput_rps']
+        line = f'Пропускная способность: {throughput} запросов/с за {result["elapsed_s"]} с'
+        if previous:
+            line += f' (было {previous["total"]["throughput_rps"]})'
+        self.stdout.write(line)
+        if result['total']['errors']:
+            self.stdout.write(self.style.WARNING(f'Ответов с ошибкой: {result["total"]["errors"]}.'))
+
+    def _get_user(self, username):
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f'Пользователь «{username}» не найден.')
+        article = Article.objects.select_related('author').order_by('-created_at').first()
+        return article.author if article else None
@@ -0,0 +1,218 @@
+import http.client
+import importlib.util
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from apps.blog.models import Article
+
+from .benchmark import SCENARIOS, summarize
+
+SRC_DIR = Path(settings.BASE_DIR) / 'src'
+SERVER_TIMING_QUERIES = re.compile(r'db;[^,]*desc="(\d+) queries"')
+
+
+def server_commands(port, workers):
+    """Команды запуска: gunicorn с sync-воркерами (WSGI) и uvicorn (ASGI) на одном наборе данных."""
+    return {
+        'wsgi': [
+            sys.executable, '-m', 'gunicorn', 'config.wsgi:application',
+            '--chdir', str(SRC_DIR), '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--log-level', 'warning',
+        ],
+        'asgi': [
+            sys.executable, '-m', 'uvicorn', 'config.asgi:application',
+            '--app-dir', str(SRC_DIR), '--host', '127.0.0.1', '--port', str(port),
+            '--workers', str(workers), '--log-level', 'warning', '--no-access-log',
+        ],
+    }
+
+
+def wait_for_port(port, process, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise CommandError(f'Сервер завершился с кодом {process.returncode} при запуске.')
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise CommandError(f'Сервер не начал принимать соединения на порту {port} за {timeout} с.')
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает gunicorn (WSGI) и uvicorn (ASGI) на одних и тех же страницах: поочерёдно '
+        'запускает серверы, нагружает их по HTTP с keep-alive и сохраняет задержки и '
+        'пропускную способность в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server',
+            action='append',
+            choices=['wsgi', 'asgi'],
+            help='Какие серверы замерять (по умолчанию оба).',
+        )
+        parser.add_argument('--workers', type=int, default=2, help='Процессов сервера (по умолчанию 2).')
+        parser.add_argument('--requests', type=int, default=100, help='Запросов на каждую страницу (по умолчанию 100).')
+        parser.add_argument('--concurrency', type=int, default=16, help='Одновременных соединений (по умолчанию 16).')
+        parser.add_argument('--warmup', type=int, default=5, help='Прогревочных запросов на страницу (по умолчанию 5).')
+        parser.add_argument('--port', type=int, default=8765, help='Порт для серверов (по умолчанию 8765).')
+        parser.add_argument('--label', default='', help='Метка запуска, попадает в JSON.')
+        parser.add_argument('--output', help='Файл для результата в JSON.')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно для порядка запросов (по умолчанию 0).')
+
+    def handle(self, *args, **options):
+        servers = options['server'] or ['wsgi', 'asgi']
+        modules = {'wsgi': 'gunicorn', 'asgi': 'uvicorn'}
+        for server in servers:
+            if importlib.util.find_spec(modules[server]) is None:
+                raise CommandError(f'Для {server} нужен {modules[server]}: pip install {modules[server]}.')
+
+        # Те же страницы, что у benchmark --scenario anonymous; авторизация по HTTP не замеряется
+        probes = SCENARIOS['anonymous'](None)
+        if not probes:
+            raise CommandError('Нет страниц для замера: заполните базу командой seed_blog.')
+        jobs = [probe for probe in probes for _ in range(options['requests'])]
+        random.Random(options['seed']).shuffle(jobs)
+
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': os.environ.get('DJANGO_SETTINGS_MODULE', 'config.settings'),
+            # Локальный HTTP без TLS: редирект на https исказил бы замер
+            'SECURE_SSL_REDIRECT': 'False',
+        }
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        started_at = timezone.now()
+        results = {}
+
+        for server in servers:
+            command = server_commands(options['port'], options['workers'])[server]
+            self.stdout.write(f'Запуск {server}: {" ".join(command[1:])}')
+            process = subprocess.Popen(command, env=env, cwd=SRC_DIR)
+            try:
+                wait_for_port(options['port'], process)
+                for probe in probes:
+                    for _ in range(options['warmup']):
+                        _request(options['port'], host, probe.url)
+                samples, elapsed = self.run(jobs, options['port'], host, options['concurrency'])
+            finally:
+                process.terminate()
+                process.wait(timeout=30)
+
+            by_probe = defaultdict(list)
+            for sample in samples:
+                by_probe[sample['name']].append(sample)
+            results[server] = {
+                'command': command[1:],
+                'elapsed_s': round(elapsed, 3),
+                'total': summarize(samples, elapsed),
+                'pages': {name: summarize(by_probe[name]) for name in sorted(by_probe)},
+            }
+
+        result = {
+            'label': options['label'],
+            'started_at': started_at.isoformat(),
+            'environment': {
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'debug': settings.DEBUG,
+                'page_cache': settings.BLOG_PAGE_CACHE,
+                'cache_backend': settings.CACHES['default']['BACKEND'],
+                'published_articles': Article.objects.filter(status=Article.Status.PUBLISHED).count(),
+            },
+            'options': {key: options[key] for key in ('workers', 'requests', 'concurrency', 'warmup', 'seed')},
+            'servers': results,
+        }
+        self.report(result)
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Результат сохранён в {path}.'))
+
+    def run(self, jobs, port, host, concurrency):
+        """Нагрузка по HTTP: у каждого потока одно keep-alive соединение."""
+        pending = iter(jobs)
+        lock = threading.Lock()
+        samples = []
+
+        def worker():
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            try:
+                while True:
+                    with lock:
+                        probe = next(pending, None)
+                    if probe is None:
+                        return
+                    started = time.perf_counter()
+                    status, timing = _request(port, host, probe.url, conn)
+                    latency = time.perf_counter() - started
+                    match = SERVER_TIMING_QUERIES.search(timing or '')
+                    with lock:
+                        samples.append({
+                            'name': probe.name,
+                            'status': status,
+                            'latency': latency,
+                            'queries': int(match.group(1)) if match else None,
+                        })
+            finally:
+                conn.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return samples, time.perf_counter() - started
+
+    def report(self, result):
+        servers = result['servers']
+        header = f'{"страница":<30}' + ''.join(f' {f"{name} p50":>10} {f"{name} p95":>10}' for name in servers)
+        self.stdout.write(header)
+        names = sorted({page for server in servers.values() for page in server['pages']})
+        for page in [*names, 'итого']:
+            line = f'{page:<30}'
+            for server in servers.values():
+                stats = server['total'] if page == 'итого' else server['pages'].get(page)
+                latency = stats['latency_ms'] if stats else {'p50': 0, 'p95': 0}
+                line += f' {latency["p50"]:>10.1f} {latency["p95"]:>10.1f}'
+            self.stdout.write(line)
+        for name, server in servers.items():
+            total = server['total']
+            self.stdout.write(
+                f'{name}: {total["throughput_rps"]} запросов/с, p99 {total["latency_ms"]["p99"]} мс, '
+                f'ошибок {total["errors"]}'
+            )
+
+
+def _request(port, host, url, conn=None):
+    """GET по keep-alive соединению; возвращает статус и заголовок Server-Timing."""
+    own = conn is None
+    conn = conn or http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    try:
+        conn.request('GET', url, headers={'Host': host})
+        response = conn.getresponse()
+        response.read()
+        return response.status, response.getheader('Server-Timing')
+    finally:
+        if own:
+            conn.close()
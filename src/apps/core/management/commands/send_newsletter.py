@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.core import newsletter as dispatch
+from apps.core.models import Newsletter, Subscriber
+
+
+class Command(BaseCommand):
+    help = (
+        'Отправляет выпуск рассылки подписчикам пачками через одно SMTP-соединение. '
+        'Прогресс сохраняется после каждой пачки: повторный запуск продолжает с места остановки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('newsletter_id', type=int, help='id выпуска рассылки.')
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.NEWSLETTER_BATCH_SIZE,
+            help=f'Писем в пачке (по умолчанию {settings.NEWSLETTER_BATCH_SIZE}).',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=settings.NEWSLETTER_RATE,
+            help=f'Писем в секунду, 0 — без ограничения (по умолчанию {settings.NEWSLETTER_RATE}).',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Сбросить прогресс и отправить выпуск всем подписчикам заново.',
+        )
+
+    def handle(self, *args, newsletter_id, batch_size, rate, restart, **options):
+        if batch_size < 1 or rate < 0:
+            raise CommandError('--batch-size должен быть положительным, --rate — не меньше нуля.')
+        try:
+            newsletter = Newsletter.objects.get(pk=newsletter_id)
+        except Newsletter.DoesNotExist:
+            raise CommandError(f'Выпуск рассылки {newsletter_id} не найден.')
+
+        if restart:
+            dispatch.restart(newsletter)
+        elif newsletter.finished_at:
+            raise CommandError(
+                f'Выпуск «{newsletter}» уже отправлен ({newsletter.sent_count} писем). '
+                'Для повторной отправки используйте --restart.'
+            )
+        if newsletter.last_subscriber_id is not None:
+            self.stdout.write(
+                f'Продолжение с подписчика id > {newsletter.last_subscriber_id}, '
+                f'уже отправлено {newsletter.sent_count}.'
+            )
+
+        total = Subscriber.objects.count()
+
+        def progress(sent, last_id):
+            self.stdout.write(f'Отправлено {sent} писем, последний получатель id={last_id} (всего подписчиков {total}).')
+
+        sent = dispatch.send(newsletter, batch_size=batch_size, rate=rate, progress=progress)
+        self.stdout.write(self.style.SUCCESS(
+            f'Выпуск «{newsletter}» отправлен: {sent} писем за этот запуск, {newsletter.sent_count} всего.'
+        ))
+        if newsletter.failed_count:
+            self.stdout.write(self.style.WARNING(
+                f'Не отправлено писем: {newsletter.failed_count} (адреса — в логе).'
+            ))
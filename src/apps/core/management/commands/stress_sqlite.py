@@ -0,0 +1,192 @@
+import json
+import multiprocessing
+import random
+import sys
+import time
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+from django.utils import timezone
+
+from apps.blog.models import Article
+from apps.core.models import Subscriber
+
+from .benchmark import summarize
+
+STRESS_EMAIL_DOMAIN = 'stress.invalid'
+PROFILES = ('default', 'tuned')
+
+
+JOURNAL_MODES = {'default': 'delete', 'tuned': 'wal'}
+
+
+def apply_profile(profile):
+    """Настройки соединения процесса: ``tuned`` — ``SQLITE_OPTIONS``, ``default`` — как у Django без OPTIONS."""
+    connection.settings_dict['OPTIONS'] = dict(settings.SQLITE_OPTIONS) if profile == 'tuned' else {}
+    connection.close()
+
+
+def set_journal_mode(mode):
+    """Режим журнала хранится в файле базы, поэтому переключается до запуска процессов."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'PRAGMA journal_mode={mode}')
+        return cursor.fetchone()[0]
+
+
+def get_journal_mode():
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA journal_mode')
+        return cursor.fetchone()[0]
+
+
+def read_once(rng, max_pk):
+    """Чтение как у публичных страниц: страница списка и одна статья."""
+    list(
+        Article.objects.filter(status=Article.Status.PUBLISHED)
+        .select_related('author', 'category')
+        .only('title', 'slug', 'excerpt', 'created_at', 'author__username', 'category__name')
+        .order_by('-created_at', '-pk')[:10]
+    )
+    Article.objects.filter(pk__gte=rng.randint(1, max_pk)).only('content_html').first()
+
+
+def write_once(worker, number):
+    """Запись с предварительным чтением в одной транзакции, как у подписки и сохранения статьи.
+
+    В режиме DEFERRED такая транзакция начинается с блокировки на чтение, и
+    попытка записи при чужой записи сразу падает с «database is locked».
+    """
+    email = f'{worker}-{number}@{STRESS_EMAIL_DOMAIN}'
+    with transaction.atomic():
+        if not Subscriber.objects.filter(email=email).exists():
+            Subscriber.objects.create(email=email)
+
+
+def worker(profile, role, index, duration, seed, results):
+    apply_profile(profile)
+    rng = random.Random(seed + index)
+    max_pk = max(Article.objects.order_by('-pk').values_list('pk', flat=True).first() or 1, 1)
+    samples = []
+    locked = 0
+    number = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        started = time.perf_counter()
+        status = 200
+        try:
+            if role == 'write':
+                number += 1
+                write_once(f'{role}{index}', number)
+            else:
+                read_once(rng, max_pk)
+        except OperationalError as exc:
+            status = 500
+            locked += 'locked' in str(exc)
+        samples.append({'status': status, 'latency': time.perf_counter() - started})
+    connection.close()
+    results.put((role, samples, locked))
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагрузочный тест SQLite: несколько процессов одновременно читают статьи и '
+        'записывают подписчиков. Сравнивает настройки Django по умолчанию с профилем '
+        'из settings (WAL, busy_timeout, BEGIN IMMEDIATE) и сохраняет число операций '
+        'в секунду, задержки и ошибки блокировки в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile',
+            action='append',
+            choices=PROFILES,
+            help='Какие профили замерять (по умолчанию оба).',
+        )
+        parser.add_argument('--readers', type=int, default=4, help='Процессов-читателей (по умолчанию 4).')
+        parser.add_argument('--writers', type=int, default=2, help='Процессов-писателей (по умолчанию 2).')
+        parser.add_argument('--duration', type=float, default=10, help='Длительность замера в секундах (по умолчанию 10).')
+        parser.add_argument('--label', default='', help='Метка запуска, попадает в JSON.')
+        parser.add_argument('--output', help='Файл для результата в JSON.')
+        parser.add_argument('--seed', type=int, default=0, help='Зерно для выбора статей (по умолчанию 0).')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Команда замеряет только SQLite: DATABASE_URL указывает на другую базу.')
+        name = str(connection.settings_dict['NAME'])
+        if name == ':memory:' or 'mode=memory' in name:
+            raise CommandError('Нужна база в файле: процессы не видят общую базу в памяти.')
+
+        started_at = timezone.now()
+        results = {}
+        # Профиль tuned замеряется и без SQLITE_TUNING: после замера файл базы возвращается в свой режим
+        previous_mode = get_journal_mode()
+        try:
+            for profile in options['profile'] or PROFILES:
+                journal_mode = set_journal_mode(JOURNAL_MODES[profile])
+                self.stdout.write(f'Профиль {profile} (journal_mode={journal_mode})...')
+                results[profile] = {'journal_mode': journal_mode, **self.run(profile, options)}
+        finally:
+            Subscriber.objects.filter(email__endswith=f'@{STRESS_EMAIL_DOMAIN}').delete()
+            set_journal_mode(previous_mode)
+
+        result = {
+            'label': options['label'],
+            'started_at': started_at.isoformat(),
+            'environment': {
+                'python': sys.version.split()[0],
+                'django': django.get_version(),
+                'sqlite': connection.Database.sqlite_version,
+                'pragmas': settings.SQLITE_PRAGMAS,
+            },
+            'options': {key: options[key] for key in ('readers', 'writers', 'duration', 'seed')},
+            'profiles': results,
+        }
+        self.report(result)
+        if options['output']:
+            path = Path(options['output'])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(json.dumps(result, ensure_ascii=False, indent=2))
+            self.stdout.write(self.style.SUCCESS(f'Результат сохранён в {path}.'))
+
+    def run(self, profile, options):
+        """Запускает читателей и писателей одновременно; у каждого процесса своё соединение."""
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        results = context.Queue()
+        roles = ['read'] * options['readers'] + ['write'] * options['writers']
+        processes = [
+            context.Process(target=worker, args=(profile, role, index, options['duration'], options['seed'], results))
+            for index, role in enumerate(roles)
+        ]
+        for process in processes:
+            process.start()
+        collected = [results.get() for _ in processes]
+        for process in processes:
+            process.join()
+
+        summary = {}
+        for role in ('read', 'write'):
+            samples = [sample for r, role_samples, _ in collected if r == role for sample in role_samples]
+            if samples:
+                summary[role] = {
+                    **summarize(samples, options['duration']),
+                    'locked': sum(locked for r, _, locked in collected if r == role),
+                }
+        return summary
+
+    def report(self, result):
+        self.stdout.write(
+            f'{"профиль":<10} {"операция":<8} {"оп/с":>10} {"p50 мс":>10} {"p99 мс":>10} {"ошибок":>8} {"locked":>8}'
+        )
+        for profile, summary in result['profiles'].items():
+            for role in ('read', 'write'):
+                if role not in summary:
+                    continue
+                stats = summary[role]
+                self.stdout.write(
+                    f'{profile:<10} {role:<8} {stats["throughput_rps"]:>10} {stats["latency_ms"]["p50"]:>10.1f} '
+                    f'{stats["latency_ms"]["p99"]:>10.1f} {stats["errors"]:>8} {stats["locked"]:>8}'
+                )
@@ -0,0 +1,141 @@
+import logging
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from . import perf, routers
+
+logger = logging.getLogger('apps.core.perf')
+
+
+class PerformanceMiddleware:
+    """Замеры SQL, шаблонов и Markdown для каждого запроса.
+
+    Включается настройкой ``PERF_INSTRUMENTATION``. Добавляет заголовок
+    ``Server-Timing``, пишет строку в лог ``apps.core.perf`` и обновляет
+    гистограммы для ``/metrics/``. Стоит первым в ``MIDDLEWARE``, чтобы
+    время остальных middleware попадало в total. Работает и под WSGI,
+    и под ASGI без перехода между потоками.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PERF_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        perf.install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with perf.measure() as timings:
+            response = self.get_response(request)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        with perf.measure() as timings:
+            response = await self.get_response(request)
+        return self.finish(request, response, timings)
+
+    def finish(self, request, response, timings):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        perf.METRICS.observe(view, timings)
+        if settings.PERF_SERVER_TIMING:
+            response['Server-Timing'] = perf.server_timing(timings)
+
+        fields = {'view': view, 'method': request.method, 'status': response.status_code, **timings.as_dict()}
+        logger.info(
+            ' '.join(f'{key}={value}' for key, value in fields.items()),
+            extra={'perf': fields},
+        )
+        return response
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    """WhiteNoise, который под ASGI не переключает цепочку middleware в синхронный режим.
+
+    Оригинальный ``WhiteNoiseMiddleware`` умеет только sync: Django оборачивает
+    всё, что под ним, в ``async_to_sync``, и async-view теряют смысл. Поиск
+    файла — обращение к словарю в памяти, поэтому его можно делать в event loop.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """Чтение с реплики для GET/HEAD и «прилипание» к основной базе после записи.
+
+    Стоит до ``SessionMiddleware``, чтобы сессия и пользователь читались из
+    той же базы, что и данные страницы. Без ``DATABASE_REPLICAS`` отключается.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def read_alias(self, request):
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') or routers.STICKY_COOKIE in request.COOKIES:
+            return None
+        return routers.choose_replica()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        with routers.read_from(self.read_alias(request)):
+            response = self.get_response(request)
+        return self.finish(request, response)
+
+    async def __acall__(self, request):
+        with routers.read_from(self.read_alias(request)):
+            response = await self.get_response(request)
+        return self.finish(request, response)
+
+    def finish(self, request, response):
+        match = request.resolver_match
+        sticky = getattr(match.func, 'replica_sticky', True) if match else True
+        if sticky and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            response.set_cookie(
+                routers.STICKY_COOKIE,
+                '1',
+                max_age=settings.DATABASE_REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+                secure=request.is_secure(),
+            )
+        return response
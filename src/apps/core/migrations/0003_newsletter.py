@@ -0,0 +1,64 @@
+# Generated by Django 6.0.2 on 2026-10-18 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0002_subscriber"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Newsletter",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("subject", models.CharField(max_length=200, verbose_name="Тема")),
+                ("content", models.TextField(verbose_name="Текст (Markdown)")),
+                (
+                    "created_at",
+                    models.DateTimeField(
+                        auto_now_add=True, verbose_name="Дата создания"
+                    ),
+                ),
+                (
+                    "started_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Начало отправки"
+                    ),
+                ),
+                (
+                    "finished_at",
+                    models.DateTimeField(
+                        blank=True, null=True, verbose_name="Отправлено"
+                    ),
+                ),
+                (
+                    "last_subscriber_id",
+                    models.PositiveBigIntegerField(
+                        blank=True, null=True, verbose_name="Последний получатель (id)"
+                    ),
+                ),
+                (
+                    "sent_count",
+                    models.PositiveIntegerField(
+                        default=0, verbose_name="Отправлено писем"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Выпуск рассылки",
+                "verbose_name_plural": "Выпуски рассылки",
+                "ordering": ["-created_at"],
+            },
+        ),
+    ]
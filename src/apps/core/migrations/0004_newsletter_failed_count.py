@@ -0,0 +1,20 @@
+# Generated by Django 6.0.2 on 2026-10-18 13:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("core", "0003_newsletter"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="newsletter",
+            name="failed_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Не отправлено писем"
+            ),
+        ),
+    ]
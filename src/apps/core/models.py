@@ -70,3 +70,54 @@ class Subscriber(models.Model):
 
     def __str__(self):
         return self.email
+
+
+class Newsletter(models.Model):
+    """Выпуск рассылки для подписчиков.
+
+    Рассылка идёт по подписчикам в порядке ``id``; после каждой пачки
+    в ``last_subscriber_id`` сохраняется id последнего получателя, поэтому
+    прерванная отправка продолжается с места остановки.
+    """
+    subject = models.CharField(
+        verbose_name='Тема',
+        max_length=200,
+    )
+    content = models.TextField(
+        verbose_name='Текст (Markdown)',
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания',
+        auto_now_add=True,
+    )
+    started_at = models.DateTimeField(
+        verbose_name='Начало отправки',
+        null=True,
+        blank=True,
+    )
+    finished_at = models.DateTimeField(
+        verbose_name='Отправлено',
+        null=True,
+        blank=True,
+    )
+    last_subscriber_id = models.PositiveBigIntegerField(
+        verbose_name='Последний получатель (id)',
+        null=True,
+        blank=True,
+    )
+    sent_count = models.PositiveIntegerField(
+        verbose_name='Отправлено писем',
+        default=0,
+    )
+    failed_count = models.PositiveIntegerField(
+        verbose_name='Не отправлено писем',
+        default=0,
+    )
+
+    class Meta:
+        verbose_name = 'Выпуск рассылки'
+        verbose_name_plural = 'Выпуски рассылки'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.subject
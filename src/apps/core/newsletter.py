@@ -0,0 +1,156 @@
+"""Отправка выпусков рассылки.
+
+Подписчики читаются потоком (``iterator``) пачками по ``batch_size`` в порядке
+``id``, поэтому в памяти не бывает больше одной пачки. Письмо рендерится один
+раз на выпуск: у всех получателей одинаковые тема и тело, отличается только
+адрес. Все пачки уходят через одно SMTP-соединение; если сервер его закрыл,
+соединение открывается заново и письмо повторяется.
+
+Письма пачки отправляются по одному, чтобы отказ сервера для одного адреса
+не останавливал рассылку: такие адреса пишутся в лог и в ``failed_count``,
+и отправка идёт дальше. Если не ушло ни одно письмо пачки и не по вине
+адресов, это сбой сервера — отправка прерывается без сохранения прогресса.
+Темп ``NEWSLETTER_RATE`` выдерживается перед каждым письмом, а не перед
+пачкой: сервер не получает пачку одним залпом.
+
+После каждой отправленной пачки в выпуске сохраняется id последнего
+получателя. Повторный запуск продолжает с него; письма пачки, на которой
+отправка прервалась, могут уйти повторно (доставка «хотя бы один раз»).
+"""
+import logging
+import smtplib
+import time
+from itertools import islice
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db.models import F
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.html import strip_tags
+
+from apps.blog.rendering import render_html
+
+from .models import Newsletter, Subscriber
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Не больше ``rate`` писем в секунду в среднем; ``rate=0`` — без ограничения."""
+
+    def __init__(self, rate, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.clock = clock
+        self.sleep = sleep
+        self.next_at = None
+
+    def wait(self, count):
+        """Ждёт, пока можно отправить ``count`` писем."""
+        if not self.rate:
+            return
+        now = self.clock()
+        if self.next_at is None or self.next_at < now:
+            self.next_at = now
+        delay = self.next_at - now
+        if delay > 0:
+            self.sleep(delay)
+        self.next_at += count / self.rate
+
+
+def render_issue(newsletter):
+    """Тема, текстовая и HTML-версия выпуска."""
+    body = render_html(newsletter.content)
+    html = render_to_string('emails/newsletter.html', {'newsletter': newsletter, 'body': body})
+    text = strip_tags(body).strip()
+    return newsletter.subject, text, html
+
+
+def _batches(newsletter, batch_size):
+    subscribers = Subscriber.objects.order_by('pk').values_list('pk', 'email')
+    if newsletter.last_subscriber_id is not None:
+        subscribers = subscribers.filter(pk__gt=newsletter.last_subscriber_id)
+    rows = subscribers.iterator(chunk_size=batch_size)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def _send_message(connection, message):
+    try:
+        connection.send_messages([message])
+    except smtplib.SMTPServerDisconnected:
+        connection.close()
+        connection.open()
+        connection.send_messages([message])
+
+
+def _send_batch(connection, messages, limiter):
+    """Отправляет письма пачки. Возвращает число отправленных и адреса, которые сервер не принял."""
+    sent, refused, errors = 0, [], []
+    for message in messages:
+        limiter.wait(1)
+        try:
+            _send_message(connection, message)
+        except smtplib.SMTPRecipientsRefused as error:
+            refused.append((message.to[0], error))
+        except smtplib.SMTPException as error:
+            errors.append((message.to[0], error))
+        else:
+            sent += 1
+    if errors and not sent:
+        raise errors[0][1]
+    failed = refused + errors
+    for email, error in failed:
+        logger.warning('Письмо рассылки для %s не отправлено: %r', email, error)
+    return sent, [email for email, _ in failed]
+
+
+def send(newsletter, batch_size=None, rate=None, connection=None, progress=None):
+    """Отправляет выпуск оставшимся подписчикам. Возвращает число отправленных писем.
+
+    ``progress(sent, last_id)`` вызывается после каждой пачки.
+    """
+    batch_size = batch_size or settings.NEWSLETTER_BATCH_SIZE
+    limiter = RateLimiter(settings.NEWSLETTER_RATE if rate is None else rate)
+    subject, text, html = render_issue(newsletter)
+    connection = connection or get_connection()
+
+    if newsletter.started_at is None:
+        newsletter.started_at = timezone.now()
+        newsletter.save(update_fields=['started_at'])
+
+    sent = 0
+    connection.open()
+    try:
+        for batch in _batches(newsletter, batch_size):
+            messages = []
+            for _, email in batch:
+                message = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [email])
+                message.attach_alternative(html, 'text/html')
+                messages.append(message)
+            batch_sent, failed = _send_batch(connection, messages, limiter)
+
+            last_id = batch[-1][0]
+            Newsletter.objects.filter(pk=newsletter.pk).update(
+                last_subscriber_id=last_id,
+                sent_count=F('sent_count') + batch_sent,
+                failed_count=F('failed_count') + len(failed),
+            )
+            newsletter.last_subscriber_id = last_id
+            sent += batch_sent
+            if progress:
+                progress(sent, last_id)
+    finally:
+        connection.close()
+
+    newsletter.finished_at = timezone.now()
+    newsletter.save(update_fields=['finished_at'])
+    newsletter.refresh_from_db(fields=['sent_count', 'failed_count'])
+    return sent
+
+
+def restart(newsletter):
+    """Сбрасывает прогресс: следующий запуск отправит выпуск всем заново."""
+    newsletter.started_at = newsletter.finished_at = newsletter.last_subscriber_id = None
+    newsletter.sent_count = newsletter.failed_count = 0
+    newsletter.save(update_fields=['started_at', 'finished_at', 'last_subscriber_id', 'sent_count', 'failed_count'])
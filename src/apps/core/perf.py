@@ -0,0 +1,212 @@
+"""Замеры времени обработки запроса по составляющим.
+
+``PerformanceMiddleware`` открывает для запроса набор таймеров (``RequestTimings``),
+доступный через contextvar. Составляющие измеряются так:
+
+- SQL — обёртка в ``execute_wrappers`` каждого нового соединения: под ASGI
+  async ORM выполняет запросы в другом потоке, и обёртка на время запроса
+  в потоке middleware их бы не увидела;
+- шаблоны — ``Template.render`` оборачивается при включении замеров;
+- Markdown — ``rendering.render`` помечен декоратором ``timed('markdown')``;
+- Pygments — ``codehilite.highlight``, если Pygments установлен (время входит в Markdown).
+
+Вложенные вызовы (``{% include %}``, рендер внутри рендера) учитываются один раз —
+по внешнему вызову. Вне запроса или при выключенных замерах ``timed`` только
+вызывает функцию.
+
+Гистограммы задержек по view (``METRICS``) живут в памяти процесса: у каждого
+воркера gunicorn свои значения, Prometheus собирает их с каждого воркера отдельно.
+"""
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+COMPONENTS = ('db', 'template', 'markdown', 'pygments')
+# Стандартные границы корзин Prometheus, в секундах
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class RequestTimings:
+    """Накопленное время по составляющим одного запроса, в секундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = None
+        self.seconds = dict.fromkeys(COMPONENTS, 0.0)
+        self.queries = 0
+        self._depth = dict.fromkeys(COMPONENTS, 0)
+
+    @property
+    def total(self):
+        return (self.finished or time.perf_counter()) - self.started
+
+    def as_dict(self):
+        return {
+            'total_ms': round(self.total * 1000, 2),
+            'queries': self.queries,
+            **{f'{name}_ms': round(value * 1000, 2) for name, value in self.seconds.items()},
+        }
+
+
+@contextmanager
+def measure():
+    """Открывает таймеры для текущего запроса."""
+    timings = RequestTimings()
+    token = _current.set(timings)
+    try:
+        yield timings
+    finally:
+        timings.finished = time.perf_counter()
+        _current.reset(token)
+
+
+@contextmanager
+def timer(component):
+    timings = _current.get()
+    if timings is None or timings._depth[component]:
+        yield
+        return
+    timings._depth[component] += 1
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.seconds[component] += time.perf_counter() - started
+        timings._depth[component] -= 1
+
+
+def timed(component):
+    """Декоратор: время вызова добавляется к составляющей текущего запроса."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(component):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def query_wrapper(execute, sql, params, many, context):
+    """Обёртка выполнения SQL: считает запросы и время в базе текущего запроса."""
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.seconds['db'] += time.perf_counter() - started
+        timings.queries += 1
+
+
+def _add_query_wrapper(connection, **kwargs):
+    if query_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_wrapper)
+
+
+_installed = False
+_install_lock = threading.Lock()
+
+
+def install():
+    """Подключает замер SQL, рендера шаблонов и подсветки кода. Повторный вызов ничего не делает."""
+    global _installed
+    with _install_lock:
+        if _installed:
+            return
+        from django.db import connections
+        from django.db.backends.signals import connection_created
+        from django.template.base import Template
+        from markdown.extensions import codehilite
+
+        connection_created.connect(_add_query_wrapper)
+        # Соединения, открытые до включения замеров (в текущем потоке)
+        for connection in connections.all(initialized_only=True):
+            _add_query_wrapper(connection)
+        Template.render = timed('template')(Template.render)
+        if codehilite.pygments:
+            codehilite.highlight = timed('pygments')(codehilite.highlight)
+        _installed = True
+
+
+def server_timing(timings):
+    """Значение заголовка Server-Timing."""
+    parts = [f'db;dur={timings.seconds["db"] * 1000:.1f};desc="{timings.queries} queries"']
+    parts += [
+        f'{name};dur={timings.seconds[name] * 1000:.1f}'
+        for name in COMPONENTS[1:]
+        if timings.seconds[name]
+    ]
+    parts.append(f'total;dur={timings.total * 1000:.1f}')
+    return ', '.join(parts)
+
+
+class Metrics:
+    """Гистограммы задержек и суммы по составляющим в разрезе view."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, timings):
+        duration = timings.total
+        with self._lock:
+            stats = self._views.setdefault(view, {
+                'buckets': [0] * len(BUCKETS),
+                'count': 0,
+                'sum': 0.0,
+                'queries': 0,
+                'components': dict.fromkeys(COMPONENTS, 0.0),
+            })
+            for i, bound in enumerate(BUCKETS):
+                if duration <= bound:
+                    stats['buckets'][i] += 1
+            stats['count'] += 1
+            stats['sum'] += duration
+            stats['queries'] += timings.queries
+            for name, value in timings.seconds.items():
+                stats['components'][name] += value
+
+    def reset(self):
+        with self._lock:
+            self._views.clear()
+
+    def render(self):
+        """Метрики в текстовом формате Prometheus."""
+        with self._lock:
+            views = {view: {**stats, 'buckets': list(stats['buckets'])} for view, stats in self._views.items()}
+
+        lines = [
+            '# HELP blog_request_duration_seconds Время обработки запроса.',
+            '# TYPE blog_request_duration_seconds histogram',
+        ]
+        for view, stats in sorted(views.items()):
+            for bound, count in zip(BUCKETS, stats['buckets']):
+                lines.append(f'blog_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {count}')
+            lines += [
+                f'blog_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {stats["count"]}',
+                f'blog_request_duration_seconds_sum{{view="{view}"}} {stats["sum"]:.6f}',
+                f'blog_request_duration_seconds_count{{view="{view}"}} {stats["count"]}',
+            ]
+
+        lines += [
+            '# HELP blog_request_queries_total SQL-запросов за всё время.',
+            '# TYPE blog_request_queries_total counter',
+        ]
+        lines += [f'blog_request_queries_total{{view="{view}"}} {stats["queries"]}' for view, stats in sorted(views.items())]
+
+        lines += [
+            '# HELP blog_request_component_seconds_total Время по составляющим: db, template, markdown, pygments.',
+            '# TYPE blog_request_component_seconds_total counter',
+        ]
+        for view, stats in sorted(views.items()):
+            for name, value in stats['components'].items():
+                lines.append(f'blog_request_component_seconds_total{{view="{view}",component="{name}"}} {value:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Metrics()
@@ -0,0 +1,90 @@
+"""Набор типовых GET-запросов к страницам блога и аккаунта.
+
+Используется командами аудита и нагрузочного тестирования: для каждого
+именованного URL подбирается пример с реальными данными из базы.
+"""
+from collections.abc import Callable
+from dataclasses import dataclass
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.test import Client
+from django.urls import reverse
+
+from apps.blog.feeds import sitemap_shard
+from apps.blog.models import Article, Category
+
+
+@dataclass(frozen=True)
+class Probe:
+    name: str
+    url: str
+    login_required: bool = False
+    # Для POST: функция без аргументов, возвращающая данные формы очередного запроса
+    data: Callable[[], dict] | None = None
+
+
+def probe_client(user=None):
+    """Тестовый клиент с хостом из ALLOWED_HOSTS, при необходимости авторизованный."""
+    host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+    client = Client(HTTP_HOST=host)
+    if user is not None:
+        client.force_login(user)
+    return client
+
+
+def build_probes(user=None):
+    """Возвращает список запросов; авторские страницы — только если передан user."""
+    probes = [
+        Probe('blog:index', reverse('blog:index')),
+        Probe('blog:article_list', reverse('blog:article_list')),
+        Probe('blog:article_list?page', reverse('blog:article_list') + '?page=2'),
+    ]
+
+    category = Category.objects.filter(
+        articles__status=Article.Status.PUBLISHED
+    ).order_by('pk').first()
+    if category:
+        probes.append(Probe(
+            'blog:article_list?category',
+            reverse('blog:article_list') + f'?category={category.slug}',
+        ))
+
+    article = Article.objects.filter(
+        status=Article.Status.PUBLISHED
+    ).only('slug', 'title').order_by('-created_at').first()
+    if article:
+        word = max(article.title.split(), key=len)
+        probes += [
+            Probe('blog:article_list?q', reverse('blog:article_list') + '?' + urlencode({'q': word})),
+            Probe('blog:article_detail', reverse('blog:article_detail', args=[article.slug])),
+        ]
+
+    probes += [
+        Probe('blog:feed', reverse('blog:feed')),
+        Probe('blog:feed_atom', reverse('blog:feed_atom')),
+        Probe('blog:sitemap', reverse('blog:sitemap')),
+        Probe('blog:sitemap_pages', reverse('blog:sitemap_pages')),
+    ]
+    if category:
+        probes.append(Probe('blog:category_feed', reverse('blog:category_feed', args=[category.slug])))
+    if article:
+        probes.append(Probe(
+            'blog:sitemap_articles',
+            reverse('blog:sitemap_articles', args=[sitemap_shard(article.pk)]),
+        ))
+
+    if user is not None:
+        probes += [
+            Probe('accounts:profile', reverse('accounts:profile'), login_required=True),
+            Probe('blog:article_create', reverse('blog:article_create'), login_required=True),
+        ]
+        own = Article.objects.filter(author=user).only('slug').order_by('-updated_at').first()
+        if own:
+            probes.append(Probe(
+                'blog:article_edit',
+                reverse('blog:article_edit', args=[own.slug]),
+                login_required=True,
+            ))
+
+    return probes
@@ -0,0 +1,62 @@
+"""Чтение с реплик базы.
+
+``ReplicaMiddleware`` выбирает для безопасного запроса (GET, HEAD) одну из
+реплик ``DATABASE_REPLICAS`` и кладёт её в contextvar; ``ReplicaRouter``
+направляет туда чтения этого запроса. Запись всегда идёт в ``default``.
+
+Промахи кэша страниц и документов (``apps.blog.cache``) рендерятся с
+основной базы: собранное с отстающей реплики осталось бы в кэше до таймаута.
+
+Вне запроса (management-команды, сигналы после коммита, тесты без
+middleware) и в запросах, которые пишут, чтение идёт с основной базы.
+После записи клиент получает cookie и ещё ``DATABASE_REPLICA_STICKY_SECONDS``
+читает с основной базы — так автор сразу видит свою правку, даже если
+реплика отстаёт. View, чьи POST не меняют содержимое страниц (счётчики
+просмотров и реакций), помечаются ``@not_sticky`` и cookie не ставят.
+"""
+import contextvars
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+
+_read_alias = contextvars.ContextVar('read_alias', default=None)
+
+STICKY_COOKIE = 'db_primary'
+
+
+def choose_replica():
+    return random.choice(settings.DATABASE_REPLICAS) if settings.DATABASE_REPLICAS else None
+
+
+def not_sticky(view):
+    """Запросы к ``view`` не переводят клиента на чтение с основной базы."""
+    view.replica_sticky = False
+    return view
+
+
+@contextmanager
+def read_from(alias):
+    """Чтения внутри блока идут с ``alias``; ``None`` — с основной базы."""
+    token = _read_alias.set(alias)
+    try:
+        yield
+    finally:
+        _read_alias.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # None — решение по умолчанию: основная база или база объекта из hints
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплик приходит с основной базы через репликацию
+        return db not in settings.DATABASE_REPLICAS
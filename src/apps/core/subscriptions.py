@@ -0,0 +1,119 @@
+"""Приём подписок с объединением записей.
+
+При ``SUBSCRIBE_COALESCE`` view подписки не ходит в базу на каждый POST:
+
+1. адрес проверяется по фильтру в кэше (``cache.add`` — атомарно и в Redis,
+   и в locmem); повтор в течение ``SUBSCRIBE_SEEN_TIMEOUT`` сразу получает
+   ответ «уже подписаны»;
+2. новый адрес попадает в буфер процесса;
+3. буфер записывается одним ``bulk_create(ignore_conflicts=True)``, когда
+   в нём набралось ``SUBSCRIBE_BATCH_SIZE`` адресов или прошло
+   ``SUBSCRIBE_FLUSH_INTERVAL`` секунд с первого адреса пачки.
+
+Компромиссы: адрес, подписанный до того, как его увидел фильтр (или
+вытесненный из кэша), получит ответ «успешно подписались» — подписка при этом
+всё равно одна. При аварийной остановке процесса теряется не больше одной
+незаписанной пачки; при штатной остановке буфер записывается через ``atexit``.
+"""
+import atexit
+import hashlib
+import logging
+import threading
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DatabaseError, connection
+
+from .models import Subscriber
+
+logger = logging.getLogger(__name__)
+
+SEEN_KEY_PREFIX = 'core:subscriber-seen'
+
+
+def _seen_key(email):
+    # Адрес как есть: ``Subscriber.email`` сравнивается с учётом регистра, и фильтр должен совпадать с базой
+    return f'{SEEN_KEY_PREFIX}:{hashlib.sha1(email.encode()).hexdigest()}'
+
+
+class SubscriptionBuffer:
+    """Буфер адресов процесса, записываемый в базу пачками."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._emails = []
+        self._timer = None
+
+    def __len__(self):
+        return len(self._emails)
+
+    def add(self, email):
+        """Кладёт адрес в буфер. Возвращает True, если пачка набрана и её пора записать."""
+        with self._lock:
+            self._emails.append(email)
+            if len(self._emails) >= settings.SUBSCRIBE_BATCH_SIZE:
+                return True
+            self._schedule()
+        return False
+
+    def _schedule(self):
+        if self._timer is None:
+            self._timer = threading.Timer(settings.SUBSCRIBE_FLUSH_INTERVAL, self._flush_on_timer)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        """Записывает накопленные адреса. Возвращает их число."""
+        with self._lock:
+            emails, self._emails = self._emails, []
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not emails:
+            return 0
+        try:
+            Subscriber.objects.bulk_create(
+                [Subscriber(email=email) for email in emails],
+                ignore_conflicts=True,
+                batch_size=settings.SUBSCRIBE_BATCH_SIZE,
+            )
+        except DatabaseError:
+            # Например, «database is locked» в SQLite: адреса вернутся в буфер до следующей записи
+            logger.exception('Не удалось записать %d подписчиков', len(emails))
+            with self._lock:
+                self._emails[:0] = emails
+                self._schedule()
+            raise
+        return len(emails)
+
+    def _flush_on_timer(self):
+        try:
+            self.flush()
+        except DatabaseError:
+            pass
+        finally:
+            # У потока таймера своё соединение с базой
+            connection.close()
+
+
+BUFFER = SubscriptionBuffer()
+
+
+async def asubscribe(email):
+    """Принимает подписку. Возвращает False, если адрес уже встречался."""
+    if not await cache.aadd(_seen_key(email), 1, timeout=settings.SUBSCRIBE_SEEN_TIMEOUT):
+        return False
+    if BUFFER.add(email):
+        try:
+            await sync_to_async(BUFFER.flush)()
+        except DatabaseError:
+            # Уже в логе; адреса остались в буфере, подписку считаем принятой
+            pass
+    return True
+
+
+@atexit.register
+def _flush_on_exit():
+    if len(BUFFER):
+        BUFFER.flush()
@@ -1,3 +1,399 @@
-from django.test import TestCase
+import io
+import json
+import smtplib
+import tempfile
+from functools import partial
+from itertools import pairwise
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.mail.backends.locmem import EmailBackend
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.test import (
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.urls import reverse
+
+from apps.blog.models import Article
+from apps.blog.tests import QUERY_BUDGETS, seed_blog
+from apps.core import newsletter, perf, routers, subscriptions
+from apps.core.management.commands import audit_queries, benchmark
+from apps.core.middleware import ReplicaMiddleware
+from apps.core.models import Newsletter, Subscriber
+from apps.core.probing import probe_client
+
+User = get_user_model()
+
+
+class ProfileDashboardTests(TestCase):
+    """Списки профиля: страницы без тела статей, счётчики одним запросом, превью черновиков."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_blog(authors=1, published=25, drafts=23)[0]
+
+    def test_lists_are_paginated_without_content(self):
+        client = probe_client(self.author)
+        with self.assertNumQueries(QUERY_BUDGETS['accounts:profile']):
+            response = client.get(reverse('accounts:profile'))
+        published, drafts = response.context['published_articles'], response.context['draft_articles']
+        self.assertEqual((response.context['published_count'], response.context['draft_count']), (25, 23))
+        self.assertEqual((len(published), len(drafts)), (20, 20))
+        for article in [*published, *drafts]:
+            self.assertTrue({'content', 'content_html'} <= article.get_deferred_fields())
+        self.assertContains(response, drafts[0].excerpt.split()[0])
+
+        response = client.get(reverse('accounts:profile'), {'drafts_cursor': drafts.next_cursor})
+        self.assertEqual(len(response.context['draft_articles']), 3)
+        self.assertEqual(len(response.context['published_articles']), 20)
+
+
+@override_settings(BLOG_PAGE_CACHE=False, PERF_INSTRUMENTATION=True)
+class PerformanceMiddlewareTests(TestCase):
+    """Заголовок Server-Timing, строка в логе и метрики для Prometheus."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = seed_blog(published=3, drafts=0)[0]
+        cls.staff = User.objects.create_user(username='staff', password='password', is_staff=True)
+
+    def setUp(self):
+        perf.METRICS.reset()
+
+    def test_server_timing_and_log(self):
+        article = Article.objects.filter(status=Article.Status.PUBLISHED).first()
+        # Устаревший HTML пересобирается при показе — в замер попадает и Markdown
+        Article.objects.filter(pk=article.pk).update(content_hash='')
+        with self.assertLogs('apps.core.perf', 'INFO') as logs:
+            response = probe_client().get(article.get_absolute_url())
+
+        timing = response['Server-Timing']
+        for component in ('db;', 'template;', 'markdown;', 'total;'):
+            self.assertIn(component, timing)
+        self.assertIn('view=blog:article_detail', logs.output[0])
+        self.assertRegex(logs.output[0], r'queries=[1-9]')
+
+    def test_metrics_staff_only(self):
+        with self.assertLogs('apps.core.perf', 'INFO'):
+            probe_client().get(reverse('blog:index'))
+            self.assertEqual(probe_client().get(reverse('core:metrics')).status_code, 302)
+            self.assertEqual(probe_client(self.author).get(reverse('core:metrics')).status_code, 302)
+            response = probe_client(self.staff).get(reverse('core:metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('blog_request_duration_seconds_count{view="blog:index"} 1', body)
+        self.assertIn('blog_request_duration_seconds_bucket{view="blog:index",le="+Inf"} 1', body)
+
+    @override_settings(PERF_INSTRUMENTATION=False)
+    def test_disabled(self):
+        response = probe_client().get(reverse('blog:index'))
+        self.assertNotIn('Server-Timing', response)
+
+
+@override_settings(SUBSCRIBE_COALESCE=True, SUBSCRIBE_BATCH_SIZE=3, SUBSCRIBE_FLUSH_INTERVAL=60)
+class CoalescedSubscribeTests(TestCase):
+    """Подписка с фильтром в кэше и пакетной записью: ответ прежний, запись — одной пачкой."""
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(subscriptions.BUFFER.flush)
+
+    def subscribe(self, email):
+        return self.client.post(reverse('blog:subscribe'), {'email': email}).json()
+
+    def test_batches_inserts(self):
+        with self.assertNumQueries(0):
+            first = self.subscribe('a@example.com')
+            again = self.subscribe('a@example.com')
+            self.subscribe('b@example.com')
+        self.assertEqual(first, {'ok': True, 'message': 'Вы успешно подписались!'})
+        self.assertEqual(again, {'ok': True, 'message': 'Вы уже подписаны.'})
+        self.assertFalse(Subscriber.objects.exists())
+
+        self.subscribe('c@example.com')
+        self.assertEqual(
+            sorted(Subscriber.objects.values_list('email', flat=True)),
+            ['a@example.com', 'b@example.com', 'c@example.com'],
+        )
+
+    def test_existing_subscriber_is_not_duplicated(self):
+        Subscriber.objects.create(email='a@example.com')
+        self.subscribe('a@example.com')
+        self.assertEqual(subscriptions.BUFFER.flush(), 1)
+        self.assertEqual(Subscriber.objects.filter(email='a@example.com').count(), 1)
+
+    def test_same_answers_as_without_coalescing(self):
+        emails = ['a@example.com', 'A@example.com', 'a@example.com']
+        coalesced = [self.subscribe(email) for email in emails]
+        subscriptions.BUFFER.flush()
+        Subscriber.objects.all().delete()
+        with self.settings(SUBSCRIBE_COALESCE=False):
+            direct = [self.subscribe(email) for email in emails]
+        self.assertEqual(coalesced, direct)
+        self.assertEqual(sorted(Subscriber.objects.values_list('email', flat=True)), ['A@example.com', 'a@example.com'])
+
+    def test_invalid_email(self):
+        response = self.client.post(reverse('blog:subscribe'), {'email': 'not-an-email'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(subscriptions.BUFFER), 0)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    """Выбор базы для чтения: реплика для GET, основная база при записи и после неё."""
+
+    factory = RequestFactory()
+
+    def test_outside_request_reads_primary(self):
+        self.assertEqual(Article.objects.all().db, 'default')
+
+    def test_sync_requests(self):
+        middleware = ReplicaMiddleware(lambda request: HttpResponse(Article.objects.all().db))
+        self.assertEqual(middleware(self.factory.get('/')).content, b'replica1')
+
+        response = middleware(self.factory.post('/'))
+        self.assertEqual(response.content, b'default')
+        self.assertEqual(response.cookies[routers.STICKY_COOKIE]['max-age'], 15)
+
+        sticky = self.factory.get('/')
+        sticky.COOKIES[routers.STICKY_COOKIE] = '1'
+        self.assertEqual(middleware(sticky).content, b'default')
+        self.assertEqual(Article.objects.all().db, 'default')
+
+    async def test_async_request_reaches_orm_thread(self):
+        async def view(request):
+            return HttpResponse(await sync_to_async(lambda: Article.objects.all().db)())
+
+        response = await ReplicaMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(response.content, b'replica1')
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_disabled_without_replicas(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            ReplicaMiddleware(lambda request: HttpResponse())
+
+
+class NewsletterTests(TestCase):
+    """Рассылка через locmem-бэкенд вместо SMTP: пачки, одно соединение, продолжение после сбоя."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Subscriber.objects.bulk_create(Subscriber(email=f'reader{i}@example.com') for i in range(7))
+        cls.issue = Newsletter.objects.create(subject='Новое в блоге', content='# Привет\n\nСвежие **статьи**.')
+
+    def recipients(self):
+        return sorted(address for message in mail.outbox for address in message.to)
+
+    def test_sends_to_every_subscriber_once(self):
+        with mock.patch.object(newsletter, 'render_html', wraps=newsletter.render_html) as render, \
+                mock.patch.object(EmailBackend, 'open', autospec=True, wraps=EmailBackend.open) as opened:
+            call_command('send_newsletter', self.issue.pk, batch_size=3, rate=0, stdout=io.StringIO())
+
+        self.assertEqual(self.recipients(), sorted(Subscriber.objects.values_list('email', flat=True)))
+        self.assertEqual(render.call_count, 1)
+        self.assertEqual(opened.call_count, 1)
+        message = mail.outbox[0]
+        self.assertEqual(message.subject, 'Новое в блоге')
+        self.assertIn('<strong>статьи</strong>', message.alternatives[0][0])
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.sent_count, 7)
+        self.assertIsNotNone(self.issue.finished_at)
+        with self.assertRaises(CommandError):
+            call_command('send_newsletter', self.issue.pk, stdout=io.StringIO())
+
+    def test_resumes_after_interruption(self):
+        send_messages = EmailBackend.send_messages
+        calls = []
+
+        def failing_second_batch(backend, messages):
+            calls.append(len(messages))
+            # Письма уходят по одному: четвёртое — первое во второй пачке
+            if len(calls) == 4:
+                raise ConnectionError('SMTP недоступен')
+            return send_messages(backend, messages)
+
+        with mock.patch.object(EmailBackend, 'send_messages', failing_second_batch), \
+                self.assertRaises(ConnectionError):
+            newsletter.send(self.issue, batch_size=3, rate=0)
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.sent_count, 3)
+        self.assertIsNone(self.issue.finished_at)
+
+        call_command('send_newsletter', self.issue.pk, batch_size=3, rate=0, stdout=io.StringIO())
+        self.assertEqual(self.recipients(), sorted(Subscriber.objects.values_list('email', flat=True)))
+        self.issue.refresh_from_db()
+        self.assertEqual(self.issue.sent_count, 7)
+
+    def test_refused_recipient_does_not_stop_sending(self):
+        Subscriber.objects.filter(email='reader1@example.com').update(email='bounce@example.com')
+
+        class RefusingBackend(EmailBackend):
+            def send_messages(self, messages):
+                for message in messages:
+                    if 'bounce@example.com' in message.to:
+                        raise smtplib.SMTPRecipientsRefused({'bounce@example.com': (550, b'No such user')})
+                return super().send_messages(messages)
+
+        with self.assertLogs('apps.core.newsletter', 'WARNING') as logs:
+            sent = newsletter.send(self.issue, batch_size=3, rate=0, connection=RefusingBackend())
+        self.assertIn('bounce@example.com', logs.output[0])
+        self.assertEqual(sent, 6)
+        self.assertEqual(len(self.recipients()), 6)
+        self.assertNotIn('bounce@example.com', self.recipients())
+        self.issue.refresh_from_db()
+        self.assertEqual((self.issue.sent_count, self.issue.failed_count), (6, 1))
+        self.assertEqual(self.issue.last_subscriber_id, Subscriber.objects.latest('pk').pk)
+        self.assertIsNotNone(self.issue.finished_at)
+
+    def test_server_failure_keeps_progress(self):
+        with mock.patch.object(EmailBackend, 'send_messages', side_effect=smtplib.SMTPDataError(451, b'Try later')), \
+                self.assertRaises(smtplib.SMTPDataError):
+            newsletter.send(self.issue, batch_size=3, rate=0)
+        self.issue.refresh_from_db()
+        self.assertEqual((self.issue.sent_count, self.issue.failed_count), (0, 0))
+        self.assertIsNone(self.issue.last_subscriber_id)
+
+    def test_rate_is_kept_between_messages(self):
+        now, sent_at = [0.0], []
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        class RecordingBackend(EmailBackend):
+            def send_messages(self, messages):
+                sent_at.append(now[0])
+                return super().send_messages(messages)
+
+        limiter = partial(newsletter.RateLimiter, clock=lambda: now[0], sleep=sleep)
+        with mock.patch.object(newsletter, 'RateLimiter', limiter):
+            newsletter.send(self.issue, batch_size=3, rate=10, connection=RecordingBackend())
+        # Семь писем в трёх пачках — ровно по 0.1 с между соседними, без залпа в начале пачки
+        gaps = [round(later - earlier, 6) for earlier, later in pairwise(sent_at)]
+        self.assertEqual(gaps, [0.1] * 6)
+
+    def test_rate_limit(self):
+        now, slept = [0.0], []
+
+        def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        limiter = newsletter.RateLimiter(10, clock=lambda: now[0], sleep=sleep)
+        for _ in range(3):
+            limiter.wait(5)
+        self.assertEqual(slept, [0.5, 0.5])
+
+
+class SQLiteProfileTests(TestCase):
+    def pragma(self, db, name):
+        with db.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_pragmas(self):
+        tuned = connection.copy('sqlite-tuned')
+        tuned.settings_dict['OPTIONS'].update(settings.SQLITE_OPTIONS)
+        self.addCleanup(tuned.close)
+        self.assertEqual(self.pragma(tuned, 'busy_timeout'), settings.SQLITE_PRAGMAS['busy_timeout'])
+        self.assertEqual(self.pragma(tuned, 'synchronous'), 1)
+        self.assertEqual(self.pragma(tuned, 'cache_size'), settings.SQLITE_PRAGMAS['cache_size'])
+        self.assertEqual(tuned.transaction_mode, 'IMMEDIATE')
+
+    def test_profile_is_opt_in(self):
+        # Профиль применяется к соединениям, только если включён SQLITE_TUNING
+        connection.ensure_connection()
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE' if settings.SQLITE_TUNING else None)
+
+    def test_stress_needs_file_database(self):
+        with self.assertRaisesMessage(CommandError, 'Нужна база в файле'):
+            call_command('stress_sqlite', duration=0, stdout=io.StringIO())
+
+
+@override_settings(BLOG_PAGE_CACHE=False)
+class AuditQueriesTests(TestCase):
+    """Аудит планов: страницы читают статьи по индексам, полный проход — ошибка."""
+
+    @classmethod
+    def setUpTestData(cls):
+        seed_blog(published=12, drafts=2)
+
+    def audit(self, *args):
+        stdout = io.StringIO()
+        call_command('audit_queries', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_pages_use_indexes(self):
+        output = self.audit()
+        self.assertIn('OK   blog:article_list', output)
+        self.assertIn('OK   accounts:profile', output)
+        self.assertNotIn('SCAN', output)
+
+    def test_index_scans(self):
+        table = Article._meta.db_table
+        plans = {
+            # Проход по всему индексу — тот же полный проход
+            f'SELECT COUNT(*) FROM {table}': [table],
+            f'SELECT id, title FROM {table} ORDER BY slug': [table],
+            # Индекс отдаёт строки в порядке ORDER BY — чтение останавливается после LIMIT
+            f'SELECT id, title FROM {table} ORDER BY slug LIMIT 5': [],
+            # Порядок не из индекса: сортируются все строки, LIMIT не спасает
+            f'SELECT id FROM {table} ORDER BY created_at DESC LIMIT 10': [table],
+        }
+        for sql, tables in plans.items():
+            with self.subTest(sql):
+                self.assertEqual(audit_queries._full_scans(sql), tables)
+
+    def test_full_scan_fails(self):
+        # Без индексов лента читает статьи полным проходом; DDL откатится вместе с тестом
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Article._meta.db_table)
+            for name, constraint in constraints.items():
+                if constraint['index'] and not constraint['unique'] and not name.startswith('sqlite_'):
+                    cursor.execute(f'DROP INDEX "{name}"')
+        with self.assertRaisesMessage(CommandError, 'Запросов с полным проходом'):
+            self.audit()
+
+
+@override_settings(BLOG_PAGE_CACHE=False, BLOG_RELATED_UPDATE_DELAY=0)
+class BenchmarkCommandTests(TransactionTestCase):
+    """Замер в потоках: каждая страница сценария, сводка в JSON и сравнение с прошлым запуском."""
+
+    def test_run_and_compare(self):
+        seed_blog(authors=1, categories=2, published=4, drafts=0)
+        output = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'bench.json'
+        options = {'scenario': 'anonymous', 'requests': 2, 'concurrency': 2, 'warmup': 1}
+
+        call_command('benchmark', **options, output=str(output), label='до', stdout=io.StringIO())
+        result = json.loads(output.read_text())
+        self.assertEqual(result['label'], 'до')
+        self.assertEqual(result['environment']['published_articles'], 4)
+        self.assertIn('blog:article_detail', result['pages'])
+        self.assertEqual(result['total']['requests'], 2 * len(result['pages']))
+        self.assertEqual(result['total']['errors'], 0)
+        self.assertGreater(result['total']['queries_per_request']['max'], 0)
+
+        stdout = io.StringIO()
+        call_command('benchmark', **options, compare=str(output), stdout=stdout)
+        self.assertIn(f'(было {result["total"]["throughput_rps"]})', stdout.getvalue())
+
+    def test_percentiles(self):
+        self.assertEqual(benchmark.percentile([5.0], 95), 5.0)
+        self.assertEqual(benchmark.percentile([float(n) for n in range(1, 102)], 50), 51.0)
+        summary = benchmark.summarize([{'latency': 0.01, 'status': 200}, {'latency': 0.03, 'status': 500}], 2)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['latency_ms']['max'], 30.0)
+        self.assertEqual(summary['throughput_rps'], 1.0)
+        self.assertNotIn('queries_per_request', summary)
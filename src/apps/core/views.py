@@ -1,3 +1,12 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import HttpResponse
+from django.views.decorators.cache import never_cache
 
-# Create your views here.
+from . import perf
+
+
+@never_cache
+@staff_member_required
+def metrics(request):
+    """Гистограммы задержек по view в текстовом формате Prometheus (только для staff)."""
+    return HttpResponse(perf.METRICS.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -31,8 +31,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "apps.core.middleware.PerformanceMiddleware",
+    "apps.core.middleware.ReplicaMiddleware",
     "django.middleware.security.SecurityMiddleware",
-    "whitenoise.middleware.WhiteNoiseMiddleware",
+    "apps.core.middleware.StaticFilesMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -71,6 +73,62 @@ DATABASES = {
     )
 }
 
+# Read replicas: comma-separated URLs, parsed like DATABASE_URL. GET/HEAD requests read
+# from a replica; after a write (any unsafe request) the client reads from the primary
+# for DATABASE_REPLICA_STICKY_SECONDS. Try it locally with a copy of the SQLite file:
+# DATABASE_REPLICA_URLS=sqlite:///replica.sqlite3
+DATABASE_REPLICAS = []
+for number, url in enumerate(config("DATABASE_REPLICA_URLS", default="", cast=Csv()), start=1):
+    DATABASES[f"replica{number}"] = {**db_url(url), "TEST": {"MIRROR": "default"}}
+    DATABASE_REPLICAS.append(f"replica{number}")
+DATABASE_ROUTERS = ["apps.core.routers.ReplicaRouter"]
+
+# SQLite profile for several gunicorn workers, opt-in. WAL lets readers run during a write,
+# busy_timeout waits for the write lock instead of failing with "database is locked",
+# and BEGIN IMMEDIATE takes the write lock when a transaction starts, so a transaction
+# that read first can't fail later when it tries to write. Measure with `stress_sqlite`.
+# WAL is stored in the database file and stays after SQLITE_TUNING is turned off;
+# switch back with `PRAGMA journal_mode=DELETE` while nothing else is connected.
+SQLITE_TUNING = config("SQLITE_TUNING", default=False, cast=bool)
+SQLITE_PRAGMAS = {
+    # First, so that switching the journal mode also waits for the lock
+    "busy_timeout": config("SQLITE_BUSY_TIMEOUT", default=5000, cast=int),
+    "journal_mode": "WAL",
+    # With WAL, NORMAL loses at most the last transactions on power loss, never corrupts
+    "synchronous": "NORMAL",
+    "mmap_size": config("SQLITE_MMAP_SIZE", default=128 * 1024 * 1024, cast=int),
+    # Negative value is in KiB
+    "cache_size": config("SQLITE_CACHE_SIZE", default=-20000, cast=int),
+    "temp_store": "MEMORY",
+}
+SQLITE_OPTIONS = {
+    "init_command": ";".join(f"PRAGMA {name}={value}" for name, value in SQLITE_PRAGMAS.items()),
+    "transaction_mode": "IMMEDIATE",
+}
+if SQLITE_TUNING:
+    for database in DATABASES.values():
+        if database["ENGINE"] == "django.db.backends.sqlite3":
+            database.setdefault("OPTIONS", {}).update(SQLITE_OPTIONS)
+DATABASE_REPLICA_STICKY_SECONDS = config("DATABASE_REPLICA_STICKY_SECONDS", default=15, cast=int)
+
+
+# Cache
+# Without REDIS_URL every process gets its own local memory cache, which
+# gunicorn workers don't share, so the page cache is only on by default with Redis.
+
+REDIS_URL = config("REDIS_URL", default="")
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": REDIS_URL,
+    }
+    if REDIS_URL
+    else {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
 
 # Password validation
 
@@ -128,6 +186,60 @@ MEDIA_ROOT = BASE_DIR / "src" / "media"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Blog
+# Keyset pagination for article lists; only the first BLOG_OFFSET_PAGES pages are numbered
+BLOG_CURSOR_PAGINATION = config("BLOG_CURSOR_PAGINATION", default=False, cast=bool)
+BLOG_OFFSET_PAGES = config("BLOG_OFFSET_PAGES", default=5, cast=int)
+# Full-page cache of index, article_list and article_detail for anonymous readers
+BLOG_PAGE_CACHE = config("BLOG_PAGE_CACHE", default=bool(REDIS_URL), cast=bool)
+BLOG_PAGE_CACHE_TIMEOUT = config("BLOG_PAGE_CACHE_TIMEOUT", default=60 * 60, cast=int)
+# Rendered article cards, keyed by article, category and template versions (no explicit invalidation)
+BLOG_CARD_CACHE = config("BLOG_CARD_CACHE", default=True, cast=bool)
+BLOG_CARD_CACHE_TIMEOUT = config("BLOG_CARD_CACHE_TIMEOUT", default=24 * 60 * 60, cast=int)
+# View and reaction counters are buffered per process and added to the database in one UPDATE
+# every BLOG_COUNTERS_FLUSH_INTERVAL seconds; the counter endpoint answers from a cached snapshot
+BLOG_COUNTERS_FLUSH_INTERVAL = config("BLOG_COUNTERS_FLUSH_INTERVAL", default=5.0, cast=float)
+BLOG_COUNTERS_SNAPSHOT_TIMEOUT = config("BLOG_COUNTERS_SNAPSHOT_TIMEOUT", default=24 * 60 * 60, cast=int)
+# Related articles of edited articles are recomputed in a background thread after this many
+# seconds, one batch for all edits in between; 0 recomputes right after commit, in the request
+BLOG_RELATED_UPDATE_DELAY = config("BLOG_RELATED_UPDATE_DELAY", default=2.0, cast=float)
+# Editor preview caches rendered Markdown per top-level block, keyed by the block's hash
+BLOG_PREVIEW_CACHE_TIMEOUT = config("BLOG_PREVIEW_CACHE_TIMEOUT", default=60 * 60, cast=int)
+# Cover variants are generated in a background thread after commit; when disabled,
+# run the generate_image_variants command (e.g. from cron). Until then pages show the original
+BLOG_IMAGE_VARIANTS_ON_SAVE = config("BLOG_IMAGE_VARIANTS_ON_SAVE", default=True, cast=bool)
+# Output directory of export_static (pre-rendered public pages for nginx or another static host)
+BLOG_EXPORT_ROOT = config("BLOG_EXPORT_ROOT", default=str(BASE_DIR / "export"))
+
+# Subscribe endpoint: deduplicate in the cache and insert new emails in batches instead of
+# get_or_create per request. Batches are buffered per process for up to SUBSCRIBE_FLUSH_INTERVAL seconds.
+SUBSCRIBE_COALESCE = config("SUBSCRIBE_COALESCE", default=False, cast=bool)
+SUBSCRIBE_BATCH_SIZE = config("SUBSCRIBE_BATCH_SIZE", default=100, cast=int)
+SUBSCRIBE_FLUSH_INTERVAL = config("SUBSCRIBE_FLUSH_INTERVAL", default=1.0, cast=float)
+SUBSCRIBE_SEEN_TIMEOUT = config("SUBSCRIBE_SEEN_TIMEOUT", default=24 * 60 * 60, cast=int)
+
+# Performance instrumentation
+# Per-request SQL/template/Markdown timings, Server-Timing header and /metrics/ histograms
+PERF_INSTRUMENTATION = config("PERF_INSTRUMENTATION", default=False, cast=bool)
+# Server-Timing exposes backend timings to any client; disable it on public hosts if needed
+PERF_SERVER_TIMING = config("PERF_SERVER_TIMING", default=True, cast=bool)
+
+# Email
+# Any SMTP server works; for local testing run a stand-in, e.g.
+# `python -m aiosmtpd -n -l 127.0.0.1:1025`, and set EMAIL_PORT=1025
+EMAIL_BACKEND = config("EMAIL_BACKEND", default="django.core.mail.backends.smtp.EmailBackend")
+EMAIL_HOST = config("EMAIL_HOST", default="localhost")
+EMAIL_PORT = config("EMAIL_PORT", default=25, cast=int)
+EMAIL_HOST_USER = config("EMAIL_HOST_USER", default="")
+EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", default="")
+EMAIL_USE_TLS = config("EMAIL_USE_TLS", default=False, cast=bool)
+EMAIL_TIMEOUT = config("EMAIL_TIMEOUT", default=30, cast=int)
+DEFAULT_FROM_EMAIL = config("DEFAULT_FROM_EMAIL", default="blog@localhost")
+
+# Newsletter dispatch (send_newsletter): messages per batch/checkpoint and messages per second (0 = unlimited)
+NEWSLETTER_BATCH_SIZE = config("NEWSLETTER_BATCH_SIZE", default=500, cast=int)
+NEWSLETTER_RATE = config("NEWSLETTER_RATE", default=10, cast=float)
+
 # Auth
 LOGIN_URL = "/accounts/login/"
 LOGIN_REDIRECT_URL = "/accounts/profile/"
@@ -169,5 +281,10 @@ LOGGING = {
             "level": config("DJANGO_LOG_LEVEL", default="INFO"),
             "propagate": False,
         },
+        "apps.core.perf": {
+            "handlers": ["console"],
+            "level": config("PERF_LOG_LEVEL", default="INFO"),
+            "propagate": False,
+        },
     },
 }
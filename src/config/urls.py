@@ -8,6 +8,9 @@ urlpatterns = [
     
     # Аккаунты
     path("accounts/", include("apps.accounts.urls")),
+
+    # Служебные страницы: метрики для Prometheus
+    path("", include("apps.core.urls")),
     
     # Публичный блог — на главной странице
     path("", include("apps.blog.urls")),
@@ -1,6 +1,6 @@
 /**
  * Dev/Blog - Main Scripts
- * Handles mobile menu, article filtering, and profile tabs.
+ * Handles mobile menu, article filtering, profile tabs and article counters.
  */
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -9,6 +9,7 @@ document.addEventListener('DOMContentLoaded', () => {
     initProfileTabs();
     initShareButton();
     initSubscribeForm();
+    initArticleCounters();
 });
 
 /**
@@ -96,26 +97,31 @@ function initProfileTabs() {
 
     if (tabs.length === 0) return;
 
-    tabs.forEach(tab => {
-        tab.addEventListener('click', () => {
-            const targetId = tab.dataset.tab;
-            const targetContent = document.getElementById('tab-' + targetId);
-
-            if (!targetContent) return;
+    const activate = (tab) => {
+        const targetContent = document.getElementById('tab-' + tab.dataset.tab);
 
-            // Update tab styles
-            tabs.forEach(t => {
-                t.classList.remove('text-white', 'border-emerald-400');
-                t.classList.add('text-white/50', 'border-transparent');
-            });
-            tab.classList.remove('text-white/50', 'border-transparent');
-            tab.classList.add('text-white', 'border-emerald-400');
+        if (!targetContent) return;
 
-            // Show/hide content
-            contents.forEach(c => c.classList.add('hidden'));
-            targetContent.classList.remove('hidden');
+        // Update tab styles
+        tabs.forEach(t => {
+            t.classList.remove('text-white', 'border-emerald-400');
+            t.classList.add('text-white/50', 'border-transparent');
         });
+        tab.classList.remove('text-white/50', 'border-transparent');
+        tab.classList.add('text-white', 'border-emerald-400');
+
+        // Show/hide content
+        contents.forEach(c => c.classList.add('hidden'));
+        targetContent.classList.remove('hidden');
+    };
+
+    tabs.forEach(tab => {
+        tab.addEventListener('click', () => activate(tab));
     });
+
+    // Pagination links of a tab (e.g. #drafts) reopen that tab after reload
+    const initial = [...tabs].find(tab => '#' + tab.dataset.tab === location.hash);
+    if (initial) activate(initial);
 }
 
 /**
@@ -146,9 +152,19 @@ function initShareButton() {
     });
 }
 
+/**
+ * Read a cookie value by name
+ */
+function getCookie(name) {
+    const match = document.cookie.match(new RegExp('(?:^|; )' + name + '=([^;]*)'));
+    return match ? decodeURIComponent(match[1]) : null;
+}
+
 /**
  * Subscribe Form
- * Sends email to backend via fetch and provides visual feedback
+ * Sends email to backend via fetch and provides visual feedback.
+ * The page may come from the anonymous page cache, so the CSRF cookie
+ * takes precedence over the token embedded in the form.
  */
 function initSubscribeForm() {
     const form = document.getElementById('subscribe-form');
@@ -159,7 +175,8 @@ function initSubscribeForm() {
         const btn = form.querySelector('button[type="submit"]');
         const emailInput = form.querySelector('input[name="email"]');
         const originalText = btn.textContent;
-        const csrfToken = form.querySelector('[name=csrfmiddlewaretoken]');
+        const csrfInput = form.querySelector('[name=csrfmiddlewaretoken]');
+        const csrfToken = getCookie('csrftoken') || (csrfInput && csrfInput.value);
 
         btn.disabled = true;
         btn.textContent = 'Отправка...';
@@ -167,7 +184,7 @@ function initSubscribeForm() {
         try {
             const formData = new FormData();
             formData.append('email', emailInput.value);
-            if (csrfToken) formData.append('csrfmiddlewaretoken', csrfToken.value);
+            if (csrfToken) formData.append('csrfmiddlewaretoken', csrfToken);
 
             const response = await fetch(form.action, {
                 method: 'POST',
@@ -193,3 +210,51 @@ function initSubscribeForm() {
         }
     });
 }
+
+/**
+ * Article Counters
+ * Reports a view once the article page is shown and sends reactions.
+ * The page (and its counts) may come from the page cache, so the counts are
+ * refreshed from the endpoint response; increments still buffered on the
+ * server are not in it, hence the optimistic +1 for the reader's own reaction.
+ */
+function initArticleCounters() {
+    const form = document.getElementById('article-counters');
+    if (!form) return;
+
+    const reactedKey = `reacted:${form.dataset.article}`;
+    const btn = form.querySelector('button[type="submit"]');
+    const show = (data, ownReaction = 0) => {
+        document.querySelectorAll('[data-counter="views"]').forEach((el) => {
+            el.textContent = data.views;
+        });
+        document.querySelectorAll('[data-counter="reactions"]').forEach((el) => {
+            el.textContent = data.reactions + ownReaction;
+        });
+    };
+    const post = async (url) => {
+        const csrfInput = form.querySelector('[name=csrfmiddlewaretoken]');
+        const formData = new FormData();
+        const csrfToken = getCookie('csrftoken') || (csrfInput && csrfInput.value);
+        if (csrfToken) formData.append('csrfmiddlewaretoken', csrfToken);
+        const response = await fetch(url, { method: 'POST', body: formData });
+        if (!response.ok) throw new Error(response.statusText);
+        return response.json();
+    };
+
+    if (localStorage.getItem(reactedKey)) btn.disabled = true;
+
+    post(form.dataset.viewUrl).then((data) => show(data)).catch(() => {});
+
+    form.addEventListener('submit', async (e) => {
+        e.preventDefault();
+        if (localStorage.getItem(reactedKey)) return;
+        btn.disabled = true;
+        try {
+            show(await post(form.action), 1);
+            localStorage.setItem(reactedKey, '1');
+        } catch {
+            btn.disabled = false;
+        }
+    });
+}